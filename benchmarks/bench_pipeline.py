@@ -0,0 +1,320 @@
+"""Benchmark the flashcard pipeline against local stand-ins for external services.
+
+Usage:
+    uv run python benchmarks/bench_pipeline.py [--sizes 10 100 1000] [--output results.json]
+
+Results are printed as JSON with per-stage latency, end-to-end cards/second
+and peak resident memory for each pipeline mode and sentence count. Every
+case runs in a fresh process, so its memory is measured on its own; the peak
+of the image worker processes is reported separately.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from unittest.mock import patch
+
+from loguru import logger
+
+from fakes import FakeNotionClient, LocalImageServer, register_fake_adapter
+from flashcards.config import IMAGE_MAX_DOWNLOAD_BYTES, IMAGE_MAX_PER_HOST
+from flashcards.generator import generate_cloze_deck
+from flashcards.images import (
+    get_multiple_image_sets,
+    get_process_pool,
+    shutdown_process_pool,
+)
+from flashcards.notion import get_page_content, get_page_id, iter_page_sentences
+from flashcards.pipeline import run_streaming_pipeline
+from flashcards.translation import stream_translations, translate_sentences
+
+PAGE_TITLE = "FR"
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 4)
+
+
+def _peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Return the peak resident set size of this process in MiB.
+
+    With RUSAGE_CHILDREN, return that of the largest terminated child process.
+    """
+    peak = resource.getrusage(who).ru_maxrss  # bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _make_sentences(count: int) -> list[str]:
+    return [f"Sentence {i} contains the **word{i}** to learn." for i in range(count)]
+
+
+def _run_staged(
+    notion_client,
+    translate,
+    fetch_images,
+    out_dir: Path,
+    count: int,
+) -> dict:
+    timings: dict[str, float] = {}
+    with _timed(timings, "notion"):
+        content = get_page_content(notion_client, PAGE_TITLE, count)
+    with _timed(timings, "translation"):
+        translations = translate(content)
+    with _timed(timings, "images"):
+        media, img_tags = fetch_images([t.words_source for t in translations])
+    with _timed(timings, "deck"):
+        generate_cloze_deck(
+            "Benchmark", translations, out_dir / "deck.apkg", media, img_tags
+        )
+    return {"stages": timings, "cards": len(translations)}
+
+
+def _run_streaming(
+    notion_client,
+    stream_translate,
+    fetch_images,
+    out_dir: Path,
+    count: int,
+    chunk_size: int,
+    workers: int,
+) -> dict:
+    timings: dict[str, float] = {}
+    with _timed(timings, "pipeline"):
+        page_id = get_page_id(notion_client, PAGE_TITLE)
+        translations, media, img_tags = run_streaming_pipeline(
+            islice(iter_page_sentences(notion_client, page_id), count),
+            translate=stream_translate,
+            fetch_images=fetch_images,
+            chunk_size=chunk_size,
+            translation_workers=workers,
+            image_workers=workers,
+            stream_items=True,
+        )
+    with _timed(timings, "deck"):
+        generate_cloze_deck(
+            "Benchmark", translations, out_dir / "deck.apkg", media, img_tags
+        )
+    return {"stages": timings, "cards": len(translations)}
+
+
+def run_case(args: argparse.Namespace, mode: str, size: int) -> dict:
+    """Benchmark one pipeline mode and sentence count in this process."""
+    api = register_fake_adapter(
+        request_latency=args.llm_request_latency,
+        sentence_latency=args.llm_sentence_latency,
+    )
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("SEARCH_ENGINE_ID", "benchmark")
+
+    with (
+        LocalImageServer(
+            size=tuple(args.image_size),
+            latency=args.image_latency,
+            hosts=args.image_hosts,
+        ) as image_server,
+        patch("flashcards.images._search_images", side_effect=image_server.search),
+        tempfile.TemporaryDirectory() as tmp,
+    ):
+        out_dir = Path(tmp)
+        fetch_images = partial(
+            get_multiple_image_sets,
+            imgs_per_query=1,
+            box=(400, 180),
+            max_workers=args.workers,
+            max_per_host=IMAGE_MAX_PER_HOST,
+            processor=get_process_pool(),
+            max_download_bytes=IMAGE_MAX_DOWNLOAD_BYTES,
+        )
+        notion_client = FakeNotionClient(
+            PAGE_TITLE, _make_sentences(size), latency=args.notion_latency
+        )
+        start = time.perf_counter()
+        if mode == "staged":
+            translate = partial(
+                translate_sentences,
+                api=api,
+                chunk_size=args.chunk_size,
+                max_workers=args.workers,
+            )
+            result = _run_staged(notion_client, translate, fetch_images, out_dir, size)
+        else:
+            stream_translate = partial(
+                stream_translations, api=api, chunk_size=args.chunk_size
+            )
+            result = _run_streaming(
+                notion_client,
+                stream_translate,
+                fetch_images,
+                out_dir,
+                size,
+                args.chunk_size,
+                args.workers,
+            )
+        elapsed = time.perf_counter() - start
+        # Waits for the image workers, so their memory is counted below
+        shutdown_process_pool()
+
+    result.update(
+        mode=mode,
+        sentences=size,
+        total_seconds=round(elapsed, 4),
+        cards_per_second=round(result["cards"] / elapsed, 2),
+        notion_requests=notion_client.requests,
+        peak_rss_mb=_peak_rss_mb(),
+        peak_worker_rss_mb=_peak_rss_mb(resource.RUSAGE_CHILDREN),
+    )
+    return result
+
+
+def _case_command(args: argparse.Namespace, mode: str, size: int) -> list[str]:
+    return [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--case",
+        mode,
+        str(size),
+        "--chunk-size",
+        str(args.chunk_size),
+        "--workers",
+        str(args.workers),
+        "--notion-latency",
+        str(args.notion_latency),
+        "--llm-request-latency",
+        str(args.llm_request_latency),
+        "--llm-sentence-latency",
+        str(args.llm_sentence_latency),
+        "--image-latency",
+        str(args.image_latency),
+        "--image-hosts",
+        str(args.image_hosts),
+        "--image-size",
+        *map(str, args.image_size),
+    ]
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    results = []
+    for size in args.sizes:
+        for mode in args.modes:
+            case = subprocess.run(
+                _case_command(args, mode, size),
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            results.append(json.loads(case.stdout))
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "case")
+        },
+        "results": results,
+    }
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the flashcard pipeline")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000],
+        help="Sentence counts to benchmark (default: 10 100 1000)",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["staged", "streaming"],
+        default=["staged", "streaming"],
+        help="Pipeline modes to benchmark (default: both)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--notion-latency",
+        type=float,
+        default=0.05,
+        help="Seconds per Notion request (default: 0.05)",
+    )
+    parser.add_argument(
+        "--llm-request-latency",
+        type=float,
+        default=0.2,
+        help="Seconds per LLM request (default: 0.2)",
+    )
+    parser.add_argument(
+        "--llm-sentence-latency",
+        type=float,
+        default=0.01,
+        help="Additional seconds per translated sentence (default: 0.01)",
+    )
+    parser.add_argument(
+        "--image-latency",
+        type=float,
+        default=0.02,
+        help="Seconds per image download (default: 0.02)",
+    )
+    parser.add_argument(
+        "--image-hosts",
+        type=int,
+        default=16,
+        help="Number of image hosts the downloads are spread over (default: 16)",
+    )
+    parser.add_argument(
+        "--image-size",
+        nargs=2,
+        type=int,
+        default=[1200, 800],
+        metavar=("WIDTH", "HEIGHT"),
+        help="Size of the served source images (default: 1200 800)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Also write the JSON results to this file",
+    )
+    # Used internally to run a single case in a fresh process
+    parser.add_argument(
+        "--case", nargs=2, metavar=("MODE", "SIZE"), help=argparse.SUPPRESS
+    )
+    return parser
+
+
+def main() -> None:
+    args = build_argument_parser().parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    if args.case:
+        mode, size = args.case
+        print(json.dumps(run_case(args, mode, int(size))))
+        return
+
+    report = json.dumps(run_benchmarks(args), indent=2, default=str)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""In-process stand-ins for Notion, the LLM providers and image hosts."""
+
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+
+from PIL import Image
+
+from flashcards.translation import (
+    IdentifiedTranslationItem,
+    TranslationResponse,
+    _LLMAdapter,
+    _register_adapter,
+)
+
+
+class FakeNotionClient:
+    """Serve a single page of bold sentences through the Notion client API."""
+
+    def __init__(
+        self,
+        title: str,
+        sentences: list[str],
+        page_size: int = 100,
+        latency: float = 0.0,
+    ) -> None:
+        self.title = title
+        self.sentences = sentences
+        self.page_size = page_size
+        self.latency = latency
+        self.requests = 0
+        self.blocks = SimpleNamespace(children=SimpleNamespace(list=self._list_blocks))
+
+    def search(self, query: str, filter: dict, start_cursor: str | None = None) -> dict:
+        self._request()
+        page = {
+            "id": "fake-page-id",
+            "properties": {
+                "title": {"type": "title", "title": [{"plain_text": self.title}]}
+            },
+        }
+        return {"results": [page] if query == self.title else [], "has_more": False}
+
+    def close(self) -> None:
+        pass
+
+    def _list_blocks(self, block_id: str, start_cursor: str | None = None) -> dict:
+        self._request()
+        start = int(start_cursor or 0)
+        end = min(start + self.page_size, len(self.sentences))
+        results = [
+            {
+                "type": "paragraph",
+                "paragraph": {
+                    "rich_text": [
+                        {"plain_text": sentence, "annotations": {"bold": True}}
+                    ]
+                },
+            }
+            for sentence in self.sentences[start:end]
+        ]
+        has_more = end < len(self.sentences)
+        return {
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(end) if has_more else None,
+        }
+
+    def _request(self) -> None:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeLLMAdapter(_LLMAdapter):
+    """Echo each input sentence back as a translation after a simulated delay.
+
+    Latency is a fixed cost per request plus a cost per sentence, roughly
+    modelling time-to-first-token and generation time.
+    """
+
+    default_model = "fake-model"
+    request_latency = 0.0
+    sentence_latency = 0.0
+
+    def generate(self, instructions: str, input_text: str) -> TranslationResponse:
+        lines = self._lines(input_text)
+        time.sleep(self.request_latency + self.sentence_latency * len(lines))
+        return TranslationResponse(translations=[self._item(*line) for line in lines])
+
+    def stream(
+        self, instructions: str, input_text: str
+    ) -> Iterator[IdentifiedTranslationItem]:
+        time.sleep(self.request_latency)
+        for line in self._lines(input_text):
+            time.sleep(self.sentence_latency)
+            yield self._item(*line)
+
+    @staticmethod
+    def _lines(input_text: str) -> list[list[str]]:
+        return [line.split(": ", 1) for line in input_text.split("\n") if line]
+
+    @staticmethod
+    def _item(id_: str, sentence: str) -> IdentifiedTranslationItem:
+        return IdentifiedTranslationItem(
+            id=int(id_),
+            words_source=sentence.split("**")[1].lower(),
+            sentence_source=sentence,
+            sentence_target=sentence,
+        )
+
+
+def register_fake_adapter(
+    name: str = "fake",
+    request_latency: float = 0.0,
+    sentence_latency: float = 0.0,
+) -> str:
+    """Register a FakeLLMAdapter subclass with the given latency under name."""
+    adapter = type(
+        "ConfiguredFakeLLMAdapter",
+        (FakeLLMAdapter,),
+        {"request_latency": request_latency, "sentence_latency": sentence_latency},
+    )
+    _register_adapter(name, adapter)
+    return name
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, body: bytes, latency: float, **kwargs) -> None:
+        self.body = body
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class LocalImageServer:
+    """Serve the same JPEG for every path from local HTTP server threads.
+
+    Each of the hosts listens on its own port and queries are spread over
+    them, so per-host download caps apply as they would to real image hosts.
+    """
+
+    def __init__(
+        self, size: tuple[int, int] = (1200, 800), latency: float = 0.0, hosts: int = 1
+    ) -> None:
+        buf = BytesIO()
+        Image.new("RGB", size, (120, 160, 200)).save(buf, format="JPEG")
+        self.body = buf.getvalue()
+        handler = partial(_ImageHandler, body=self.body, latency=latency)
+        self._servers = [
+            ThreadingHTTPServer(("127.0.0.1", 0), handler) for _ in range(hosts)
+        ]
+        self._threads = [
+            threading.Thread(target=server.serve_forever, daemon=True)
+            for server in self._servers
+        ]
+
+    def __enter__(self) -> "LocalImageServer":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def url_for(self, query: str, index: int = 0) -> str:
+        server = self._servers[zlib.crc32(query.encode()) % len(self._servers)]
+        host, port = server.server_address[:2]
+        return f"http://{host}:{port}/{query}/{index}.jpg"
+
+    def search(self, api_key: str, eng_id: str, query: str, num: int = 10) -> list[str]:
+        """Stand-in for images._search_images returning local image URLs."""
+        return [self.url_for(query, i) for i in range(min(num, 3))]
@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+from pydantic import ValidationError
+
+from .cache import SQLiteCache
+from .clients import get_genai_client, get_openai_client
+from .config import BATCH_DIR
+from .metrics import incr, timer
+from .translation import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_CHUNK_TOKENS,
+    DEFAULT_MAX_RETRIES,
+    RetryableTranslationError,
+    TranslationError,
+    TranslationItem,
+    TranslationResponse,
+    _align_items,
+    _finish_chunk,
+    _followup_failed,
+    _format_input,
+    _GeminiAdapter,
+    _load_cached,
+    _merge_results,
+    _missing_ids,
+    _OpenAIAdapter,
+    _plan_chunks,
+    _prepare,
+    _prompt_cache_key,
+    _request_chunk,
+)
+
+DEFAULT_POLL_INTERVAL = 30.0  # seconds
+
+
+class BatchJobError(TranslationError):
+    """The provider reported that a batch job failed, expired or was cancelled."""
+
+
+class _BatchBackend(ABC):
+    """Run a JSONL file of translation requests as one provider batch job."""
+
+    default_model: str
+
+    def __init__(self, model: str | None = None) -> None:
+        self.model = model
+
+    @abstractmethod
+    def request_line(self, custom_id: str, instructions: str, input_text: str) -> dict:
+        """Return the JSONL record of one request in the provider's format."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def submit(self, input_path: Path) -> str:
+        """Upload the request file, start a batch job and return its ID."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def poll(self, job_id: str) -> bool:
+        """Return True once the job has finished; raise BatchJobError if it failed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def results(self, job_id: str) -> dict[str, TranslationResponse | TranslationError]:
+        """Return the parsed response or error of every request by custom ID."""
+        raise NotImplementedError
+
+
+def _parse_output(text: str) -> TranslationResponse | TranslationError:
+    try:
+        return TranslationResponse.model_validate_json(text)
+    except ValidationError:
+        return TranslationError("Batch request returned invalid output.")
+
+
+def _strict_schema(schema: dict) -> dict:
+    """Close every object in a JSON schema, as strict structured outputs require."""
+    if schema.get("type") == "object":
+        schema["additionalProperties"] = False
+        schema["required"] = list(schema.get("properties", {}))
+    for value in schema.values():
+        if isinstance(value, dict):
+            _strict_schema(value)
+    return schema
+
+
+def _openai_text_format() -> dict:
+    """Return the structured output format that responses.parse sends."""
+    return {
+        "type": "json_schema",
+        "strict": True,
+        "name": TranslationResponse.__name__,
+        "schema": _strict_schema(TranslationResponse.model_json_schema()),
+    }
+
+
+class _OpenAIBatchBackend(_BatchBackend):
+    default_model = _OpenAIAdapter.default_model
+
+    def request_line(self, custom_id: str, instructions: str, input_text: str) -> dict:
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {
+                "model": self.model or self.default_model,
+                "instructions": instructions,
+                "input": input_text,
+                "text": {"format": _openai_text_format()},
+                "prompt_cache_key": _prompt_cache_key(instructions),
+            },
+        }
+
+    def submit(self, input_path: Path) -> str:
+        with self._errors() as client, input_path.open("rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+            return client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/responses",
+                completion_window="24h",
+            ).id
+
+    def poll(self, job_id: str) -> bool:
+        with self._errors() as client:
+            batch = client.batches.retrieve(job_id)
+        if batch.status in ("failed", "cancelled"):
+            raise BatchJobError(f"OpenAI batch job {job_id} {batch.status}.")
+        # Expired jobs still return the requests that finished in time
+        return batch.status in ("completed", "expired")
+
+    def results(self, job_id: str) -> dict[str, TranslationResponse | TranslationError]:
+        results = {}
+        with self._errors() as client:
+            batch = client.batches.retrieve(job_id)
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for line in client.files.content(file_id).text.splitlines():
+                    record = json.loads(line)
+                    results[record["custom_id"]] = self._parse_record(record)
+        return results
+
+    @staticmethod
+    def _parse_record(record: dict) -> TranslationResponse | TranslationError:
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body")
+            return TranslationError(f"OpenAI batch request failed: {error}")
+        text = "".join(
+            part.get("text", "")
+            for item in response["body"].get("output", [])
+            if item.get("type") == "message"
+            for part in item.get("content", [])
+            if part.get("type") == "output_text"
+        )
+        return _parse_output(text)
+
+    @staticmethod
+    @contextmanager
+    def _errors() -> Iterator:
+        from openai import APIError
+
+        try:
+            yield get_openai_client(_OpenAIAdapter._api_key())
+        except APIError as e:
+            raise _OpenAIAdapter._error(e) from e
+
+
+class _GeminiBatchBackend(_BatchBackend):
+    default_model = _GeminiAdapter.default_model
+
+    def request_line(self, custom_id: str, instructions: str, input_text: str) -> dict:
+        return {
+            "key": custom_id,
+            "request": {
+                "contents": [{"role": "user", "parts": [{"text": input_text}]}],
+                "system_instruction": {"parts": [{"text": instructions}]},
+                "generation_config": {
+                    "thinking_config": {"thinking_budget": 0},
+                    "response_mime_type": "application/json",
+                    "response_json_schema": TranslationResponse.model_json_schema(),
+                },
+            },
+        }
+
+    def submit(self, input_path: Path) -> str:
+        from google.genai import types
+
+        with self._errors() as client:
+            input_file = client.files.upload(
+                file=input_path,
+                config=types.UploadFileConfig(
+                    display_name=input_path.name, mime_type="jsonl"
+                ),
+            )
+            return client.batches.create(
+                model=self.model or self.default_model,
+                src=input_file.name,
+                config=types.CreateBatchJobConfig(display_name=input_path.stem),
+            ).name
+
+    def poll(self, job_id: str) -> bool:
+        with self._errors() as client:
+            job = client.batches.get(name=job_id)
+        state = job.state.name if job.state else ""
+        if state in ("JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"):
+            raise BatchJobError(f"Gemini batch job {job_id} ended in {state}.")
+        return state in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED")
+
+    def results(self, job_id: str) -> dict[str, TranslationResponse | TranslationError]:
+        with self._errors() as client:
+            job = client.batches.get(name=job_id)
+            data = client.files.download(file=job.dest.file_name)
+        results = {}
+        for line in data.decode("utf-8").splitlines():
+            record = json.loads(line)
+            results[record["key"]] = self._parse_record(record)
+        return results
+
+    @staticmethod
+    def _parse_record(record: dict) -> TranslationResponse | TranslationError:
+        response = record.get("response")
+        if record.get("error") or not response or not response.get("candidates"):
+            error = record.get("error") or "no candidates"
+            return TranslationError(f"Gemini batch request failed: {error}")
+        parts = response["candidates"][0].get("content", {}).get("parts", [])
+        return _parse_output("".join(part.get("text", "") for part in parts))
+
+    @staticmethod
+    @contextmanager
+    def _errors() -> Iterator:
+        import httpx
+        from google.genai.errors import APIError
+
+        try:
+            yield get_genai_client(_GeminiAdapter._api_key())
+        except (APIError, httpx.TransportError) as e:
+            raise _GeminiAdapter._error(e) from e
+
+
+_BATCH_BACKENDS: dict[str, type[_BatchBackend]] = {}
+
+
+def _register_batch_backend(name: str, cls: type[_BatchBackend]) -> None:
+    """Register a batch backend class under a provider name."""
+    _BATCH_BACKENDS[name] = cls
+
+
+def _get_batch_backend(name: str, model: str | None = None) -> _BatchBackend:
+    try:
+        cls = _BATCH_BACKENDS[name]
+    except KeyError:
+        raise TranslationError(f"Batch mode is not supported for API: {name}")
+    return cls(model=model)
+
+
+_register_batch_backend("openai", _OpenAIBatchBackend)
+_register_batch_backend("gemini", _GeminiBatchBackend)
+
+
+def _load_job_id(record_path: Path) -> str | None:
+    try:
+        return json.loads(record_path.read_text(encoding="utf-8"))["job_id"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def _save_job(record_path: Path, record: dict) -> None:
+    tmp_path = record_path.with_name(record_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(record), encoding="utf-8")
+    os.replace(tmp_path, record_path)
+
+
+def _wait_for_job(backend: _BatchBackend, job_id: str, poll_interval: float) -> None:
+    """Poll until the job finishes, riding out transient polling errors."""
+    while True:
+        incr("batch.polls")
+        try:
+            if backend.poll(job_id):
+                return
+        except RetryableTranslationError as e:
+            logger.warning(f"Polling batch job {job_id} failed, retrying: {e}")
+        logger.debug(f"Batch job {job_id} still running.")
+        time.sleep(poll_interval)
+
+
+def translate_sentences_batch(
+    sentences: list[str],
+    source_lang: str = "English",
+    api: str = "gemini",
+    model: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunk_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    job_dir: Path = BATCH_DIR,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> list[TranslationItem]:
+    """Translate sentences with one provider batch job and return items in input order.
+
+    Uncached chunks are written to a JSONL file in job_dir and submitted
+    together, then the job is polled until it finishes. The job ID is recorded
+    next to the file, so a run stopped while the job is pending picks it up
+    again instead of submitting a new one. Sentences missing from a partial
+    result are re-requested with regular calls. Chunks that failed in the job
+    as a whole are logged and left out as in translate_sentences, not sent
+    again.
+    """
+    instructions, adapter, _, keys = _prepare(sentences, source_lang, api, model)
+    backend = _get_batch_backend(api, model=model)
+    cached = _load_cached(keys, cache, refresh)
+    chunks = _plan_chunks(sentences, keys, cached, chunk_size, max_chunk_tokens)
+    if not chunks:
+        return _merge_results(keys, cached, chunks, [], cache)
+
+    numbered = [dict(enumerate((sentences[i] for i in chunk), start=1)) for chunk in chunks]  # fmt: skip
+    lines = [
+        backend.request_line(f"chunk-{n}", instructions, _format_input(chunk))
+        for n, chunk in enumerate(numbered)
+    ]
+    fingerprint = hashlib.sha256(
+        json.dumps([api, backend.model or backend.default_model, lines]).encode()
+    ).hexdigest()[:16]
+    input_path = job_dir / f"{api}-{fingerprint}.jsonl"
+    record_path = job_dir / f"{api}-{fingerprint}.job.json"
+
+    job_id = _load_job_id(record_path)
+    if job_id is None:
+        job_dir.mkdir(parents=True, exist_ok=True)
+        input_path.write_text(
+            "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines),
+            encoding="utf-8",
+        )
+        job_id = backend.submit(input_path)
+        _save_job(record_path, {"api": api, "job_id": job_id, "input": input_path.name})
+        incr("batch.jobs_submitted")
+        logger.info(f"Submitted batch job {job_id} with {len(lines)} request(s).")
+    else:
+        logger.info(f"Resuming batch job {job_id} recorded in {record_path}.")
+
+    try:
+        with timer("batch.wait"):
+            _wait_for_job(backend, job_id, poll_interval)
+    except BatchJobError:
+        # A dead job cannot be resumed; the next run submits a new one
+        record_path.unlink(missing_ok=True)
+        raise
+    results = backend.results(job_id)
+    record_path.unlink(missing_ok=True)
+    input_path.unlink(missing_ok=True)
+
+    outcomes: list[list[TranslationItem | None] | TranslationError] = []
+    for n, chunk in enumerate(numbered):
+        result = results.get(f"chunk-{n}")
+        if result is None:
+            result = TranslationError("Batch job returned no result for the chunk.")
+        if isinstance(result, TranslationResponse):
+            aligned = _align_items(chunk, result.translations)
+            if not aligned:
+                result = TranslationError("Batch job returned no usable translations for the chunk.")  # fmt: skip
+        if isinstance(result, TranslationError):
+            # Re-sending whole chunks directly would bypass batch pricing and pacing
+            outcomes.append(result)
+            continue
+        missing = _missing_ids(chunk, aligned)
+        if missing:
+            incr("translation.followup_requests")
+            try:
+                aligned |= _request_chunk(adapter, instructions, missing, max_retries)
+            except TranslationError as e:
+                _followup_failed(e, missing)
+        outcomes.append(_finish_chunk(chunk, aligned))
+    return _merge_results(keys, cached, chunks, outcomes, cache)
@@ -1,10 +1,51 @@
 import argparse
 import sys
 
-from dotenv import load_dotenv
 from loguru import logger
 
 
+def parse_weights(value: str) -> dict[str, float]:
+    """Parse 'gemini=2,openai=1' into a provider -> weight mapping."""
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        try:
+            weights[name.strip().lower()] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight in '{part}'")
+    return weights
+
+
+def parse_targets(value: str) -> list[str]:
+    """Parse 'fr,de' into a list of unique upper-case language codes."""
+    targets = [part.strip().upper() for part in value.split(",") if part.strip()]
+    if not targets:
+        raise argparse.ArgumentTypeError("No target language given")
+    return list(dict.fromkeys(targets))
+
+
+def parse_positive_int(value: str) -> int:
+    """Parse a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Expected a number of at least 1, got {number}")  # fmt: skip
+    return number
+
+
+def parse_positive_float(value: str) -> float:
+    """Parse a number greater than 0."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number '{value}'")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"Expected a number greater than 0, got {number}")  # fmt: skip
+    return number
+
+
 def build_argument_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Language description")
     parser.add_argument(
@@ -14,18 +55,23 @@ def build_argument_parser() -> argparse.ArgumentParser:
         type=str.upper,
         help="Source language (default: EN)",
     )
-    parser.add_argument(
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument(
         "-t",
         "--target",
-        required=True,
-        type=str.upper,
-        help="Target language (required)",
+        type=parse_targets,
+        help="Target language, or a comma-separated list of languages built concurrently",
+    )
+    target_group.add_argument(
+        "--all",
+        action="store_true",
+        help="Build decks for all supported target languages concurrently",
     )
     parser.add_argument(
         "-c",
         "--count",
         default=5,
-        type=int,
+        type=parse_positive_int,
         help="Maximum number of sentences to translate (default: 5)",
     )
     parser.add_argument(
@@ -43,6 +89,88 @@ def build_argument_parser() -> argparse.ArgumentParser:
         type=str.lower,
         help="LLM model to use (default: gpt-4o for openai, gemini-3-flash-preview for gemini)",
     )
+    parser.add_argument(
+        "--chunk-size",
+        default=20,
+        type=parse_positive_int,
+        help="Maximum number of sentences per translation request (default: 20)",
+    )
+    parser.add_argument(
+        "--workers",
+        default=4,
+        type=parse_positive_int,
+        help="Maximum number of concurrent translation requests (default: 4)",
+    )
+    parser.add_argument(
+        "--rpm",
+        default=None,
+        type=parse_positive_float,
+        help="Maximum LLM requests per minute for the selected model, or for each model with --fanout (default: unlimited)",
+    )
+    parser.add_argument(
+        "--tpm",
+        default=None,
+        type=parse_positive_float,
+        help="Maximum estimated LLM tokens per minute for the selected model, or for each model with --fanout (default: unlimited)",
+    )
+    parser.add_argument(
+        "--fanout",
+        default=None,
+        type=parse_weights,
+        metavar="API=WEIGHT,...",
+        help="Spread translation chunks over several APIs by weight, e.g. gemini=2,openai=1",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        default=None,
+        type=float,
+        help="With --fanout, duplicate requests slower than this latency percentile to another API",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Overlap Notion, translation and image stages in a streaming pipeline",
+    )
+    parser.add_argument(
+        "--image-workers",
+        default=4,
+        type=parse_positive_int,
+        help="Number of concurrent image jobs in streaming mode (default: 4)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only export notes that are new or changed since the last export",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the last interrupted run from its journal instead of starting over",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Translate through the provider's batch API, resuming a pending job if one exists",
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="?",
+        const="table",
+        choices=["table", "json"],
+        default=None,
+        help="Print per-stage timings and counters after the run as a table or JSON",
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the local translation and image caches",
+    )
+    cache_group.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached translations and images and overwrite them with fresh ones",
+    )
     return parser
 
 
@@ -57,4 +185,6 @@ def setup_logger() -> None:
 
 
 def load_environment() -> None:
+    from dotenv import load_dotenv
+
     load_dotenv()
@@ -0,0 +1,161 @@
+import asyncio
+import inspect
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import requests
+
+HTTP_POOL_CONNECTIONS = 10  # Number of hosts with a kept-alive connection pool
+HTTP_POOL_MAXSIZE = 16  # Connections kept alive per host
+LLM_MAX_CONNECTIONS = 16
+
+_lock = threading.Lock()
+_clients: dict[tuple[Any, ...], Any] = {}
+
+
+def configure_pools(
+    http_pool_connections: int | None = None,
+    http_pool_maxsize: int | None = None,
+    llm_max_connections: int | None = None,
+) -> None:
+    """Set pool sizes used by clients created after this call."""
+    global HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, LLM_MAX_CONNECTIONS
+    if http_pool_connections is not None:
+        HTTP_POOL_CONNECTIONS = http_pool_connections
+    if http_pool_maxsize is not None:
+        HTTP_POOL_MAXSIZE = http_pool_maxsize
+    if llm_max_connections is not None:
+        LLM_MAX_CONNECTIONS = llm_max_connections
+
+
+def _get_or_create(key: tuple[Any, ...], factory) -> Any:
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = factory()
+        return client
+
+
+def get_shared_client(key: tuple[str, ...], factory: Callable[[], Any]) -> Any:
+    """Return the object shared under key, creating it with factory on first use.
+
+    Objects with a close method are closed by close_clients.
+    """
+    return _get_or_create(key, factory)
+
+
+def get_http_session() -> "requests.Session":
+    """Return the shared keep-alive requests session for plain HTTP calls."""
+
+    def create() -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    return _get_or_create(("requests",), create)
+
+
+def get_openai_client(api_key: str):
+    """Return the shared OpenAI client for api_key."""
+
+    def create():
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI
+
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        )
+        # Retries are handled by the translation scheduler
+        return OpenAI(
+            api_key=api_key,
+            http_client=DefaultHttpxClient(limits=limits),
+            max_retries=0,
+        )
+
+    return _get_or_create(("openai", api_key), create)
+
+
+def get_async_openai_client(api_key: str):
+    """Return the shared AsyncOpenAI client for api_key on the running event loop.
+
+    Async connection pools are bound to the loop they were created on, so each
+    event loop gets its own client. The loop itself is part of the key, since
+    the id of a closed loop is reused by the next one.
+    """
+    loop = asyncio.get_running_loop()
+
+    def create():
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        )
+        return AsyncOpenAI(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+            max_retries=0,
+        )
+
+    return _get_or_create(("openai-async", api_key, loop), create)
+
+
+def _create_genai_client(api_key: str):
+    import httpx
+    from google import genai
+    from google.genai import types
+
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    )
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            client_args={"limits": limits},
+            async_client_args={"limits": limits},
+        ),
+    )
+
+
+def get_genai_client(api_key: str):
+    """Return the shared Google GenAI client for api_key."""
+    return _get_or_create(("gemini", api_key), lambda: _create_genai_client(api_key))
+
+
+def get_async_genai_client(api_key: str):
+    """Return the shared async Google GenAI client for api_key on the running loop.
+
+    Like AsyncOpenAI, its connection pool is bound to the loop it was created
+    on, so each event loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    return _get_or_create(
+        ("gemini-async", api_key, loop), lambda: _create_genai_client(api_key).aio
+    )
+
+
+def close_clients() -> None:
+    """Close and forget all shared clients.
+
+    Async clients are only forgotten, since closing them requires their loop.
+    """
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close is not None and not inspect.iscoroutinefunction(close):
+            close()
@@ -19,7 +19,27 @@ RTL_LANGUAGES = ("FA", "AR", "HE")
 
 OUTPUT_FILENAME = "flashcard_deck.apkg"
 OUTPUT_DIR = Path.cwd() / "output"
-OUTPUT_DIR.mkdir(exist_ok=True)
 OUTPUT_PATH = OUTPUT_DIR / OUTPUT_FILENAME
+MANIFEST_PATH = OUTPUT_DIR / "manifest.json"
+JOURNAL_PATH = OUTPUT_DIR / "run_journal.jsonl"
+BATCH_DIR = OUTPUT_DIR / "batch"
+BATCH_POLL_INTERVAL = 30  # seconds
+
+CACHE_DIR = OUTPUT_DIR / ".cache"
+TRANSLATION_CACHE_PATH = CACHE_DIR / "translations.sqlite3"
+TRANSLATION_CACHE_MAX_ENTRIES = 50_000
+TRANSLATION_CACHE_MAX_AGE = 90 * 24 * 60 * 60  # seconds
+IMAGE_CACHE_DIR = CACHE_DIR / "images"
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024
+IMAGE_SEARCH_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # seconds
 
 IMAGE_TARGET_BOX = (400, 180)
+IMAGE_MAX_WORKERS = 8
+IMAGE_MAX_PER_HOST = 2
+IMAGE_MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+
+def ensure_output_dir() -> Path:
+    """Create the output directory on first use and return it."""
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    return OUTPUT_DIR
@@ -0,0 +1,46 @@
+import re
+import unicodedata
+from collections.abc import Iterable, Iterator
+
+from loguru import logger
+
+from .metrics import incr
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Normalize Unicode form, whitespace and **bold** markup of a sentence.
+
+    Adjacent bold runs are merged and whitespace just inside the markers is
+    moved out, so "**a** **b**" and "**a b**" stay distinct but "**a****b**"
+    and "** ab **" become "**ab**".
+    """
+    sentence = unicodedata.normalize("NFC", sentence).replace("****", "")
+    sentence = re.sub(
+        r"\*\*(\s*)([^*]+?)(\s*)\*\*",
+        lambda m: f"{m.group(1)}**{m.group(2)}**{m.group(3)}",
+        sentence,
+    )
+    return re.sub(r"\s+", " ", sentence).strip()
+
+
+def iter_unique_sentences(sentences: Iterable[str]) -> Iterator[str]:
+    """Lazily yield normalized sentences, skipping ones already seen."""
+    seen: set[str] = set()
+    for sentence in sentences:
+        normalized = normalize_sentence(sentence)
+        if normalized in seen:
+            incr("dedup.duplicate_sentences")
+            continue
+        seen.add(normalized)
+        yield normalized
+
+
+def dedupe_sentences(sentences: list[str]) -> list[str]:
+    """Return the normalized unique sentences in first-seen order."""
+    unique = list(iter_unique_sentences(sentences))
+    duplicates = len(sentences) - len(unique)
+    if duplicates:
+        logger.info(
+            f"Collapsed {duplicates} duplicate sentence(s), {len(unique)} unique left."
+        )
+    return unique
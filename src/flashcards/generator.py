@@ -1,11 +1,25 @@
+import hashlib
+import itertools
+import json
+import os
 import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import genanki
 from loguru import logger
 
+from .metrics import incr, timer
 from .translation import TranslationItem
 
+if TYPE_CHECKING:
+    import genanki
+
 
 class FlashcardGenerationError(Exception):
     pass
@@ -16,6 +30,7 @@ class DeckGenerationError(Exception):
 
 
 BOLD_PATTERN = re.compile(r"\*\*(.*?)\*\*")
+IMG_SRC_PATTERN = re.compile(r"<img src='([^']+)'>")
 FORMAT_PATTERNS = {
     "cloze": r"{{c1::\1}}",
     "underline": r"<u>\1</u>",
@@ -54,47 +69,38 @@ CSS_RTL = CSS_LTR + """
 }
 """
 
-CLOZE_MODEL_LTR = genanki.Model(
-    1318636823,
-    "Cloze LTR language",
-    model_type=genanki.Model.CLOZE,
-    fields=[
-        {"name": "source_words"},
-        {"name": "source_sentence"},
-        {"name": "target_sentence"},
-        {"name": "image"},
-        {"name": "Back Extra"},
-    ],
-    templates=[
-        {
-            "name": "Cloze",
-            "qfmt": FRONT_TEMPLATE,
-            "afmt": BACK_TEMPLATE,
-        },
-    ],
-    css=CSS_LTR,
-)
-
-CLOZE_MODEL_RTL = genanki.Model(
-    1318636824,
-    "Cloze RTL language",
-    model_type=genanki.Model.CLOZE,
-    fields=[
-        {"name": "source_words"},
-        {"name": "source_sentence"},
-        {"name": "target_sentence", "rtl": True},
-        {"name": "image"},
-        {"name": "Back Extra"},
-    ],
-    templates=[
-        {
-            "name": "Cloze",
-            "qfmt": FRONT_TEMPLATE,
-            "afmt": BACK_TEMPLATE,
-        },
-    ],
-    css=CSS_RTL,
-)
+MODEL_IDS = {False: 1318636823, True: 1318636824}
+
+
+@cache
+def _cloze_model(is_rtl: bool) -> "genanki.Model":
+    """Return the LTR or RTL cloze note model, built on first use."""
+    import genanki
+
+    target_field = {"name": "target_sentence"}
+    if is_rtl:
+        target_field["rtl"] = True
+    return genanki.Model(
+        MODEL_IDS[is_rtl],
+        "Cloze RTL language" if is_rtl else "Cloze LTR language",
+        model_type=genanki.Model.CLOZE,
+        fields=[
+            {"name": "source_words"},
+            {"name": "source_sentence"},
+            target_field,
+            {"name": "image"},
+            {"name": "Back Extra"},
+        ],
+        templates=[
+            {
+                "name": "Cloze",
+                "qfmt": FRONT_TEMPLATE,
+                "afmt": BACK_TEMPLATE,
+            },
+        ],
+        css=CSS_RTL if is_rtl else CSS_LTR,
+    )
+
 
 def _convert_bold_text(sentence: str, format_type: str) -> str:
     """Replace **word** with {{c1::word}} or <u>word</u> based on format_type."""
@@ -103,35 +109,171 @@ def _convert_bold_text(sentence: str, format_type: str) -> str:
     return BOLD_PATTERN.sub(FORMAT_PATTERNS[format_type], sentence)
 
 
+def _note_guid(translation: TranslationItem) -> str:
+    """Return a stable note GUID derived from the original Notion sentence.
+
+    Translation keeps sentence_target exactly as requested, so the GUID does not
+    change when the model words its echo differently between runs.
+    """
+    import genanki
+
+    return genanki.guid_for(translation.sentence_target.strip())
+
+
+def _fields_hash(fields: list[str]) -> str:
+    """Hash the fields of a note, including its image tags.
+
+    Media files are named after their content, so the image field only changes
+    when the note gains, loses or swaps an image.
+    """
+    return hashlib.sha256("\x1f".join(fields).encode()).hexdigest()
+
+
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest(manifest_path: Path, deck_name: str) -> dict[str, str]:
+    """Return the GUID -> fields hash mapping of notes already exported to a deck."""
+    if not manifest_path.exists():
+        return {}
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+    return manifest.get(deck_name, {})
+
+
+def _save_manifest(
+    manifest_path: Path,
+    deck_name: str,
+    exported: dict[str, str],
+) -> None:
+    """Atomically record exported notes of a deck in the manifest file.
+
+    Decks built concurrently share the manifest, so updates are serialized.
+    """
+    with _manifest_lock:
+        manifest = {}
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                manifest = {}
+        manifest.setdefault(deck_name, {}).update(exported)
+
+        tmp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")  # fmt: skip
+        os.replace(tmp_path, manifest_path)
+
+
+def _write_package(
+    deck: "genanki.Deck", output_path: Path, media: dict[str, bytes | Path]
+) -> None:
+    """Write deck to an .apkg, storing media bytes straight into the zip.
+
+    Mirrors genanki.Package.write_to_file, which only accepts media file
+    paths. The package is assembled next to output_path and moved into place,
+    so a failed write never leaves a truncated deck behind.
+    """
+    import genanki
+
+    fd, db_path = tempfile.mkstemp(suffix=".anki2")
+    os.close(fd)
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            timestamp = time.time()
+            id_gen = itertools.count(int(timestamp * 1000))
+            genanki.Package(deck).write_to_db(conn.cursor(), timestamp, id_gen)
+            conn.commit()
+        finally:
+            conn.close()
+
+        names = list(media)
+        with zipfile.ZipFile(tmp_path, "w") as outzip:
+            outzip.write(db_path, "collection.anki2")
+            outzip.writestr("media", json.dumps(dict(enumerate(names))))
+            for idx, name in enumerate(names):
+                data = media[name]
+                if isinstance(data, bytes):
+                    outzip.writestr(str(idx), data)
+                else:
+                    outzip.write(data, str(idx))
+        os.replace(tmp_path, output_path)
+    finally:
+        os.unlink(db_path)
+        tmp_path.unlink(missing_ok=True)
+
+
 def generate_cloze_deck(
     deck_name: str,
     translated_content: list[TranslationItem],
     output_path: str | Path,
-    img_files: list[Path] | None,
+    media: dict[str, bytes | Path] | None,
     img_tags_list: list[str] | None,
     is_rtl: bool = False,
-) -> None:
-    """Generate a file with a deck of anki cloze cards."""
+    manifest_path: Path | None = None,
+) -> int:
+    """Generate a file with a deck of anki cloze cards and return the note count.
+
+    Notes get GUIDs derived from their original Notion sentence, so re-importing
+    a deck updates existing notes instead of duplicating them. With manifest_path,
+    only notes that are new or changed since the last export are written, and the
+    package is skipped entirely when there are none. media maps file names
+    referenced by image tags to their bytes or to a file on disk.
+    """
+    import genanki
+
     deck = genanki.Deck(DECK_ID, deck_name)
     img_tags_iter = img_tags_list or [None] * len(translated_content)
+    exported = _load_manifest(manifest_path, deck_name) if manifest_path else {}
+    new_entries: dict[str, str] = {}
+    img_names: set[str] = set()
 
     for translation, img_tags in zip(translated_content, img_tags_iter):
         if not isinstance(translation, TranslationItem):
             logger.warning(f"Skipping translation due to invalid content: {translation}")  # fmt:skip
             continue
+        fields = [
+            f"<i>{translation.words_source}</i>",
+            f"<i>{_convert_bold_text(translation.sentence_source, 'underline')}</i>",
+            f"{_convert_bold_text(translation.sentence_target, 'cloze')}",
+            img_tags or "",
+            "",
+        ]
+        guid = _note_guid(translation)
+        if guid in new_entries:
+            logger.warning(f"Skipping duplicate sentence: {translation.sentence_target}")  # fmt:skip
+            continue
+        fields_hash = _fields_hash(fields)
+        if manifest_path and exported.get(guid) == fields_hash:
+            continue
         note = genanki.Note(
-            model=CLOZE_MODEL_RTL if is_rtl else CLOZE_MODEL_LTR,
-            fields=[
-                f"<i>{translation.words_source}</i>",
-                f"<i>{_convert_bold_text(translation.sentence_source, 'underline')}</i>",
-                f"{_convert_bold_text(translation.sentence_target, 'cloze')}",
-                img_tags or "",
-                "",
-            ],
+            model=_cloze_model(is_rtl),
+            fields=fields,
+            guid=guid,
         )
         deck.add_note(note)
+        new_entries[guid] = fields_hash
+        img_names.update(IMG_SRC_PATTERN.findall(img_tags or ""))
+
+    if manifest_path and not deck.notes:
+        logger.info("No new or changed notes since the last export.")
+        return 0
+
+    media = media or {}
+    if manifest_path:
+        media = {name: data for name, data in media.items() if name in img_names}
 
     try:
-        genanki.Package(deck, media_files=img_files).write_to_file(output_path)
+        with timer("deck.write"):
+            _write_package(deck, Path(output_path), media)
     except Exception as e:
         raise DeckGenerationError(f"Failed to write deck: {e}") from e
+
+    if manifest_path:
+        _save_manifest(manifest_path, deck_name, new_entries)
+    incr("deck.notes", len(deck.notes))
+    return len(deck.notes)
@@ -1,11 +1,168 @@
+import hashlib
+import json
+import multiprocessing
 import os
+import threading
 import uuid
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from io import BytesIO
 from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
-import requests
 from loguru import logger
-from PIL import Image
+
+from .cache import SQLiteCache
+from .clients import get_http_session
+from .metrics import incr, timer
+
+if TYPE_CHECKING:
+    import requests
+
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+
+
+class ImageTooLargeError(Exception):
+    pass
+
+
+class _HostLimiter:
+    """Cap the number of concurrent downloads from any single host."""
+
+    def __init__(self, max_per_host: int) -> None:
+        if max_per_host <= 0:
+            raise ValueError("max_per_host must be > 0")
+        self._lock = threading.Lock()
+        self._semaphores: defaultdict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(max_per_host)
+        )
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores[host]
+        with semaphore:
+            yield
+
+
+_HOST_LIMITERS: dict[int, _HostLimiter] = {}
+_host_limiters_lock = threading.Lock()
+
+
+def _get_host_limiter(max_per_host: int) -> _HostLimiter:
+    """Return the host limiter shared by all concurrent image fetches."""
+    with _host_limiters_lock:
+        limiter = _HOST_LIMITERS.get(max_per_host)
+        if limiter is None:
+            limiter = _HOST_LIMITERS[max_per_host] = _HostLimiter(max_per_host)
+        return limiter
+
+
+class ImageCache:
+    """Persistent cache of image search results and processed JPEG files.
+
+    Search results map a query to its image URLs. Each processed image is
+    stored once under its media filename, so URLs and boxes that yield the same
+    JPEG share a file, and the least recently used files are evicted on close
+    when the cache exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_bytes: int | None = None,
+        max_search_age: float | None = None,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.files_dir = self.cache_dir / "files"
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._searches = SQLiteCache(
+            self.cache_dir / "searches.sqlite3", max_age_seconds=max_search_age
+        )
+        self._images = SQLiteCache(self.cache_dir / "images.sqlite3")
+
+    def __enter__(self) -> "ImageCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_urls(self, query: str) -> list[str] | None:
+        """Return cached search result URLs for query, if any."""
+        value = self._searches.get(query)
+        return None if value is None else json.loads(value)
+
+    def set_urls(self, query: str, urls: list[str]) -> None:
+        self._searches.set(query, json.dumps(urls))
+
+    def get_image(self, url: str, box: tuple[int, int]) -> Path | None:
+        """Return the processed image file for url and box, if cached."""
+        key = self._image_key(url, box)
+        filename = self._images.get(key)
+        if filename is None:
+            return None
+        path = self.files_dir / filename
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except FileNotFoundError:
+            self._images.delete(key)
+            return None
+        return path
+
+    def put_image(
+        self,
+        url: str,
+        box: tuple[int, int],
+        jpeg: bytes,
+    ) -> Path:
+        """Store processed JPEG bytes for url and box under their media filename."""
+        path = self.files_dir / media_filename(jpeg)
+        if not path.exists():
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(jpeg)
+            os.replace(tmp_path, path)
+        self._images.set(self._image_key(url, box), path.name)
+        return path
+
+    def evict(self) -> int:
+        """Delete least recently used files above max_bytes; return how many."""
+        if self.max_bytes is None:
+            return 0
+        files = []
+        for path in self.files_dir.glob("*.jpg"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def close(self) -> None:
+        self.evict()
+        self._searches.close()
+        self._images.close()
+
+    @staticmethod
+    def _image_key(url: str, box: tuple[int, int]) -> str:
+        return f"{box[0]}x{box[1]}:{url}"
 
 
 def _get_credentials() -> tuple[str, str]:
@@ -35,7 +192,8 @@ def _search_images(api_key: str, eng_id: str, query: str, num: int = 10) -> list
         "searchType": "image",
         "num": min(num, 10),
     }
-    resp = requests.get(base_url, params=params, timeout=1)
+    with timer("images.search"):
+        resp = get_http_session().get(base_url, params=params, timeout=1)
     if resp.status_code != 200:
         try:
             err = resp.json().get("error", {}).get("message")
@@ -48,90 +206,272 @@ def _search_images(api_key: str, eng_id: str, query: str, num: int = 10) -> list
     return [item.get("link") for item in items if item.get("link")]
 
 
+def _download_image(
+    session: "requests.Session",
+    url: str,
+    timeout: int = 1,
+    host_limiter: _HostLimiter | None = None,
+    max_bytes: int | None = None,
+) -> bytes:
+    """Download the raw bytes of an image, refusing bodies above max_bytes.
+
+    The body is streamed, so an oversized image is rejected from its
+    Content-Length header or aborted as soon as it grows past max_bytes.
+    """
+    limit = nullcontext() if host_limiter is None else host_limiter.limit(url)
+    with timer("images.download"), limit:
+        with session.get(url, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            length = resp.headers.get("Content-Length", "")
+            if max_bytes is not None and length.isdigit() and int(length) > max_bytes:
+                incr("images.oversized")
+                raise ImageTooLargeError(f"Image of {length} bytes exceeds {max_bytes} bytes")  # fmt: skip
+            data = bytearray()
+            for chunk in resp.iter_content(_DOWNLOAD_CHUNK_SIZE):
+                data += chunk
+                if max_bytes is not None and len(data) > max_bytes:
+                    incr("images.oversized")
+                    raise ImageTooLargeError(f"Image exceeds {max_bytes} bytes")
+    incr("images.bytes_downloaded", len(data))
+    return bytes(data)
+
+
+def _process_image(data: bytes, box: tuple[int, int], quality: int = 85) -> bytes:
+    """Decode image bytes, shrink them to fit within box and encode as JPEG.
+
+    Runs in a worker process, so it takes and returns plain bytes. JPEG sources
+    are decoded at a reduced scale with draft(), which avoids materializing the
+    full-size image.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", box)
+        if img.mode == "P" and "transparency" in img.info:
+            img = img.convert("RGBA")
+        img.thumbnail(box)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _run_process_image(
+    data: bytes, box: tuple[int, int], processor: Executor | None = None
+) -> bytes:
+    """Process image bytes in processor, or in the calling thread without one."""
+    with timer("images.process"):
+        if processor is None:
+            return _process_image(data, box)
+        return processor.submit(_process_image, data, box).result()
+
+
 def _fetch_images(
     urls: list[str],
     n: int,
+    box: tuple[int, int],
     timeout: int = 1,
-) -> list[Image.Image]:
-    """Download images into memory and return PIL Image objects."""
+    host_limiter: _HostLimiter | None = None,
+    processor: Executor | None = None,
+    max_bytes: int | None = None,
+) -> list[bytes]:
+    """Download and process up to n images, returning their JPEG bytes."""
     if n <= 0:
         raise ValueError("n must be > 0")
 
-    session = requests.Session()
-    images: list[Image.Image] = []
+    import requests
+
+    session = get_http_session()
+    images: list[bytes] = []
     for url in urls:
         if len(images) >= n:
             break
         try:
-            resp = session.get(url, timeout=timeout)
-            resp.raise_for_status()
-            with Image.open(BytesIO(resp.content)) as img:
-                if img.mode == "P" and "transparency" in img.info:
-                    img = img.convert("RGBA")
-                images.append(img.copy())
-        except (requests.RequestException, OSError) as e:
+            data = _download_image(session, url, timeout, host_limiter, max_bytes)
+            images.append(_run_process_image(data, box, processor))
+        except (requests.RequestException, OSError, ImageTooLargeError) as e:
+            incr("images.download_errors")
             logger.debug(f"Failed to fetch image {url}: {e}")
             continue
     return images
 
 
-def _resize_image(
-    img: Image.Image,
-    box: tuple[int, int],
-) -> Image.Image:
-    """Return a resized copy of the image fitting within box."""
-    resized = img.copy()
-    resized.thumbnail(box)
-    return resized
+def get_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Return the shared process pool for CPU-bound image processing.
+
+    Workers are spawned rather than forked, since the pool is created while
+    download threads may already be running.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared image process pool, if it was started."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown()
 
 
-def _save_image(img: Image.Image, out_path: Path, quality: int = 85) -> Path:
-    """Save a PIL image to disk and return the path."""
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+def media_filename(data: bytes, ext: str = ".jpg") -> str:
+    """Return a filename derived from the content hash of data.
 
-    if img.mode != "RGB":
-        img = img.convert("RGB")
+    Identical images get the same name, so they are stored once per package
+    and once in Anki's media folder, however many notes use them.
+    """
+    return f"{hashlib.sha256(data).hexdigest()[:32]}{ext}"
 
-    img.save(out_path, format="JPEG", quality=quality)
-    return out_path
 
+def _get_image_set(
+    api_key: str,
+    cx: str,
+    query: str,
+    imgs_per_query: int,
+    box: tuple[int, int],
+    host_limiter: _HostLimiter,
+    processor: Executor | None = None,
+    max_bytes: int | None = None,
+) -> tuple[dict[str, bytes], str]:
+    """Fetch and resize images for a single query, keeping them in memory."""
+    urls = _search_images(api_key, cx, query)
+    images = _fetch_images(
+        urls,
+        imgs_per_query,
+        box,
+        host_limiter=host_limiter,
+        processor=processor,
+        max_bytes=max_bytes,
+    )
+    media = {media_filename(jpeg): jpeg for jpeg in images}
+    return media, "".join(f"<img src='{name}'>" for name in media)
+
+
+def _get_cached_image_set(
+    api_key: str,
+    cx: str,
+    query: str,
+    imgs_per_query: int,
+    box: tuple[int, int],
+    host_limiter: _HostLimiter,
+    cache: ImageCache,
+    refresh: bool = False,
+    processor: Executor | None = None,
+    max_bytes: int | None = None,
+) -> tuple[dict[str, Path], str]:
+    """Return images for a single query, reusing cached searches and files."""
+    urls = None if refresh else cache.get_urls(query)
+    if urls is None:
+        urls = _search_images(api_key, cx, query)
+        cache.set_urls(query, urls)
+    else:
+        incr("images.search_cache_hits")
+
+    import requests
 
-def _generate_filename_from_query(query: str, ext: str = ".jpg") -> str:
-    """Generate a unique filename based on the query."""
-    name = query.split(",")[0]
-    uid = uuid.uuid4().hex
-    return f"{name}-{uid}{ext}"
+    session = get_http_session()
+    img_file_paths: list[Path] = []
+    for url in urls:
+        if len(img_file_paths) >= imgs_per_query:
+            break
+        path = None if refresh else cache.get_image(url, box)
+        if path is not None:
+            incr("images.file_cache_hits")
+        else:
+            try:
+                data = _download_image(
+                    session, url, host_limiter=host_limiter, max_bytes=max_bytes
+                )
+                jpeg = _run_process_image(data, box, processor)
+            except (requests.RequestException, OSError, ImageTooLargeError) as e:
+                incr("images.download_errors")
+                logger.debug(f"Failed to fetch image {url}: {e}")
+                continue
+            path = cache.put_image(url, box, jpeg)
+        img_file_paths.append(path)
+    media = {path.name: path for path in img_file_paths}
+    return media, "".join(f"<img src='{name}'>" for name in media)
 
 
 def get_multiple_image_sets(
     queries: list[str],
-    out_dir: Path,
     imgs_per_query: int = 5,
     box: tuple[int, int] = (400, 200),
-) -> tuple[list[Path], list[str]]:
-    """Fetch, resize, and save images for multiple queries."""
+    max_workers: int = 8,
+    max_per_host: int = 2,
+    cache: ImageCache | None = None,
+    refresh: bool = False,
+    processor: Executor | None = None,
+    max_download_bytes: int | None = None,
+) -> tuple[dict[str, bytes | Path], list[str]]:
+    """Fetch and resize images for multiple queries concurrently.
+
+    Returns media mapping each file name to its JPEG bytes, and image tags in
+    the same order as queries. Repeated queries are searched only once. With a
+    cache, media point to files in the cache directory instead of holding bytes.
+    Decoding and resizing run in processor, e.g. get_process_pool(), or in
+    the download threads without one. Source images larger than
+    max_download_bytes are skipped. At most max_per_host downloads run against
+    any one host, counted across all calls running at the same time. A query
+    whose search or download fails is logged and gets an empty tag.
+    """
     api_key, cx = _get_credentials()
+    host_limiter = _get_host_limiter(max_per_host)
 
-    img_file_paths: list[Path] = []
+    media: dict[str, bytes | Path] = {}
     img_tags_list = []
+    if not queries:
+        return media, img_tags_list
 
-    for query in queries:
-        urls = _search_images(api_key, cx, query)
-        images = _fetch_images(urls, n=imgs_per_query)
-        img_tags = []
-        for img in images:
-            resized = _resize_image(img, box)
-            filename = _generate_filename_from_query(query, ext=".jpg")
-            out_path = out_dir / filename
-            img_file_paths.append(_save_image(resized, out_path))
-            img_tags.append(f"<img src='{filename}'>")
-        img_tags_list.append("".join(img_tags))
-
-    return img_file_paths, img_tags_list
-
-
-def delete_files(files: list[Path]) -> None:
-    """Delete files from disk."""
-    for file in files:
-        if file.exists():
-            file.unlink()
+    def get_image_set(query: str) -> tuple[dict, str]:
+        # One failed search must not discard the images of all other queries
+        try:
+            if cache is None:
+                return _get_image_set(
+                    api_key,
+                    cx,
+                    query,
+                    imgs_per_query,
+                    box,
+                    host_limiter,
+                    processor=processor,
+                    max_bytes=max_download_bytes,
+                )
+            return _get_cached_image_set(
+                api_key,
+                cx,
+                query,
+                imgs_per_query,
+                box,
+                host_limiter,
+                cache,
+                refresh=refresh,
+                processor=processor,
+                max_bytes=max_download_bytes,
+            )
+        except Exception as e:
+            incr("images.query_errors")
+            logger.warning(f"Failed to get images for '{query}': {e}")
+            return {}, ""
+
+    unique_queries = list(dict.fromkeys(queries))
+    if len(unique_queries) < len(queries):
+        incr("images.duplicate_queries", len(queries) - len(unique_queries))
+
+    tags_by_query: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_queries)))) as pool:  # fmt: skip
+        results = pool.map(get_image_set, unique_queries)
+        for query, (query_media, img_tags) in zip(unique_queries, results):
+            media.update(query_media)
+            tags_by_query[query] = img_tags
+    img_tags_list = [tags_by_query[query] for query in queries]
+
+    return media, img_tags_list
@@ -0,0 +1,140 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from .translation import TranslationItem
+
+
+class RunJournal:
+    """Append-only record of completed work units, used to resume a failed run.
+
+    Every record is a JSON line flushed to disk as soon as its work unit
+    finishes. Loading stops at the first unreadable line, so a write cut short
+    by a crash only loses that unit. A journal written for different run
+    parameters is discarded.
+    """
+
+    def __init__(
+        self, path: Path, params: dict[str, Any], resume: bool = False
+    ) -> None:
+        self.path = Path(path)
+        self.params = params
+        self.sentences: list[str] | None = None
+        self.translations: dict[int, tuple[int, list[TranslationItem]]] = {}
+        self.images: dict[int, tuple[list[str], dict[str, Path], list[str]]] = {}
+
+        if resume and self._load():
+            logger.info(
+                f"Resuming run from {self.path}: "
+                f"{len(self.translations)} translation and {len(self.images)} image batch(es) done."  # fmt: skip
+            )
+            return
+        if resume:
+            logger.warning("No matching run journal found, starting a new run.")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("", encoding="utf-8")
+        self._append({"type": "run", "params": params})
+
+    def _load(self) -> bool:
+        """Read completed work units; return False if there is nothing to resume."""
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return False
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+        if not records or records[0] != {"type": "run", "params": self.params}:
+            return False
+
+        for record in records[1:]:
+            kind = record.get("type")
+            if kind == "sentences":
+                self.sentences = record["sentences"]
+            elif kind == "translations":
+                items = [TranslationItem.model_validate(i) for i in record["items"]]
+                self.translations[record["start"]] = (record["count"], items)
+            elif kind == "images":
+                media = {name: Path(p) for name, p in record["media"].items()}
+                queries, tags = record["queries"], record["tags"]
+                self.images[record["start"]] = (queries, media, tags)
+        return True
+
+    def _append(self, record: dict[str, Any]) -> None:
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_sentences(self, sentences: list[str]) -> None:
+        self.sentences = sentences
+        self._append({"type": "sentences", "sentences": sentences})
+
+    def record_translations(
+        self, start: int, count: int, items: list[TranslationItem]
+    ) -> None:
+        """Record the translations of count sentences starting at index start."""
+        self.translations[start] = (count, items)
+        self._append(
+            {
+                "type": "translations",
+                "start": start,
+                "count": count,
+                "items": [item.model_dump() for item in items],
+            }
+        )
+
+    def record_images(
+        self,
+        start: int,
+        queries: list[str],
+        media: dict[str, bytes | Path],
+        tags: list[str],
+    ) -> None:
+        """Record the images fetched for queries starting at index start.
+
+        Only media stored in files can be recorded. Batches held in memory are
+        skipped and fetched again on resume.
+        """
+        if not all(isinstance(data, Path) for data in media.values()):
+            return
+        self.images[start] = (queries, media, tags)
+        self._append(
+            {
+                "type": "images",
+                "start": start,
+                "queries": queries,
+                "media": {name: str(path) for name, path in media.items()},
+                "tags": tags,
+            }
+        )
+
+    def get_translations(self, start: int, count: int) -> list[TranslationItem] | None:
+        """Return recorded translations for the batch, or None if not done."""
+        done = self.translations.get(start)
+        if done is None or done[0] != count:
+            return None
+        return done[1]
+
+    def get_images(
+        self, start: int, queries: list[str]
+    ) -> tuple[dict[str, Path], list[str]] | None:
+        """Return recorded images for the batch if all of its files still exist."""
+        done = self.images.get(start)
+        if done is None or done[0] != queries:
+            return None
+        _, media, tags = done
+        if not all(path.exists() for path in media.values()):
+            return None
+        return media, tags
+
+    def complete(self) -> None:
+        """Remove the journal once the run has finished."""
+        self.path.unlink(missing_ok=True)
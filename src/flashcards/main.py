@@ -1,104 +1,431 @@
+import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from itertools import islice
+from pathlib import Path
 
 from loguru import logger
 
 from .cli import build_argument_parser, load_environment, setup_logger
 from .config import (
+    BATCH_DIR,
+    BATCH_POLL_INTERVAL,
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_MAX_DOWNLOAD_BYTES,
+    IMAGE_MAX_PER_HOST,
+    IMAGE_MAX_WORKERS,
+    IMAGE_SEARCH_CACHE_MAX_AGE,
     IMAGE_TARGET_BOX,
+    JOURNAL_PATH,
     LANGUAGE_CODE_MAP,
     LANGUAGE_DECK_MAP,
-    OUTPUT_DIR,
+    MANIFEST_PATH,
     OUTPUT_PATH,
     RTL_LANGUAGES,
+    TRANSLATION_CACHE_MAX_AGE,
+    TRANSLATION_CACHE_MAX_ENTRIES,
+    TRANSLATION_CACHE_PATH,
+    ensure_output_dir,
 )
 
 
 def main() -> None:
     """Generate anki cloze deck from sentences in the Notion page."""
     setup_logger()
-    load_environment()
     parser = build_argument_parser()
     args = parser.parse_args()
+    load_environment()
+
+    try:
+        _generate_decks(args)
+    finally:
+        from .clients import close_clients
+        from .images import shutdown_process_pool
+
+        close_clients()
+        shutdown_process_pool()
+        if args.metrics:
+            _report_metrics(args.metrics)
+
+
+def _report_metrics(output_format: str) -> None:
+    """Print collected per-stage timings and counters."""
+    from .metrics import metrics
+
+    if output_format == "json":
+        print(metrics.to_json())
+    else:
+        print(metrics.format_table())
+
+
+def _generate_decks(args: argparse.Namespace) -> None:
+    """Set up shared clients and caches, then build a deck per target language."""
+    source_lang = args.source
+    targets = list(LANGUAGE_DECK_MAP) if args.all else args.target
+    if source_lang not in LANGUAGE_CODE_MAP:
+        logger.error(f"Unsupported source language: {source_lang}")
+        sys.exit(1)
+    for target_lang in targets:
+        if target_lang not in LANGUAGE_DECK_MAP:
+            logger.error(f"Unsupported target language: {target_lang}")
+            sys.exit(1)
+    if args.resume and args.stream:
+        logger.error("--resume is not supported together with --stream")
+        sys.exit(1)
+    if args.batch and (args.stream or args.fanout):
+        logger.error("--batch is not supported together with --stream or --fanout")
+        sys.exit(1)
+
+    ensure_output_dir()
+
+    from .cache import SQLiteCache
+    from .clients import configure_pools
+    from .images import ImageCache, get_multiple_image_sets, get_process_pool
+    from .translation import stream_translations, translate_sentences
+
+    # Languages run concurrently, so pools are sized for all of them at once
+    configure_pools(
+        http_pool_maxsize=max(IMAGE_MAX_WORKERS, args.image_workers) * len(targets),
+        llm_max_connections=args.workers * len(targets),
+    )
+
+    translation_cache = None
+    image_cache = None
+    if not args.no_cache:
+        translation_cache = SQLiteCache(
+            TRANSLATION_CACHE_PATH,
+            max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+            max_age_seconds=TRANSLATION_CACHE_MAX_AGE,
+        )
+        image_cache = ImageCache(
+            IMAGE_CACHE_DIR,
+            max_bytes=IMAGE_CACHE_MAX_BYTES,
+            max_search_age=IMAGE_SEARCH_CACHE_MAX_AGE,
+        )
+
+    if args.batch:
+        from .batch import translate_sentences_batch
+
+        translate = partial(
+            translate_sentences_batch,
+            source_lang=source_lang,
+            api=args.api,
+            model=args.model,
+            chunk_size=args.chunk_size,
+            cache=translation_cache,
+            refresh=args.refresh,
+            job_dir=BATCH_DIR,
+            poll_interval=BATCH_POLL_INTERVAL,
+        )
+    else:
+        translate = partial(
+            translate_sentences,
+            source_lang=source_lang,
+            api=args.api,
+            model=args.model,
+            chunk_size=args.chunk_size,
+            max_workers=args.workers,
+            cache=translation_cache,
+            refresh=args.refresh,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            fanout=args.fanout,
+            hedge_percentile=args.hedge_percentile,
+        )
+    # The streaming pipeline consumes each translation as soon as it is generated
+    stream_translate = partial(
+        stream_translations,
+        source_lang=source_lang,
+        api=args.api,
+        model=args.model,
+        chunk_size=args.chunk_size,
+        cache=translation_cache,
+        refresh=args.refresh,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        fanout=args.fanout,
+        hedge_percentile=args.hedge_percentile,
+    )
+    fetch_images = partial(
+        get_multiple_image_sets,
+        imgs_per_query=1,
+        box=IMAGE_TARGET_BOX,
+        max_workers=IMAGE_MAX_WORKERS,
+        max_per_host=IMAGE_MAX_PER_HOST,
+        cache=image_cache,
+        refresh=args.refresh,
+        processor=get_process_pool(),
+        max_download_bytes=IMAGE_MAX_DOWNLOAD_BYTES,
+    )
+    generate = partial(
+        _generate_deck,
+        args,
+        translate=translate,
+        stream_translate=stream_translate,
+        fetch_images=fetch_images,
+    )
+
+    try:
+        if len(targets) == 1:
+            if not generate(targets[0], OUTPUT_PATH, JOURNAL_PATH):
+                sys.exit(1)
+            return
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="deck") as pool:  # fmt: skip
+            futures = {
+                target_lang: pool.submit(
+                    generate,
+                    target_lang,
+                    _language_path(OUTPUT_PATH, target_lang),
+                    _language_path(JOURNAL_PATH, target_lang),
+                )
+                for target_lang in targets
+            }
+            # One language failing, however unexpectedly, must not stop the others
+            for target_lang, future in futures.items():
+                try:
+                    if future.result():
+                        continue
+                except Exception:
+                    logger.exception(f"Deck generation for {target_lang} failed")
+                failed.append(target_lang)
+        if failed:
+            logger.error(f"Failed to generate decks for: {', '.join(failed)}")
+            sys.exit(1)
+    finally:
+        if translation_cache is not None:
+            translation_cache.close()
+        if image_cache is not None:
+            image_cache.close()
+
+
+def _language_path(path: Path, target_lang: str) -> Path:
+    """Return path with the target language appended to its name."""
+    return path.with_name(f"{path.stem}_{target_lang.lower()}{path.suffix}")
 
-    source_lang, target_lang, sentence_count, api, model = (
+
+def _generate_deck(
+    args: argparse.Namespace,
+    target_lang: str,
+    output_path: Path,
+    journal_path: Path,
+    translate,
+    stream_translate,
+    fetch_images,
+) -> bool:
+    """Run the Notion, translation, image and deck stages for one target language.
+
+    Return False, after logging why, if the deck could not be generated.
+    """
+    source_lang, sentence_count, api, model = (
         args.source,
-        args.target,
         args.count,
         args.api,
         args.model,
     )
-    if source_lang not in LANGUAGE_CODE_MAP:
-        logger.error(f"Unsupported source language: {source_lang}")
-        sys.exit(1)
-    if target_lang not in LANGUAGE_DECK_MAP:
-        logger.error(f"Unsupported target language: {target_lang}")
-        sys.exit(1)
 
+    from .dedup import dedupe_sentences, iter_unique_sentences
     from .generator import DeckGenerationError, generate_cloze_deck
-    from .images import delete_files, get_multiple_image_sets
+    from .journal import RunJournal
+    from .metrics import timer
     from .notion import (
+        AmbiguousTitleError,
         PageEmptyError,
         PageNotFoundError,
         get_notion_client,
         get_page_content,
+        get_page_id,
+        iter_page_sentences,
     )
-    from .translation import TranslationError, translate_sentences
+    from .pipeline import run_streaming_pipeline
+    from .translation import TranslationError
 
     try:
         notion_client = get_notion_client()
     except ValueError as e:
         logger.error(f"Failed to initialize Notion client: {e}")
-        sys.exit(1)
-
-    try:
-        content = get_page_content(notion_client, target_lang, sentence_count)
-        logger.success("Page content loaded successfully.")
-    except (PageNotFoundError, PageEmptyError) as e:
-        logger.error(f"Failed to get page content: {e}")
-        sys.exit(1)
-    finally:
-        notion_client.close()
+        return False
 
-    try:
-        translated_content = translate_sentences(
-            sentences=content,
-            source_lang=source_lang,
-            api=api,
-            model=model,
+    if args.stream:
+        try:
+            page_id = get_page_id(notion_client, target_lang)
+            if not page_id:
+                raise PageNotFoundError(f"No Notion page found with title: {target_lang}")  # fmt: skip
+            with timer("stage.pipeline"):
+                streamed = run_streaming_pipeline(
+                    iter_unique_sentences(
+                        islice(iter_page_sentences(notion_client, page_id), sentence_count)  # fmt: skip
+                    ),
+                    translate=stream_translate,
+                    fetch_images=fetch_images,
+                    chunk_size=args.chunk_size,
+                    translation_workers=args.workers,
+                    image_workers=args.image_workers,
+                    stream_items=True,
+                )
+            translated_content, media, img_tags_list = streamed
+        except (PageNotFoundError, AmbiguousTitleError) as e:
+            logger.error(f"Failed to get page content: {e}")
+            return False
+        finally:
+            notion_client.close()
+        if not translated_content:
+            logger.error(f"Streaming pipeline produced no translated sentences for {target_lang}.")  # fmt: skip
+            return False
+        logger.success(f"Streaming pipeline for {target_lang} completed successfully.")
+    else:
+        journal = RunJournal(
+            journal_path,
+            {
+                "source": source_lang,
+                "target": target_lang,
+                "count": sentence_count,
+                "api": api,
+                "model": model,
+                "fanout": args.fanout,
+            },
+            resume=args.resume,
         )
-        logger.success("Translation completed successfully.")
-    except TranslationError as e:
-        logger.error(f"Translation failed: {e}")
-        sys.exit(1)
+        image_batch_size = args.chunk_size * args.workers
 
-    try:
-        img_file_paths, img_tags_list = get_multiple_image_sets(
-            queries=[item.words_source for item in translated_content],
-            out_dir=OUTPUT_DIR,
-            imgs_per_query=1,
-            box=IMAGE_TARGET_BOX,
-        )
-        logger.success("Images generated successfully.")
-    except Exception as e:
-        logger.warning(f"Image generation failed, continuing deck generation without images: {e}")  # fmt: skip
-        img_file_paths = None
-        img_tags_list = None
+        try:
+            if journal.sentences is not None:
+                content = journal.sentences
+            else:
+                with timer("stage.notion"):
+                    content = get_page_content(notion_client, target_lang, sentence_count)  # fmt: skip
+                content = dedupe_sentences(content)
+                journal.record_sentences(content)
+            logger.success(f"Page content for {target_lang} loaded successfully.")
+        except (PageNotFoundError, PageEmptyError, AmbiguousTitleError) as e:
+            logger.error(f"Failed to get page content: {e}")
+            return False
+        finally:
+            notion_client.close()
+
+        try:
+            with timer("stage.translation"):
+                # A batch job translates everything in one submission
+                translated_content = _translate_batches(
+                    journal,
+                    content,
+                    translate,
+                    len(content) if args.batch else args.chunk_size,
+                    1 if args.batch else args.workers,
+                )
+            logger.success(f"Translation for {target_lang} completed successfully.")
+        except TranslationError as e:
+            logger.error(f"Translation for {target_lang} failed: {e}")
+            return False
+
+        try:
+            with timer("stage.images"):
+                media, img_tags_list, images_complete = _fetch_image_batches(
+                    journal,
+                    [item.words_source for item in translated_content],
+                    fetch_images,
+                    image_batch_size,
+                )
+            if images_complete:
+                logger.success(f"Images for {target_lang} generated successfully.")
+            else:
+                logger.warning(f"Some images for {target_lang} could not be fetched, run again with --resume to retry them.")  # fmt: skip
+        except Exception as e:
+            logger.warning(f"Image generation for {target_lang} failed, continuing deck generation without images: {e}")  # fmt: skip
+            media = None
+            img_tags_list = None
+            images_complete = False
 
     try:
-        generate_cloze_deck(
-            LANGUAGE_DECK_MAP[target_lang],
-            translated_content,
-            OUTPUT_PATH,
-            img_file_paths,
-            img_tags_list,
-            is_rtl=target_lang in RTL_LANGUAGES,
-        )
-        if img_file_paths is not None:
-            delete_files(img_file_paths)
-        logger.success(f"Anki cloze deck generated successfully at: {OUTPUT_PATH}")
+        with timer("stage.deck"):
+            note_count = generate_cloze_deck(
+                LANGUAGE_DECK_MAP[target_lang],
+                translated_content,
+                output_path,
+                media,
+                img_tags_list,
+                is_rtl=target_lang in RTL_LANGUAGES,
+                manifest_path=MANIFEST_PATH if args.incremental else None,
+            )
+        # Keep the journal so that --resume can fill in the missing images
+        if not args.stream and images_complete:
+            journal.complete()
+        if note_count:
+            logger.success(f"Anki cloze deck with {note_count} note(s) generated successfully at: {output_path}")  # fmt: skip
     except DeckGenerationError as e:
         logger.error(str(e))
-        sys.exit(1)
+        return False
+    return True
+
+
+def _translate_batches(
+    journal, sentences: list[str], translate, batch_size: int, workers: int
+) -> list:
+    """Translate sentences in concurrent batches and return items in input order.
+
+    Journaled batches are reused. The others are submitted together and each is
+    recorded as soon as it finishes, so an interrupted run keeps every finished
+    batch and a slow batch holds up no other. A batch with untranslated
+    sentences is kept in the result but not recorded, so resume retries it.
+    """
+    from .translation import TranslationError
+
+    done = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate") as pool:  # fmt: skip
+        futures = {}
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start : start + batch_size]
+            items = journal.get_translations(start, len(batch))
+            if items is None:
+                futures[pool.submit(translate, batch)] = (start, batch)
+            else:
+                done[start] = items
+        for future in as_completed(futures):
+            start, batch = futures[future]
+            try:
+                items = future.result()
+            except TranslationError as e:
+                logger.warning(f"Skipping sentences {start}-{start + len(batch) - 1}: {e}")  # fmt: skip
+                continue
+            if len(items) == len(batch):
+                journal.record_translations(start, len(batch), items)
+            done[start] = items
+
+    translated = [item for start in sorted(done) for item in done[start]]
+    if not translated:
+        raise TranslationError("No sentences could be translated.")
+    return translated
+
+
+def _fetch_image_batches(
+    journal, queries: list[str], fetch_images, batch_size: int
+) -> tuple[dict, list[str], bool]:
+    """Fetch images batch by batch, reusing and recording journaled batches.
+
+    A batch that fails is logged and its queries get empty tags, keeping the
+    batches already fetched. The returned flag is False if any batch failed.
+    """
+    media = {}
+    img_tags_list = []
+    complete = True
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        done = journal.get_images(start, batch)
+        if done is None:
+            try:
+                done = fetch_images(batch)
+            except Exception as e:
+                logger.warning(f"Skipping images for sentences {start}-{start + len(batch) - 1}: {e}")  # fmt: skip
+                img_tags_list.extend([""] * len(batch))
+                complete = False
+                continue
+            journal.record_images(start, batch, *done)
+        media.update(done[0])
+        img_tags_list.extend(done[1])
+    return media, img_tags_list, complete
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any
+
+
+class Metrics:
+    """Thread-safe registry of timers and counters collected during a run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._timings: defaultdict[str, list[float]] = defaultdict(list)
+        self._counters: defaultdict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Record the duration of the wrapped block under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._timings[name].append(elapsed)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increase the counter name by value."""
+        with self._lock:
+            self._counters[name] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return timer statistics (in seconds) and counter values."""
+        with self._lock:
+            timings = {name: list(values) for name, values in self._timings.items()}
+            counters = dict(self._counters)
+        return {
+            "timers": {
+                name: {
+                    "count": len(values),
+                    "total": round(sum(values), 4),
+                    "mean": round(sum(values) / len(values), 4),
+                    "max": round(max(values), 4),
+                }
+                for name, values in sorted(timings.items())
+            },
+            "counters": {
+                name: int(value) if value.is_integer() else value
+                for name, value in sorted(counters.items())
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def format_table(self) -> str:
+        """Return the snapshot as a plain-text summary table."""
+        snapshot = self.snapshot()
+        lines = [f"{'timer':<28}{'count':>8}{'total s':>10}{'mean s':>10}{'max s':>10}"]
+        for name, stats in snapshot["timers"].items():
+            lines.append(
+                f"{name:<28}{stats['count']:>8}{stats['total']:>10.3f}"
+                f"{stats['mean']:>10.3f}{stats['max']:>10.3f}"
+            )
+        if snapshot["counters"]:
+            lines.append("")
+            lines.append(f"{'counter':<28}{'value':>8}")
+            for name, value in snapshot["counters"].items():
+                lines.append(f"{name:<28}{value:>8}")
+        return "\n".join(lines)
+
+
+metrics = Metrics()
+
+
+def timer(name: str):
+    """Time a block with the process-wide metrics registry."""
+    return metrics.timer(name)
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Increase a counter in the process-wide metrics registry."""
+    metrics.incr(name, value)
+
+
+def timed(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap func so that every call is timed under name."""
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with metrics.timer(name):
+            return func(*args, **kwargs)
+
+    return wrapper
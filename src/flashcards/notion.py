@@ -1,7 +1,14 @@
 import os
+from collections.abc import Iterator
+from itertools import islice
+from typing import TYPE_CHECKING
 
 from loguru import logger
-from notion_client import Client
+
+from .metrics import incr, timed
+
+if TYPE_CHECKING:
+    from notion_client import Client
 
 
 class PageNotFoundError(Exception):
@@ -16,8 +23,10 @@ class AmbiguousTitleError(Exception):
     pass
 
 
-def get_notion_client() -> Client:
+def get_notion_client() -> "Client":
     """Initialize and return a Notion API client."""
+    from notion_client import Client
+
     api_key = os.getenv("NOTION_API_KEY")
     if api_key is None:
         raise ValueError("NOTION_API_KEY environment variable is not set.")
@@ -45,15 +54,18 @@ def format_rich_text(rich_text_array: list[dict]) -> str:
     return "".join(parts)
 
 
-def get_page_id(notion_client: Client, title: str) -> str | None:
+def get_page_id(notion_client: "Client", title: str) -> str | None:
     """Search for a page by title using Notion API."""
-    response = notion_client.search(
+    from notion_client.helpers import iterate_paginated_api
+
+    results = iterate_paginated_api(
+        timed("notion.search", notion_client.search),
         query=title,
         filter={"value": "page", "property": "object"},
     )
 
     matching_results = []
-    for result in response["results"]:  # ty:ignore[not-subscriptable]
+    for result in results:
         result_title = extract_page_title(result)
         if title == result_title:
             matching_results.append(result["id"])
@@ -66,27 +78,42 @@ def get_page_id(notion_client: Client, title: str) -> str | None:
     return matching_results[0] if matching_results else None
 
 
-def get_page_content(notion_client: Client, title: str, count: int = 5) -> list[str]:
-    """Return plain text content lines of a Notion page by its title."""
-    page_id = get_page_id(notion_client, title)
-    if not page_id:
-        raise PageNotFoundError(f"No Notion page found with title: {title}")
+def iter_page_sentences(notion_client: "Client", page_id: str) -> Iterator[str]:
+    """Lazily yield formatted sentences with **bold** text from a Notion page.
 
-    response = notion_client.blocks.children.list(block_id=page_id)
-    content_lines = []
-    for block in response.get("results", []):  # ty:ignore[possibly-missing-attribute]
+    Block pages are requested one cursor at a time, so the caller controls how
+    many requests are issued by how far it consumes the iterator.
+    """
+    from notion_client.helpers import iterate_paginated_api
+
+    blocks = iterate_paginated_api(
+        timed("notion.blocks", notion_client.blocks.children.list), block_id=page_id
+    )
+    for block in blocks:
+        incr("notion.blocks_read")
         block_type = block.get("type")
         text_items = block.get(block_type, {}).get("rich_text", [])
         block_text = format_rich_text(text_items)
 
-        if block_text:
-            if "**" not in block_text:
-                logger.warning(f"Skipping sentence without **bold** text: {block_text}")
-                continue
-            content_lines.append(block_text)
-            if len(content_lines) == count:
-                break
+        if not block_text:
+            continue
+        if "**" not in block_text:
+            logger.warning(f"Skipping sentence without **bold** text: {block_text}")
+            continue
+        yield block_text
+
+
+def get_page_content(
+    notion_client: "Client", title: str, count: int = 5
+) -> list[str]:
+    """Return plain text content lines of a Notion page by its title."""
+    if count < 1:
+        raise ValueError(f"count must be at least 1, got {count}")
+    page_id = get_page_id(notion_client, title)
+    if not page_id:
+        raise PageNotFoundError(f"No Notion page found with title: {title}")
 
+    content_lines = list(islice(iter_page_sentences(notion_client, page_id), count))
     if not content_lines:
         raise PageEmptyError(
             f"Page '{title}' contains no usable content with **bold** text."
@@ -0,0 +1,138 @@
+import queue
+import threading
+from collections.abc import Callable, Iterable
+from itertools import batched
+from pathlib import Path
+
+from loguru import logger
+
+from .translation import TranslationItem
+
+_DONE = object()
+
+
+def run_streaming_pipeline(
+    sentences: Iterable[str],
+    translate: Callable[
+        [list[str]], list[TranslationItem] | Iterable[tuple[int, TranslationItem]]
+    ],
+    fetch_images: Callable[[list[str]], tuple[dict[str, bytes | Path], list[str]]]
+    | None = None,
+    chunk_size: int = 20,
+    translation_workers: int = 4,
+    image_workers: int = 4,
+    queue_size: int = 8,
+    stream_items: bool = False,
+) -> tuple[list[TranslationItem], dict[str, bytes | Path], list[str]]:
+    """Stream sentences through translation and image fetching concurrently.
+
+    Sentences are read lazily and grouped into chunks of chunk_size. Each chunk
+    is translated as soon as a translation worker is free and its items are
+    passed straight on to the image workers, with at most queue_size chunks
+    waiting between stages. With stream_items, translate yields (position,
+    item) pairs as the provider streams them, and each item is sent to the
+    image workers without waiting for the rest of its chunk; an image worker
+    fetches all items waiting at that moment together, up to chunk_size.
+    Results are returned in input order; chunks that fail to translate are
+    logged and left out, and chunks whose images fail get empty image tags.
+    """
+    if chunk_size <= 0 or translation_workers <= 0 or image_workers <= 0:
+        raise ValueError("chunk_size and worker counts must be > 0")
+
+    chunk_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    image_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    # Keyed by (chunk index, position in chunk)
+    results: dict[
+        tuple[int, int], tuple[list[TranslationItem], dict, list[str]]
+    ] = {}
+    results_lock = threading.Lock()
+    producer_errors: list[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for index, chunk in enumerate(batched(sentences, chunk_size)):
+                chunk_queue.put((index, list(chunk)))
+        except BaseException as e:
+            producer_errors.append(e)
+        finally:
+            for _ in range(translation_workers):
+                chunk_queue.put(_DONE)
+
+    def translate_chunks() -> None:
+        while (task := chunk_queue.get()) is not _DONE:
+            index, chunk = task
+            try:
+                if stream_items:
+                    for position, item in translate(chunk):
+                        image_queue.put(((index, position), [item]))
+                    continue
+                items = translate(chunk)
+            except Exception as e:
+                logger.error(f"Translation of chunk {index + 1} failed: {e}")
+                continue
+            image_queue.put(((index, 0), items))
+
+    def fetch_batch_images(tasks: list[tuple[tuple[int, int], list]]) -> None:
+        queries = [item.words_source for _, items in tasks for item in items]
+        media: dict[str, bytes | Path] = {}
+        img_tags_list = [""] * len(queries)
+        if fetch_images is not None:
+            try:
+                media, img_tags_list = fetch_images(queries)
+            except Exception as e:
+                logger.warning(f"Image generation for {len(queries)} sentence(s) failed: {e}")  # fmt: skip
+        tags = iter(img_tags_list)
+        with results_lock:
+            for n, (key, items) in enumerate(tasks):
+                results[key] = (items, media if n == 0 else {}, [next(tags) for _ in items])  # fmt: skip
+
+    def fetch_chunk_images() -> None:
+        done = False
+        while not done and (task := image_queue.get()) is not _DONE:
+            # Streamed items arrive one by one; whatever else is already waiting
+            # joins the same call, up to chunk_size sentences, so image lookups
+            # run in parallel as they do for whole chunks
+            tasks = [task]
+            while sum(len(items) for _, items in tasks) < chunk_size:
+                try:
+                    task = image_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if task is _DONE:
+                    done = True
+                    break
+                tasks.append(task)
+            fetch_batch_images(tasks)
+
+    producer = threading.Thread(target=produce, name="pipeline-producer")
+    translators = [
+        threading.Thread(target=translate_chunks, name=f"pipeline-translate-{i}")
+        for i in range(translation_workers)
+    ]
+    image_fetchers = [
+        threading.Thread(target=fetch_chunk_images, name=f"pipeline-images-{i}")
+        for i in range(image_workers)
+    ]
+    for thread in [producer, *translators, *image_fetchers]:
+        thread.start()
+
+    producer.join()
+    for thread in translators:
+        thread.join()
+    for _ in image_fetchers:
+        image_queue.put(_DONE)
+    for thread in image_fetchers:
+        thread.join()
+
+    if producer_errors:
+        raise producer_errors[0]
+
+    translations: list[TranslationItem] = []
+    media: dict[str, bytes | Path] = {}
+    img_tags_list: list[str] = []
+    for key in sorted(results):
+        items, chunk_media, tags = results[key]
+        translations.extend(items)
+        media.update(chunk_media)
+        img_tags_list.extend(tags)
+    return translations, media, img_tags_list
@@ -0,0 +1,150 @@
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+
+from .metrics import incr
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+_RETRY_BASE_DELAY = 1.0  # seconds
+_RETRY_MAX_DELAY = 60.0  # seconds
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared across workers.
+
+    Each call reserves capacity up front and is told how long to wait before
+    it may start, so concurrent callers are spread evenly over the window
+    instead of bursting into the provider's quota. Either budget may be None to
+    leave it unlimited.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ) -> None:
+        if (requests_per_minute is not None and requests_per_minute <= 0) or (
+            tokens_per_minute is not None and tokens_per_minute <= 0
+        ):
+            raise ValueError("Rate limits must be > 0")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request of tokens and return the seconds to wait first."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = max(0.0, self._blocked_until - now)
+
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60
+                self._request_allowance = min(
+                    self.requests_per_minute, self._request_allowance + elapsed * rate
+                )
+                self._request_allowance -= 1
+                if self._request_allowance < 0:
+                    wait = max(wait, -self._request_allowance / rate)
+
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60
+                self._token_allowance = min(
+                    self.tokens_per_minute, self._token_allowance + elapsed * rate
+                )
+                self._token_allowance -= min(tokens, self.tokens_per_minute)
+                if self._token_allowance < 0:
+                    wait = max(wait, -self._token_allowance / rate)
+
+        if wait > 0:
+            incr("llm.rate_limit_waits")
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of tokens fits in the budget."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async counterpart of acquire."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold back all new requests for seconds, e.g. after a 429 response."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+_RATE_LIMITERS: dict[tuple[str, str], RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    api: str,
+    model: str,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+) -> RateLimiter | None:
+    """Return the limiter shared by all calls to a provider model.
+
+    Returns None when no budget is configured. Passing new budgets for an
+    existing limiter replaces them.
+    """
+    if requests_per_minute is None and tokens_per_minute is None:
+        return None
+    with _rate_limiters_lock:
+        limiter = _RATE_LIMITERS.get((api, model))
+        if (
+            limiter is None
+            or limiter.requests_per_minute != requests_per_minute
+            or limiter.tokens_per_minute != tokens_per_minute
+        ):
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _RATE_LIMITERS[(api, model)] = limiter
+        return limiter
+
+
+def parse_retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Return the delay in seconds requested by Retry-After style headers."""
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """Return the delay before retry number attempt (starting at 1).
+
+    A server-provided Retry-After wins; otherwise exponential backoff with
+    full jitter is used.
+    """
+    if retry_after is not None:
+        return min(retry_after, _RETRY_MAX_DELAY)
+    return random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempt - 1)))  # fmt: skip
@@ -1,25 +1,72 @@
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
-from pydantic import BaseModel
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+from .cache import SQLiteCache
+from .clients import (
+    get_async_genai_client,
+    get_async_openai_client,
+    get_genai_client,
+    get_openai_client,
+    get_shared_client,
+)
+from .dedup import normalize_sentence
+from .metrics import incr, timer
+from .ratelimit import (
+    RETRYABLE_STATUS_CODES,
+    RateLimiter,
+    backoff_delay,
+    get_rate_limiter,
+    parse_retry_after,
+)
 
 
 class TranslationError(Exception):
     pass
 
 
+class RetryableTranslationError(TranslationError):
+    """A transient provider failure (rate limit, server error, timeout)."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class TranslationItem(BaseModel):
     words_source: str
     sentence_source: str
     sentence_target: str
 
 
+class IdentifiedTranslationItem(TranslationItem):
+    """A translation as returned by the provider, tagged with its input ID."""
+
+    id: int
+
+
 class TranslationResponse(BaseModel):
-    translations: list[TranslationItem]
+    translations: list[IdentifiedTranslationItem]
 
 
 class _LLMAdapter(ABC):
-    """Adapter interface for an LLM provider."""
+    """Adapter interface for an LLM provider.
+
+    Every adapter can be used both synchronously (generate) and from an event
+    loop (agenerate).
+    """
+
+    default_model: str
 
     def __init__(self, model: str | None = None) -> None:
         self.model = model
@@ -29,68 +76,524 @@ class _LLMAdapter(ABC):
         """Run the provider and return a parsed TranslationResponse."""
         raise NotImplementedError
 
+    async def agenerate(
+        self, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        """Run the provider without blocking the event loop.
+
+        Adapters without a native async client run generate in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, instructions, input_text)
+
+    def stream(
+        self, instructions: str, input_text: str
+    ) -> Iterator[IdentifiedTranslationItem]:
+        """Yield translations one by one as the provider produces them.
+
+        Adapters without a streaming API yield them once the full response
+        has arrived.
+        """
+        yield from self.generate(instructions, input_text).translations
+
+
+def _prompt_cache_key(instructions: str) -> str:
+    """Return a stable provider cache key for the instructions prefix."""
+    return "flashcards-" + hashlib.sha256(instructions.encode()).hexdigest()[:16]
+
+
+def _record_cached_tokens(cached_tokens: int | None) -> None:
+    """Count prompt tokens the provider served from its cache."""
+    if cached_tokens:
+        incr("llm.prompt_cache_hits")
+        incr("llm.cached_prompt_tokens", cached_tokens)
+
+
+class _TranslationStreamParser:
+    """Incrementally extract the objects of the "translations" array.
+
+    Text is fed as it streams in, and each array element is returned as soon
+    as its closing brace arrives. Only string and nesting state is tracked;
+    the rest of the document is not validated.
+    """
+
+    _ITEM_DEPTH = 3  # {"translations": [{...
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item: list[str] | None = None
+
+    def feed(self, text: str) -> list[dict]:
+        items = []
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "{" and self._depth == self._ITEM_DEPTH:
+                    self._item = ["{"]
+            elif char in "}]":
+                self._depth -= 1
+                if self._item is not None and self._depth < self._ITEM_DEPTH:
+                    try:
+                        items.append(json.loads("".join(self._item)))
+                    except json.JSONDecodeError:
+                        logger.debug("Ignoring unparsable streamed translation.")
+                    self._item = None
+        return items
+
+
+def _parse_stream(deltas: Iterable[str]) -> Iterator[IdentifiedTranslationItem]:
+    """Yield each translation of a streamed JSON response once it is complete."""
+    parser = _TranslationStreamParser()
+    count = 0
+    for delta in deltas:
+        for item in parser.feed(delta):
+            try:
+                translation = IdentifiedTranslationItem.model_validate(item)
+            except ValidationError:
+                logger.debug("Ignoring malformed streamed translation.")
+                continue
+            count += 1
+            yield translation
+    if not count:
+        raise RetryableTranslationError("Translation service returned empty output.")
+
 
 class _OpenAIAdapter(_LLMAdapter):
+    default_model = "gpt-4o"
+
     def generate(self, instructions: str, input_text: str) -> TranslationResponse:
-        from openai import APIError, OpenAI
+        from openai import APIError
+
+        client = get_openai_client(self._api_key())
+        try:
+            response = client.responses.parse(**self._request(instructions, input_text))
+        except APIError as e:
+            raise self._error(e) from e
+        return self._parse(response)
+
+    async def agenerate(
+        self, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        from openai import APIError
+
+        client = get_async_openai_client(self._api_key())
+        try:
+            response = await client.responses.parse(
+                **self._request(instructions, input_text)
+            )
+        except APIError as e:
+            raise self._error(e) from e
+        return self._parse(response)
+
+    def stream(
+        self, instructions: str, input_text: str
+    ) -> Iterator[IdentifiedTranslationItem]:
+        from openai import APIError
+
+        client = get_openai_client(self._api_key())
+        try:
+            with client.responses.stream(**self._request(instructions, input_text)) as stream:  # fmt: skip
+                yield from _parse_stream(
+                    event.delta
+                    for event in stream
+                    if event.type == "response.output_text.delta"
+                )
+                usage = stream.get_final_response().usage
+        except APIError as e:
+            raise self._error(e) from e
+        details = getattr(usage, "input_tokens_details", None)
+        _record_cached_tokens(getattr(details, "cached_tokens", None))
 
+    @staticmethod
+    def _api_key() -> str:
         OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
         if OPENAI_API_KEY is None:
             raise TranslationError("Missing API key for OpenAI API.")
+        return OPENAI_API_KEY
 
-        try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.responses.parse(
-                model=self.model or "gpt-4o",
-                instructions=instructions,
-                input=input_text,
-                text_format=TranslationResponse,
+    def _request(self, instructions: str, input_text: str) -> dict:
+        # Instructions come first and are identical for every chunk, and the key
+        # routes all chunks to the same cache. OpenAI only caches prompts of
+        # 1024 tokens or more, so this has no effect until a request (prompt and
+        # input together) is that long.
+        return {
+            "model": self.model or self.default_model,
+            "instructions": instructions,
+            "input": input_text,
+            "text_format": TranslationResponse,
+            "prompt_cache_key": _prompt_cache_key(instructions),
+        }
+
+    @staticmethod
+    def _error(e) -> TranslationError:
+        from openai import APIConnectionError
+
+        body = getattr(e, "body", None)
+        message = body.get("message", str(e)) if isinstance(body, dict) else str(e)
+        status = getattr(e, "status_code", None)
+        if isinstance(e, APIConnectionError) or status in RETRYABLE_STATUS_CODES:
+            response = getattr(e, "response", None)
+            return RetryableTranslationError(
+                f"OpenAI API error: {message}",
+                retry_after=parse_retry_after(getattr(response, "headers", None)),
             )
-        except APIError as e:
-            message = getattr(e, "body", {}).get("message", str(e))
-            raise TranslationError(f"OpenAI API error: {message}") from e
+        return TranslationError(f"OpenAI API error: {message}")
 
+    @staticmethod
+    def _parse(response) -> TranslationResponse:
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        _record_cached_tokens(getattr(details, "cached_tokens", None))
         parsed_response = response.output_parsed
         if not parsed_response or not parsed_response.translations:
-            raise TranslationError("Translation service returned empty output.")
+            raise RetryableTranslationError("Translation service returned empty output.")  # fmt: skip
         return parsed_response
 
 
 class _GeminiAdapter(_LLMAdapter):
+    default_model = "gemini-3-flash-preview"
+
     def generate(self, instructions: str, input_text: str) -> TranslationResponse:
-        from google import genai
-        from google.genai import types
+        import httpx
+        from google.genai.errors import APIError
+
+        client = get_genai_client(self._api_key())
+        try:
+            response = client.models.generate_content(
+                **self._request(instructions, input_text)
+            )
+        except APIError as e:
+            raise self._error(e) from e
+        except httpx.TransportError as e:
+            raise self._error(e) from e
+        return self._parse(response)
+
+    async def agenerate(
+        self, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        import httpx
         from google.genai.errors import APIError
 
+        client = get_async_genai_client(self._api_key())
+        try:
+            response = await client.models.generate_content(
+                **self._request(instructions, input_text)
+            )
+        except APIError as e:
+            raise self._error(e) from e
+        except httpx.TransportError as e:
+            raise self._error(e) from e
+        return self._parse(response)
+
+    def stream(
+        self, instructions: str, input_text: str
+    ) -> Iterator[IdentifiedTranslationItem]:
+        import httpx
+        from google.genai.errors import APIError
+
+        client = get_genai_client(self._api_key())
+        usage = None
+
+        def deltas(chunks) -> Iterator[str]:
+            nonlocal usage
+            for chunk in chunks:
+                usage = chunk.usage_metadata or usage
+                yield chunk.text or ""
+
+        try:
+            yield from _parse_stream(
+                deltas(
+                    client.models.generate_content_stream(
+                        **self._request(instructions, input_text)
+                    )
+                )
+            )
+        except APIError as e:
+            raise self._error(e) from e
+        except httpx.TransportError as e:
+            raise self._error(e) from e
+        _record_cached_tokens(getattr(usage, "cached_content_token_count", None))
+
+    @staticmethod
+    def _api_key() -> str:
         # Use "GEMINI_DEV_API_KEY" to avoid warning message from google genai when
         # having GEMINI_API_KEY and GOOGLE_API_KEY set:
         # "Both GOOGLE_API_KEY and GEMINI_API_KEY are set. Using GOOGLE_API_KEY."
         GEMINI_API_KEY = os.getenv("GEMINI_DEV_API_KEY")
         if GEMINI_API_KEY is None:
             raise TranslationError("Missing API key for Gemini API.")
+        return GEMINI_API_KEY
 
-        try:
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            response = client.models.generate_content(
-                model=self.model or "gemini-3-flash-preview",
-                contents=input_text,
-                config=types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(thinking_budget=0),
-                    system_instruction=instructions,
-                    response_mime_type="application/json",
-                    response_schema=TranslationResponse,
-                ),
+    def _request(self, instructions: str, input_text: str) -> dict:
+        from google.genai import types
+
+        return {
+            "model": self.model or self.default_model,
+            "contents": input_text,
+            "config": types.GenerateContentConfig(
+                thinking_config=types.ThinkingConfig(thinking_budget=0),
+                system_instruction=instructions,
+                response_mime_type="application/json",
+                response_schema=TranslationResponse,
+            ),
+        }
+
+    @staticmethod
+    def _error(e) -> TranslationError:
+        import httpx
+
+        # The SDK lets network failures and timeouts through as httpx errors
+        if isinstance(e, httpx.TransportError):
+            return RetryableTranslationError(f"Gemini connection error: {e!r}")
+        if e.code in RETRYABLE_STATUS_CODES:
+            response = getattr(e, "response", None)
+            return RetryableTranslationError(
+                f"Gemini API error: {e.message}",
+                retry_after=parse_retry_after(getattr(response, "headers", None)),
             )
-        except APIError as e:
-            raise TranslationError(f"Gemini API error: {e.message}") from e
+        return TranslationError(f"Gemini API error: {e.message}")
 
+    @staticmethod
+    def _parse(response) -> TranslationResponse:
+        usage = getattr(response, "usage_metadata", None)
+        _record_cached_tokens(getattr(usage, "cached_content_token_count", None))
         parsed_response = getattr(response, "parsed", None)
         if not parsed_response or not parsed_response.translations:
-            raise TranslationError("Translation service returned empty output.")
-
+            raise RetryableTranslationError("Translation service returned empty output.")  # fmt: skip
         return parsed_response
 
 
+class _FanOutAdapter(_LLMAdapter):
+    """Spread requests over several providers by weight, optionally hedging.
+
+    Providers are picked by smooth weighted round-robin. With hedge_percentile,
+    a request still running after that percentile of the provider's recent
+    latencies is duplicated to the next provider and the first successful
+    response wins. Until enough latencies have been observed, initial_hedge_delay
+    is used instead. Each request, hedged or not, is paced by the rate limiter
+    of the provider that serves it.
+    """
+
+    default_model = "fanout"
+    _MIN_HEDGE_SAMPLES = 5
+    _LATENCY_WINDOW = 100
+
+    def __init__(
+        self,
+        adapters: dict[str, _LLMAdapter],
+        weights: dict[str, float],
+        hedge_percentile: float | None = None,
+        initial_hedge_delay: float = 10.0,
+    ) -> None:
+        if not adapters or set(adapters) != set(weights):
+            raise ValueError("Every fan-out provider needs exactly one weight")
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Fan-out weights must be > 0")
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be between 0 and 100")
+        super().__init__(
+            model=",".join(
+                f"{name}:{adapter.model or adapter.default_model}"
+                for name, adapter in sorted(adapters.items())
+            )
+        )
+        self.adapters = adapters
+        self.weights = weights
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self._lock = threading.Lock()
+        self._current = dict.fromkeys(adapters, 0.0)
+        self._latencies = {
+            name: deque(maxlen=self._LATENCY_WINDOW) for name in adapters
+        }
+        self._executor: ThreadPoolExecutor | None = None
+        self._limiters: dict[str, RateLimiter | None] = {}
+
+    def set_rate_limits(
+        self, requests_per_minute: float | None, tokens_per_minute: float | None
+    ) -> None:
+        """Pace each provider against its own budget for its model."""
+        self._limiters = {
+            name: get_rate_limiter(
+                name,
+                adapter.model or adapter.default_model,
+                requests_per_minute,
+                tokens_per_minute,
+            )
+            for name, adapter in self.adapters.items()
+        }
+
+    def generate(self, instructions: str, input_text: str) -> TranslationResponse:
+        order = self._pick()
+        delay = self._hedge_delay(order[0])
+        if delay is None:
+            response = self._call(order[0], instructions, input_text)
+            return self._served(order[0], response)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="hedge")
+            executor = self._executor
+
+        def submit(name: str) -> None:
+            futures[executor.submit(self._call, name, instructions, input_text)] = name
+
+        futures: dict[Future, str] = {}
+        submit(order[0])
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            submit(order[1])
+            incr("translation.hedged_requests")
+            logger.debug(f"{order[0]} exceeded {delay:.2f}s, hedging with {order[1]}")
+
+        errors: list[TranslationError] = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return self._served(futures[future], future.result())
+                except TranslationError as e:
+                    errors.append(e)
+        raise errors[0]
+
+    async def agenerate(
+        self, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        order = self._pick()
+        delay = self._hedge_delay(order[0])
+        if delay is None:
+            response = await self._acall(order[0], instructions, input_text)
+            return self._served(order[0], response)
+
+        def submit(name: str) -> None:
+            task = asyncio.create_task(self._acall(name, instructions, input_text))
+            tasks[task] = name
+
+        tasks: dict[asyncio.Task, str] = {}
+        submit(order[0])
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            submit(order[1])
+            incr("translation.hedged_requests")
+            logger.debug(f"{order[0]} exceeded {delay:.2f}s, hedging with {order[1]}")
+
+        errors: list[TranslationError] = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        return self._served(tasks[task], task.result())
+                    except TranslationError as e:
+                        errors.append(e)
+        finally:
+            for task in pending:
+                task.cancel()
+        raise errors[0]
+
+    def _pick(self) -> list[str]:
+        """Return the next provider followed by the others by descending weight."""
+        with self._lock:
+            total = sum(self.weights.values())
+            for name, weight in self.weights.items():
+                self._current[name] += weight
+            chosen = max(self._current, key=self._current.__getitem__)
+            self._current[chosen] -= total
+        others = sorted(
+            (name for name in self.weights if name != chosen),
+            key=lambda name: -self.weights[name],
+        )
+        return [chosen, *others]
+
+    def _hedge_delay(self, name: str) -> float | None:
+        if self.hedge_percentile is None or len(self.adapters) < 2:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies[name])
+        if len(samples) < self._MIN_HEDGE_SAMPLES:
+            return self.initial_hedge_delay
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+
+    def _call(
+        self, name: str, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            limiter.acquire(_estimate_request_tokens(instructions, input_text))
+        start = time.perf_counter()
+        try:
+            response = self.adapters[name].generate(instructions, input_text)
+        except RetryableTranslationError as e:
+            self._rate_limited(limiter, e)
+            raise
+        self._record_latency(name, time.perf_counter() - start)
+        return response
+
+    async def _acall(
+        self, name: str, instructions: str, input_text: str
+    ) -> TranslationResponse:
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            await limiter.aacquire(_estimate_request_tokens(instructions, input_text))
+        start = time.perf_counter()
+        try:
+            response = await self.adapters[name].agenerate(instructions, input_text)
+        except RetryableTranslationError as e:
+            self._rate_limited(limiter, e)
+            raise
+        self._record_latency(name, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _rate_limited(
+        limiter: RateLimiter | None, e: RetryableTranslationError
+    ) -> None:
+        # Retry-After applies to the provider that sent it, not the others
+        if limiter is not None and e.retry_after is not None:
+            limiter.block_for(e.retry_after)
+
+    def _record_latency(self, name: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[name].append(latency)
+
+    def _served(self, name: str, response: TranslationResponse) -> TranslationResponse:
+        incr(f"translation.served_by.{name}")
+        logger.info(f"Translated {len(response.translations)} sentence(s) with {name}.")
+        return response
+
+    def close(self) -> None:
+        """Shut down the hedge executor without waiting for losing requests."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+DEFAULT_CHUNK_SIZE = 20
+DEFAULT_MAX_CHUNK_TOKENS = 2000
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_MAX_FOLLOWUPS = 1
+
+
 _ADAPTERS: dict[str, type[_LLMAdapter]] = {}
 
 
@@ -107,21 +610,57 @@ def _get_adapter(name: str, model: str | None = None) -> _LLMAdapter:
     return cls(model=model)
 
 
+def _get_fanout_adapter(
+    weights: dict[str, float],
+    models: dict[str, str | None] | None = None,
+    hedge_percentile: float | None = None,
+) -> _FanOutAdapter:
+    """Return the fan-out adapter over registered providers shared by the run.
+
+    models optionally selects the model per provider; others use their default.
+    Calls with the same configuration share one adapter, so round-robin state,
+    observed latencies and the hedge executor carry over from call to call.
+    close_clients shuts it down.
+    """
+    models = models or {}
+    adapters = {name: _get_adapter(name, model=models.get(name)) for name in weights}
+    key = (
+        "fanout",
+        repr(
+            sorted(
+                (name, weights[name], id(type(adapter)), adapter.model)
+                for name, adapter in adapters.items()
+            )
+        ),
+        repr(hedge_percentile),
+    )
+    try:
+        return get_shared_client(
+            key,
+            lambda: _FanOutAdapter(
+                adapters, weights, hedge_percentile=hedge_percentile
+            ),
+        )
+    except ValueError as e:
+        raise TranslationError(f"Invalid fan-out configuration: {e}") from e
+
+
 _register_adapter("openai", _OpenAIAdapter)
 _register_adapter("gemini", _GeminiAdapter)
 
 
 _translation_instructions_template = """
-You are a professional translator. For each sentence provided in the input list (sentences are separated by newlines), identify the word wrapped in **...** tags. Translate that bold word into natural {source_lang} in the context of the full sentence. If the word is a slang term, provide an equivalent slang term in {source_lang}. If a one-word translation is not possible, use multiple words or a short phrase that best captures the meaning. Always provide two similar translations for the bold word, separated by a comma followed by a space (, ), and ensure both translations are in lowercase.
+You are a professional translator. For each sentence provided in the input list (sentences are separated by newlines, and each line starts with a numeric ID followed by a colon), identify the word wrapped in **...** tags. Translate that bold word into natural {source_lang} in the context of the full sentence. If the word is a slang term, provide an equivalent slang term in {source_lang}. If a one-word translation is not possible, use multiple words or a short phrase that best captures the meaning. Always provide two similar translations for the bold word, separated by a comma followed by a space (, ), and ensure both translations are in lowercase.
 
 Also translate the entire sentence into {source_lang}, and wrap the translated word in **...** tags.
 
-Your response must be a valid JSON object with a single property "translations", which is an array of objects. Each object must have the following properties:
+Your response must be a valid JSON object with a single property "translations", which is an array with exactly one object per input ID. Each object must have the following properties:
 
 {{
+  "id": ID of the input line, copied unchanged,
   "words_source": "first translation, second translation of the **bold** word in lowercase",
   "sentence_source": "full translated sentence with **bold** word",
-  "sentence_target": "original sentence with **bold** word"
+  "sentence_target": "original sentence with **bold** word, without the ID"
 }}
 """.strip()
 
@@ -130,17 +669,595 @@ def _build_instructions(source_lang: str) -> str:
     return _translation_instructions_template.format(source_lang=source_lang)
 
 
+def _cache_key(sentence: str, source_lang: str, api: str, model: str) -> str:
+    """Return the cache key of a sentence translated with the given settings."""
+    template_hash = hashlib.sha256(
+        _translation_instructions_template.encode()
+    ).hexdigest()
+    payload = json.dumps(
+        [normalize_sentence(sentence), source_lang, api, model, template_hash]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in text (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _chunk_sentences(
+    sentences: list[str],
+    chunk_size: int,
+    max_chunk_tokens: int,
+) -> list[list[str]]:
+    """Split sentences into chunks bounded by sentence count and estimated tokens."""
+    if chunk_size <= 0 or max_chunk_tokens <= 0:
+        raise ValueError("chunk_size and max_chunk_tokens must be > 0")
+
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for sentence in sentences:
+        tokens = _estimate_tokens(sentence)
+        if current and (
+            len(current) >= chunk_size or current_tokens + tokens > max_chunk_tokens
+        ):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _estimate_request_tokens(instructions: str, input_text: str) -> int:
+    """Estimate prompt plus completion tokens of a request for rate limiting.
+
+    The JSON response repeats each sentence and adds its translation, so the
+    completion is assumed to be about twice as long as the input.
+    """
+    return _estimate_tokens(instructions) + 3 * _estimate_tokens(input_text)
+
+
+def _next_retry_delay(
+    e: TranslationError,
+    attempt: int,
+    max_retries: int,
+    limiter: RateLimiter | None,
+) -> float:
+    """Return the backoff before retrying after e, or re-raise if it is final."""
+    incr("llm.errors")
+    if not isinstance(e, RetryableTranslationError) or attempt > max_retries:
+        raise e
+    if e.retry_after is not None and limiter is not None:
+        limiter.block_for(e.retry_after)
+    delay = backoff_delay(attempt, e.retry_after)
+    incr("llm.retries")
+    logger.warning(f"Translation attempt {attempt} failed, retrying in {delay:.1f}s: {e}")  # fmt: skip
+    return delay
+
+
+def _format_input(numbered: dict[int, str]) -> str:
+    """Return the request input with every sentence prefixed by its ID."""
+    return "\n".join(f"{id_}: {sentence}" for id_, sentence in numbered.items())
+
+
+def _align_items(
+    numbered: dict[int, str],
+    items: list[IdentifiedTranslationItem],
+) -> dict[int, TranslationItem]:
+    """Map response items to the requested IDs, dropping malformed ones.
+
+    Items with an unknown or repeated ID, an empty field or a translation missing
+    its **bold** word are ignored so that their ID is requested again. The echoed
+    sentence_target is replaced by the requested sentence, so it stays exactly
+    as written in Notion however the model rewords it.
+    """
+    aligned: dict[int, TranslationItem] = {}
+    for item in items:
+        if item.id not in numbered or item.id in aligned:
+            logger.debug(f"Ignoring translation with unexpected ID {item.id}.")
+            continue
+        if not item.words_source.strip() or "**" not in item.sentence_source:
+            logger.debug(f"Ignoring malformed translation for ID {item.id}.")
+            continue
+        aligned[item.id] = TranslationItem.model_validate(
+            item.model_dump(exclude={"id"}) | {"sentence_target": numbered[item.id]}
+        )
+    return aligned
+
+
+def _request_chunk(
+    adapter: _LLMAdapter,
+    instructions: str,
+    numbered: dict[int, str],
+    max_retries: int,
+    limiter: RateLimiter | None = None,
+) -> dict[int, TranslationItem]:
+    """Send one request, retrying transient failures with backoff."""
+    input_text = _format_input(numbered)
+    tokens = _estimate_request_tokens(instructions, input_text)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            incr("llm.requests")
+            with timer("llm.request"):
+                response = adapter.generate(
+                    instructions=instructions, input_text=input_text
+                )
+            return _align_items(numbered, response.translations)
+        except TranslationError as e:
+            attempt += 1
+            time.sleep(_next_retry_delay(e, attempt, max_retries, limiter))
+
+
+async def _arequest_chunk(
+    adapter: _LLMAdapter,
+    instructions: str,
+    numbered: dict[int, str],
+    max_retries: int,
+    limiter: RateLimiter | None = None,
+) -> dict[int, TranslationItem]:
+    """Async counterpart of _request_chunk."""
+    input_text = _format_input(numbered)
+    tokens = _estimate_request_tokens(instructions, input_text)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.aacquire(tokens)
+        try:
+            incr("llm.requests")
+            with timer("llm.request"):
+                response = await adapter.agenerate(
+                    instructions=instructions, input_text=input_text
+                )
+            return _align_items(numbered, response.translations)
+        except TranslationError as e:
+            attempt += 1
+            await asyncio.sleep(_next_retry_delay(e, attempt, max_retries, limiter))
+
+
+def _missing_ids(
+    numbered: dict[int, str], aligned: dict[int, TranslationItem]
+) -> dict[int, str]:
+    return {id_: s for id_, s in numbered.items() if id_ not in aligned}
+
+
+def _followup_failed(e: TranslationError, missing: dict[int, str]) -> None:
+    logger.warning(f"Follow-up request for {len(missing)} sentence(s) failed: {e}")
+
+
+def _finish_chunk(
+    numbered: dict[int, str], aligned: dict[int, TranslationItem]
+) -> list[TranslationItem | None]:
+    missing = len(numbered) - len(aligned)
+    if missing:
+        incr("translation.missing_items", missing)
+    return [aligned.get(id_) for id_ in numbered]
+
+
+def _translate_chunk(
+    adapter: _LLMAdapter,
+    instructions: str,
+    chunk: list[str],
+    max_retries: int,
+    limiter: RateLimiter | None = None,
+    max_followups: int = DEFAULT_MAX_FOLLOWUPS,
+) -> list[TranslationItem | None]:
+    """Translate one chunk of sentences and return results aligned to it.
+
+    Each sentence is sent with its 1-based ID, and the response is matched
+    back by ID. Sentences the provider dropped or returned malformed are
+    re-requested on their own up to max_followups times; those still missing
+    are None.
+    """
+    numbered = dict(enumerate(chunk, start=1))
+    aligned = _request_chunk(adapter, instructions, numbered, max_retries, limiter)
+    for _ in range(max_followups):
+        missing = _missing_ids(numbered, aligned)
+        if not missing:
+            break
+        incr("translation.followup_requests")
+        try:
+            aligned |= _request_chunk(
+                adapter, instructions, missing, max_retries, limiter
+            )
+        except TranslationError as e:
+            _followup_failed(e, missing)
+            break
+    return _finish_chunk(numbered, aligned)
+
+
+async def _atranslate_chunk(
+    adapter: _LLMAdapter,
+    instructions: str,
+    chunk: list[str],
+    max_retries: int,
+    limiter: RateLimiter | None = None,
+    max_followups: int = DEFAULT_MAX_FOLLOWUPS,
+) -> list[TranslationItem | None]:
+    """Async counterpart of _translate_chunk."""
+    numbered = dict(enumerate(chunk, start=1))
+    aligned = await _arequest_chunk(
+        adapter, instructions, numbered, max_retries, limiter
+    )
+    for _ in range(max_followups):
+        missing = _missing_ids(numbered, aligned)
+        if not missing:
+            break
+        incr("translation.followup_requests")
+        try:
+            aligned |= await _arequest_chunk(
+                adapter, instructions, missing, max_retries, limiter
+            )
+        except TranslationError as e:
+            _followup_failed(e, missing)
+            break
+    return _finish_chunk(numbered, aligned)
+
+
+def _stream_chunk(
+    adapter: _LLMAdapter,
+    instructions: str,
+    chunk: list[str],
+    max_retries: int,
+    limiter: RateLimiter | None = None,
+    max_followups: int = DEFAULT_MAX_FOLLOWUPS,
+) -> Iterator[tuple[int, TranslationItem]]:
+    """Stream one chunk, yielding (ID, translation) as each item completes.
+
+    A request that fails part-way is retried for the sentences not received
+    yet, and sentences missing when the stream ends are re-requested up to
+    max_followups times.
+    """
+    pending = dict(enumerate(chunk, start=1))
+    attempt = followups = 0
+    while pending:
+        input_text = _format_input(pending)
+        if limiter is not None:
+            limiter.acquire(_estimate_request_tokens(instructions, input_text))
+        try:
+            incr("llm.requests")
+            for item in adapter.stream(
+                instructions=instructions, input_text=input_text
+            ):
+                for id_, translation in _align_items(pending, [item]).items():
+                    del pending[id_]
+                    yield id_, translation
+        except TranslationError as e:
+            attempt += 1
+            try:
+                delay = _next_retry_delay(e, attempt, max_retries, limiter)
+            except TranslationError:
+                if len(pending) == len(chunk):
+                    raise
+                _followup_failed(e, pending)
+                break
+            time.sleep(delay)
+            continue
+        if pending:
+            if followups == max_followups:
+                break
+            followups += 1
+            incr("translation.followup_requests")
+    if pending:
+        incr("translation.missing_items", len(pending))
+
+
+def _load_cached(
+    keys: list[str],
+    cache: SQLiteCache | None,
+    refresh: bool,
+) -> dict[str, TranslationItem]:
+    """Return cached translations for keys, unless the cache is bypassed."""
+    if cache is None:
+        return {}
+    cached: dict[str, TranslationItem] = {}
+    if not refresh:
+        cached = {
+            key: TranslationItem.model_validate_json(value)
+            for key, value in cache.get_many(keys).items()
+        }
+        if cached:
+            logger.info(f"Loaded {len(cached)} translation(s) from cache.")
+    hits = sum(key in cached for key in keys)
+    incr("translation.cache_hits", hits)
+    incr("translation.cache_misses", len(keys) - hits)
+    return cached
+
+
+def _plan_chunks(
+    sentences: list[str],
+    keys: list[str],
+    cached: dict[str, TranslationItem],
+    chunk_size: int,
+    max_chunk_tokens: int,
+) -> list[list[int]]:
+    """Group the indices of uncached sentences into translation chunks.
+
+    Sentences sharing a cache key are sent once, by their first occurrence.
+    """
+    first_index: dict[str, int] = {}
+    for i, key in enumerate(keys):
+        if key not in cached:
+            first_index.setdefault(key, i)
+    missing = list(first_index.values())
+    duplicates = sum(key not in cached for key in keys) - len(missing)
+    if duplicates:
+        incr("translation.duplicates_skipped", duplicates)
+        logger.info(f"Translating {len(missing)} unique sentence(s), skipping {duplicates} duplicate(s).")  # fmt: skip
+    if not missing:
+        return []
+    sentence_chunks = _chunk_sentences(
+        [sentences[i] for i in missing], chunk_size, max_chunk_tokens
+    )
+    positions = iter(missing)
+    return [[next(positions) for _ in chunk] for chunk in sentence_chunks]
+
+
+def _merge_results(
+    keys: list[str],
+    cached: dict[str, TranslationItem],
+    chunks: list[list[int]],
+    outcomes: list[list[TranslationItem | None] | TranslationError],
+    cache: SQLiteCache | None,
+) -> list[TranslationItem]:
+    """Store fresh translations and combine them with cached ones in input order.
+
+    Failed chunks and sentences the provider never returned are logged and
+    left out; the first error is raised only when nothing could be translated
+    at all.
+    """
+    errors = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, TranslationError):
+            logger.error(f"Translation of chunk {index + 1}/{len(chunks)} failed: {outcome}")  # fmt: skip
+            errors.append(outcome)
+    if errors and len(errors) == len(chunks) and not cached:
+        raise errors[0]
+
+    fresh: dict[str, TranslationItem] = {}
+    failed: set[str] = set()
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, TranslationError):
+            failed.update(keys[i] for i in chunk)
+            continue
+        fresh.update(
+            (keys[i], item) for i, item in zip(chunk, outcome) if item is not None
+        )
+    if cache is not None:
+        cache.set_many({key: item.model_dump_json() for key, item in fresh.items()})
+
+    # Duplicate sentences share a key, so each copy gets the same translation
+    translations: list[TranslationItem] = []
+    missing = 0
+    for key in keys:
+        if key in cached:
+            translations.append(cached[key])
+        elif key in fresh:
+            translations.append(fresh[key])
+        elif key not in failed:
+            missing += 1
+    if missing:
+        logger.warning(f"{missing} sentence(s) were not returned by the provider and were skipped.")  # fmt: skip
+    return translations
+
+
+def _prepare(
+    sentences: list[str],
+    source_lang: str,
+    api: str,
+    model: str | None,
+    fanout: dict[str, float] | None = None,
+    hedge_percentile: float | None = None,
+) -> tuple[str, _LLMAdapter, str, list[str]]:
+    """Validate input; return instructions, adapter, provider label and cache keys."""
+    if not sentences:
+        raise TranslationError("No sentences provided for translation.")
+    instructions = _build_instructions(source_lang)
+    if fanout:
+        adapter = _get_fanout_adapter(fanout, {api: model}, hedge_percentile)
+        provider = "fanout"
+    else:
+        adapter = _get_adapter(api, model=model)
+        provider = api
+    resolved_model = adapter.model or adapter.default_model
+    keys = [_cache_key(s, source_lang, provider, resolved_model) for s in sentences]
+    return instructions, adapter, provider, keys
+
+
+def _get_limiter(
+    adapter: _LLMAdapter,
+    provider: str,
+    requests_per_minute: float | None,
+    tokens_per_minute: float | None,
+) -> RateLimiter | None:
+    """Return the limiter for requests through adapter.
+
+    A fan-out adapter paces each provider itself, so that every provider gets
+    its own budget, and no limiter is returned for it.
+    """
+    if isinstance(adapter, _FanOutAdapter):
+        adapter.set_rate_limits(requests_per_minute, tokens_per_minute)
+        return None
+    return get_rate_limiter(
+        provider,
+        adapter.model or adapter.default_model,
+        requests_per_minute,
+        tokens_per_minute,
+    )
+
+
 def translate_sentences(
     sentences: list[str],
     source_lang: str = "English",
     api: str = "gemini",
     model: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunk_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    fanout: dict[str, float] | None = None,
+    hedge_percentile: float | None = None,
 ) -> list[TranslationItem]:
-    if not sentences:
-        raise TranslationError("No sentences provided for translation.")
-    instructions = _build_instructions(source_lang)
-    sentences_str = "\n".join(sentences)
-    adapter = _get_adapter(api, model=model)
-    response = adapter.generate(instructions=instructions, input_text=sentences_str)
+    """Translate sentences in concurrent chunks and return items in input order.
+
+    Sentences found in cache are not sent to the provider unless refresh is set.
+    Requests are paced to stay within the requests/tokens per minute budgets
+    shared by all calls to the same provider model. With fanout, chunks are
+    spread over the weighted providers (api using model, others their default
+    model), and hedge_percentile duplicates slow requests to a second provider.
+    Responses are matched to sentences by ID, and sentences missing from a
+    response are re-requested in a smaller follow-up call. Rate limits, server
+    errors and timeouts are retried with backoff; a chunk that still fails after
+    max_retries is logged and left out of the result, and TranslationError is
+    raised only when every chunk fails.
+    """
+    instructions, adapter, provider, keys = _prepare(
+        sentences, source_lang, api, model, fanout, hedge_percentile
+    )
+    limiter = _get_limiter(adapter, provider, requests_per_minute, tokens_per_minute)
+    cached = _load_cached(keys, cache, refresh)
+    chunks = _plan_chunks(sentences, keys, cached, chunk_size, max_chunk_tokens)
+
+    outcomes: list[list[TranslationItem | None] | TranslationError] = []
+    if chunks:
+        workers = max(1, min(max_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _translate_chunk,
+                    adapter,
+                    instructions,
+                    [sentences[i] for i in chunk],
+                    max_retries,
+                    limiter,
+                )
+                for chunk in chunks
+            ]
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except TranslationError as e:
+                outcomes.append(e)
+
+    return _merge_results(keys, cached, chunks, outcomes, cache)
+
+
+async def atranslate_sentences(
+    sentences: list[str],
+    source_lang: str = "English",
+    api: str = "gemini",
+    model: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunk_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    fanout: dict[str, float] | None = None,
+    hedge_percentile: float | None = None,
+) -> list[TranslationItem]:
+    """Async counterpart of translate_sentences.
 
-    return response.translations
+    All chunks are scheduled on the running event loop, with at most
+    max_concurrency provider requests in flight at a time.
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be > 0")
+    instructions, adapter, provider, keys = _prepare(
+        sentences, source_lang, api, model, fanout, hedge_percentile
+    )
+    limiter = _get_limiter(adapter, provider, requests_per_minute, tokens_per_minute)
+    cached = _load_cached(keys, cache, refresh)
+    chunks = _plan_chunks(sentences, keys, cached, chunk_size, max_chunk_tokens)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(chunk: list[int]) -> list[TranslationItem | None] | TranslationError:
+        async with semaphore:
+            try:
+                return await _atranslate_chunk(
+                    adapter,
+                    instructions,
+                    [sentences[i] for i in chunk],
+                    max_retries,
+                    limiter,
+                )
+            except TranslationError as e:
+                return e
+
+    outcomes = list(await asyncio.gather(*(run(chunk) for chunk in chunks)))
+    return _merge_results(keys, cached, chunks, outcomes, cache)
+
+
+def stream_translations(
+    sentences: list[str],
+    source_lang: str = "English",
+    api: str = "gemini",
+    model: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunk_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: SQLiteCache | None = None,
+    refresh: bool = False,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    fanout: dict[str, float] | None = None,
+    hedge_percentile: float | None = None,
+) -> Iterator[tuple[int, TranslationItem]]:
+    """Yield (input index, translation) pairs as soon as each one is available.
+
+    Cached translations come first, then the provider's streamed output is
+    parsed incrementally and every item is yielded as soon as it is complete,
+    so callers can start work on early sentences while later ones are still
+    being generated. Chunks are requested one after another. Sentences that
+    cannot be translated are left out, and TranslationError is raised only
+    when nothing was translated.
+    """
+    instructions, adapter, provider, keys = _prepare(
+        sentences, source_lang, api, model, fanout, hedge_percentile
+    )
+    limiter = _get_limiter(adapter, provider, requests_per_minute, tokens_per_minute)
+    cached = _load_cached(keys, cache, refresh)
+    chunks = _plan_chunks(sentences, keys, cached, chunk_size, max_chunk_tokens)
+    # Duplicate sentences share a key and are requested once
+    indices_by_key: dict[str, list[int]] = {}
+    for i, key in enumerate(keys):
+        indices_by_key.setdefault(key, []).append(i)
+
+    translated = 0
+    for i, key in enumerate(keys):
+        if key in cached:
+            translated += 1
+            yield i, cached[key]
+
+    errors = []
+    for chunk in chunks:
+        try:
+            for id_, item in _stream_chunk(
+                adapter,
+                instructions,
+                [sentences[i] for i in chunk],
+                max_retries,
+                limiter,
+            ):
+                key = keys[chunk[id_ - 1]]
+                if cache is not None:
+                    cache.set_many({key: item.model_dump_json()})
+                for i in indices_by_key[key]:
+                    translated += 1
+                    yield i, item
+        except TranslationError as e:
+            logger.error(f"Translation of {len(chunk)} sentence(s) failed: {e}")
+            errors.append(e)
+    if errors and not translated:
+        raise errors[0]
@@ -1,4 +1,5 @@
 import os
+from io import BytesIO
 
 import pytest
 from PIL import Image
@@ -16,19 +17,20 @@ def check_api_keys():
 
 
 class TestGetMultipleImageSets:
-    def test_success(self, tmp_path):
+    def test_success(self):
         queries = ["cat", "dog"]
-        img_file_paths, img_tags_list = get_multiple_image_sets(
+        media, img_tags_list = get_multiple_image_sets(
             queries,
-            tmp_path,
-            5,
-            (400, 200),
+            imgs_per_query=5,
+            box=(400, 200),
         )
 
-        assert len(img_file_paths) == 10
+        # Identical images are stored once, so there may be fewer than 10
+        assert 0 < len(media) <= 10
         assert len(img_tags_list) == 2
 
-        for p in img_file_paths:
-            img = Image.open(p)
+        for name, data in media.items():
+            assert f"<img src='{name}'>" in "".join(img_tags_list)
+            img = Image.open(BytesIO(data))
             assert img.size[0] <= 400
             assert img.size[1] <= 200
@@ -0,0 +1,274 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from flashcards.batch import (
+    _BATCH_BACKENDS,
+    BatchJobError,
+    _BatchBackend,
+    _GeminiBatchBackend,
+    _OpenAIBatchBackend,
+    translate_sentences_batch,
+)
+from flashcards.cache import SQLiteCache
+from flashcards.translation import (
+    IdentifiedTranslationItem,
+    TranslationError,
+    TranslationResponse,
+    _ADAPTERS,
+    _LLMAdapter,
+)
+
+
+def _echo_response(input_text: str) -> TranslationResponse:
+    translations = []
+    for line in input_text.split("\n"):
+        id_, sentence = line.split(": ", 1)
+        translations.append(
+            IdentifiedTranslationItem(
+                id=int(id_),
+                words_source="word, term",
+                sentence_source=sentence,
+                sentence_target=sentence,
+            )
+        )
+    return TranslationResponse(translations=translations)
+
+
+class _EchoAdapter(_LLMAdapter):
+    default_model = "echo"
+    inputs: list[str] = []
+
+    def generate(self, instructions, input_text):
+        self.inputs.append(input_text)
+        return _echo_response(input_text)
+
+
+class _FakeBatchBackend(_BatchBackend):
+    """Local stand-in for a provider batch endpoint.
+
+    Jobs finish on their second poll and echo every request back.
+    """
+
+    default_model = "echo"
+    jobs: dict[str, dict] = {}
+    drop_ids: set[int] = set()
+    failed_chunks: set[str] = set()
+    poll_error: Exception | None = None
+
+    def request_line(self, custom_id, instructions, input_text):
+        return {"custom_id": custom_id, "input": input_text}
+
+    def submit(self, input_path):
+        lines = [json.loads(line) for line in input_path.read_text().splitlines()]
+        job_id = f"job-{len(self.jobs)}"
+        self.jobs[job_id] = {"lines": lines, "polls": 0}
+        return job_id
+
+    def poll(self, job_id):
+        if self.poll_error is not None:
+            raise self.poll_error
+        self.jobs[job_id]["polls"] += 1
+        return self.jobs[job_id]["polls"] >= 2
+
+    def results(self, job_id):
+        results = {}
+        for line in self.jobs[job_id]["lines"]:
+            if line["custom_id"] in self.failed_chunks:
+                results[line["custom_id"]] = TranslationError("internal error")
+                continue
+            response = _echo_response(line["input"])
+            response.translations = [
+                item for item in response.translations if item.id not in self.drop_ids
+            ]
+            results[line["custom_id"]] = response
+        return results
+
+
+@pytest.fixture(autouse=True)
+def fake_provider(monkeypatch):
+    monkeypatch.setitem(_ADAPTERS, "fake", _EchoAdapter)
+    monkeypatch.setitem(_BATCH_BACKENDS, "fake", _FakeBatchBackend)
+    monkeypatch.setattr(_FakeBatchBackend, "jobs", {})
+    monkeypatch.setattr(_FakeBatchBackend, "drop_ids", set())
+    monkeypatch.setattr(_FakeBatchBackend, "failed_chunks", set())
+    monkeypatch.setattr(_FakeBatchBackend, "poll_error", None)
+    monkeypatch.setattr(_EchoAdapter, "inputs", [])
+    monkeypatch.setattr("flashcards.batch.time.sleep", lambda seconds: None)
+
+
+def _translate(sentences, tmp_path, **kwargs):
+    return translate_sentences_batch(
+        sentences, api="fake", job_dir=tmp_path / "batch", poll_interval=0, **kwargs
+    )
+
+
+class TestTranslateSentencesBatch:
+    def test_submits_one_job_and_returns_input_order(self, tmp_path):
+        sentences = [f"Sentence **{i}**." for i in range(5)]
+
+        result = _translate(sentences, tmp_path, chunk_size=2)
+
+        assert [item.sentence_target for item in result] == sentences
+        assert len(_FakeBatchBackend.jobs) == 1
+        job = _FakeBatchBackend.jobs["job-0"]
+        assert [line["custom_id"] for line in job["lines"]] == ["chunk-0", "chunk-1", "chunk-2"]  # fmt: skip
+        assert job["lines"][0]["input"] == "1: Sentence **0**.\n2: Sentence **1**."
+        assert job["polls"] == 2
+        assert list((tmp_path / "batch").iterdir()) == []
+
+    def test_resumes_recorded_job(self, tmp_path):
+        _FakeBatchBackend.poll_error = KeyboardInterrupt()
+        with pytest.raises(KeyboardInterrupt):
+            _translate(["**a**", "**b**"], tmp_path)
+        assert len(list((tmp_path / "batch").glob("*.job.json"))) == 1
+
+        _FakeBatchBackend.poll_error = None
+        result = _translate(["**a**", "**b**"], tmp_path)
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**"]
+        assert len(_FakeBatchBackend.jobs) == 1
+
+    def test_failed_job_is_not_resumed(self, tmp_path):
+        _FakeBatchBackend.poll_error = BatchJobError("expired")
+        with pytest.raises(BatchJobError):
+            _translate(["**a**"], tmp_path)
+
+        _FakeBatchBackend.poll_error = None
+        _translate(["**a**"], tmp_path)
+
+        assert len(_FakeBatchBackend.jobs) == 2
+
+    def test_missing_items_are_re_requested_directly(self, tmp_path):
+        _FakeBatchBackend.drop_ids = {2}
+
+        result = _translate(["**a**", "**b**", "**c**"], tmp_path)
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**", "**c**"]
+        assert _EchoAdapter.inputs == ["2: **b**"]
+
+    def test_failed_chunks_are_not_re_requested_directly(self, tmp_path):
+        _FakeBatchBackend.failed_chunks = {"chunk-0"}
+
+        result = _translate(["**a**", "**b**", "**c**"], tmp_path, chunk_size=2)
+
+        assert [item.sentence_target for item in result] == ["**c**"]
+        assert _EchoAdapter.inputs == []
+
+    def test_every_chunk_failing_raises(self, tmp_path):
+        _FakeBatchBackend.failed_chunks = {"chunk-0", "chunk-1"}
+
+        with pytest.raises(TranslationError, match="internal error"):
+            _translate(["**a**", "**b**", "**c**"], tmp_path, chunk_size=2)
+
+        assert _EchoAdapter.inputs == []
+
+    def test_cached_sentences_are_not_submitted(self, tmp_path):
+        with SQLiteCache(tmp_path / "translations.sqlite3") as cache:
+            _translate(["**a**"], tmp_path, cache=cache)
+            result = _translate(["**a**", "**b**"], tmp_path, cache=cache)
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**"]
+        assert _FakeBatchBackend.jobs["job-1"]["lines"] == [
+            {"custom_id": "chunk-0", "input": "1: **b**"}
+        ]
+
+    def test_unsupported_api_raises(self, monkeypatch, tmp_path):
+        monkeypatch.delitem(_BATCH_BACKENDS, "fake")
+        with pytest.raises(TranslationError, match="Batch mode is not supported"):
+            _translate(["**a**"], tmp_path)
+
+
+def _openai_output(custom_id: str, input_text: str) -> dict:
+    text = _echo_response(input_text).model_dump_json()
+    return {
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "body": {
+                "output": [
+                    {
+                        "type": "message",
+                        "content": [{"type": "output_text", "text": text}],
+                    }
+                ]
+            },
+        },
+        "error": None,
+    }
+
+
+class TestOpenAIBatchBackend:
+    def test_request_line_uses_structured_output(self):
+        line = _OpenAIBatchBackend().request_line("chunk-0", "instructions", "1: **a**")
+
+        assert line["url"] == "/v1/responses"
+        assert line["body"]["model"] == "gpt-4o"
+        assert line["body"]["input"] == "1: **a**"
+        text_format = line["body"]["text"]["format"]
+        assert (text_format["type"], text_format["strict"]) == ("json_schema", True)
+        item = text_format["schema"]["$defs"]["IdentifiedTranslationItem"]
+        assert item["additionalProperties"] is False
+        assert sorted(item["required"]) == sorted(item["properties"])
+        assert line["body"]["prompt_cache_key"].startswith("flashcards-")
+
+    def test_submits_polls_and_reads_results(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("OPENAI_API_KEY", "key")
+        input_path = tmp_path / "requests.jsonl"
+        input_path.write_text("{}\n")
+        batch = SimpleNamespace(
+            id="batch_1", status="in_progress", output_file_id=None, error_file_id=None
+        )
+        files = {
+            "out": json.dumps(_openai_output("chunk-0", "1: **a**")),
+            "err": json.dumps(
+                {
+                    "custom_id": "chunk-1",
+                    "response": {"status_code": 500, "body": {"error": "boom"}},
+                }
+            ),
+        }
+        client = SimpleNamespace(
+            files=SimpleNamespace(
+                create=lambda file, purpose: SimpleNamespace(id="file_1"),
+                content=lambda file_id: SimpleNamespace(text=files[file_id]),
+            ),
+            batches=SimpleNamespace(
+                create=lambda **kwargs: batch,
+                retrieve=lambda job_id: batch,
+            ),
+        )
+        backend = _OpenAIBatchBackend()
+
+        with patch("flashcards.batch.get_openai_client", return_value=client):
+            job_id = backend.submit(input_path)
+            running = backend.poll(job_id)
+            batch.status, batch.output_file_id, batch.error_file_id = "completed", "out", "err"  # fmt: skip
+            done = backend.poll(job_id)
+            results = backend.results(job_id)
+
+        assert (job_id, running, done) == ("batch_1", False, True)
+        assert results["chunk-0"].translations[0].sentence_target == "**a**"
+        assert isinstance(results["chunk-1"], TranslationError)
+
+    def test_failed_job_raises(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "key")
+        batch = SimpleNamespace(status="failed")
+        client = SimpleNamespace(batches=SimpleNamespace(retrieve=lambda job_id: batch))
+        with patch("flashcards.batch.get_openai_client", return_value=client):
+            with pytest.raises(BatchJobError):
+                _OpenAIBatchBackend().poll("batch_1")
+
+
+class TestGeminiBatchBackend:
+    def test_parses_response_and_error_records(self):
+        text = _echo_response("1: **a**").model_dump_json()
+        ok = {"key": "chunk-0", "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}  # fmt: skip
+        failed = {"key": "chunk-1", "error": {"code": 500}}
+        invalid = {"key": "chunk-2", "response": {"candidates": [{"content": {"parts": [{"text": "{"}]}}]}}  # fmt: skip
+
+        assert _GeminiBatchBackend._parse_record(ok).translations[0].id == 1
+        assert isinstance(_GeminiBatchBackend._parse_record(failed), TranslationError)
+        assert isinstance(_GeminiBatchBackend._parse_record(invalid), TranslationError)
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from flashcards.cache import SQLiteCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with SQLiteCache(tmp_path / "cache.sqlite3") as cache:
+        yield cache
+
+
+class TestSQLiteCache:
+    def test_set_and_get(self, cache):
+        cache.set("a", "1")
+        assert cache.get("a") == "1"
+        assert cache.get("missing") is None
+
+    def test_get_many_returns_only_present(self, cache):
+        cache.set_many({"a": "1", "b": "2"})
+        assert cache.get_many(["a", "b", "c"]) == {"a": "1", "b": "2"}
+
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        with SQLiteCache(path) as cache:
+            cache.set("a", "1")
+        with SQLiteCache(path) as cache:
+            assert cache.get("a") == "1"
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        with SQLiteCache(tmp_path / "cache.sqlite3", max_entries=2) as cache:
+            cache.set("a", "1")
+            time.sleep(0.01)
+            cache.set("b", "2")
+            time.sleep(0.01)
+            cache.get("a")
+            time.sleep(0.01)
+            cache.set("c", "3")
+
+            assert len(cache) == 2
+            assert cache.get("b") is None
+            assert cache.get("a") == "1"
+
+    def test_expired_entries_are_ignored(self, tmp_path):
+        with SQLiteCache(tmp_path / "cache.sqlite3", max_age_seconds=0.05) as cache:
+            cache.set("a", "1")
+            time.sleep(0.1)
+            assert cache.get("a") is None
+            assert cache.evict() == 1
+            assert len(cache) == 0
+
+    def test_delete(self, cache):
+        cache.set("a", "1")
+        cache.delete("a")
+        assert cache.get("a") is None
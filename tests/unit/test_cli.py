@@ -0,0 +1,93 @@
+import argparse
+
+import pytest
+
+from flashcards.cli import (
+    build_argument_parser,
+    parse_positive_float,
+    parse_positive_int,
+    parse_targets,
+    parse_weights,
+)
+
+
+class TestParseWeights:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("gemini=2,openai=1", {"gemini": 2.0, "openai": 1.0}),
+            ("Gemini=0.5", {"gemini": 0.5}),
+            ("gemini,openai", {"gemini": 1.0, "openai": 1.0}),
+        ],
+    )
+    def test_valid(self, value, expected):
+        assert parse_weights(value) == expected
+
+    def test_invalid_weight_raises(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_weights("gemini=fast")
+
+
+class TestParseTargets:
+    def test_splits_and_deduplicates(self):
+        assert parse_targets("fr, de,FR,es") == ["FR", "DE", "ES"]
+
+    def test_empty_raises(self):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_targets(" , ")
+
+
+class TestParsePositiveInt:
+    def test_valid(self):
+        assert parse_positive_int("3") == 3
+
+    @pytest.mark.parametrize("value", ["0", "-2", "many"])
+    def test_invalid_raises(self, value):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_positive_int(value)
+
+
+class TestParsePositiveFloat:
+    def test_valid(self):
+        assert parse_positive_float("0.5") == 0.5
+
+    @pytest.mark.parametrize("value", ["0", "-1", "nan", "fast"])
+    def test_invalid_raises(self, value):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_positive_float(value)
+
+
+class TestBuildArgumentParser:
+    def test_defaults(self):
+        args = build_argument_parser().parse_args(["-t", "fr"])
+        assert args.target == ["FR"]
+        assert args.all is False
+        assert args.source == "EN"
+        assert args.fanout is None
+
+    def test_cache_flags_are_exclusive(self):
+        with pytest.raises(SystemExit):
+            build_argument_parser().parse_args(["-t", "FR", "--no-cache", "--refresh"])
+
+    def test_all_languages(self):
+        args = build_argument_parser().parse_args(["--all"])
+        assert args.all is True
+        assert args.target is None
+
+    def test_target_or_all_required(self):
+        with pytest.raises(SystemExit):
+            build_argument_parser().parse_args([])
+        with pytest.raises(SystemExit):
+            build_argument_parser().parse_args(["-t", "FR", "--all"])
+
+    @pytest.mark.parametrize(
+        "flag", ["--count", "--chunk-size", "--workers", "--image-workers"]
+    )
+    def test_count_and_concurrency_options_must_be_positive(self, flag):
+        with pytest.raises(SystemExit):
+            build_argument_parser().parse_args(["-t", "FR", flag, "0"])
+
+    @pytest.mark.parametrize("flag", ["--rpm", "--tpm"])
+    def test_rate_limits_must_be_positive(self, flag):
+        with pytest.raises(SystemExit):
+            build_argument_parser().parse_args(["-t", "FR", flag, "0"])
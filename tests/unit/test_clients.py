@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from flashcards import clients
+from flashcards.clients import (
+    close_clients,
+    configure_pools,
+    get_async_genai_client,
+    get_async_openai_client,
+    get_genai_client,
+    get_http_session,
+    get_openai_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_clients(monkeypatch):
+    monkeypatch.setattr(clients, "HTTP_POOL_CONNECTIONS", clients.HTTP_POOL_CONNECTIONS)
+    monkeypatch.setattr(clients, "HTTP_POOL_MAXSIZE", clients.HTTP_POOL_MAXSIZE)
+    monkeypatch.setattr(clients, "LLM_MAX_CONNECTIONS", clients.LLM_MAX_CONNECTIONS)
+    close_clients()
+    yield
+    close_clients()
+
+
+class TestGetHttpSession:
+    def test_is_shared(self):
+        assert get_http_session() is get_http_session()
+
+    def test_uses_configured_pool_size(self):
+        configure_pools(http_pool_maxsize=32)
+        adapter = get_http_session().get_adapter("https://example.com")
+        assert adapter._pool_maxsize == 32
+
+    def test_close_creates_new_session(self):
+        session = get_http_session()
+        close_clients()
+        assert get_http_session() is not session
+
+
+class TestLLMClients:
+    def test_openai_client_is_shared_per_key(self):
+        client = get_openai_client("key-1")
+        assert get_openai_client("key-1") is client
+        assert get_openai_client("key-2") is not client
+
+    def test_genai_client_is_shared_per_key(self):
+        client = get_genai_client("key-1")
+        assert get_genai_client("key-1") is client
+        assert get_genai_client("key-2") is not client
+
+    @pytest.mark.parametrize(
+        "get_client", [get_async_openai_client, get_async_genai_client]
+    )
+    def test_async_client_is_shared_per_event_loop(self, get_client):
+        async def get_twice():
+            return get_client("key-1"), get_client("key-1")
+
+        first, same = asyncio.run(get_twice())
+        second, _ = asyncio.run(get_twice())
+
+        assert first is same
+        assert second is not first
@@ -0,0 +1,37 @@
+import pytest
+
+from flashcards.dedup import dedupe_sentences, iter_unique_sentences, normalize_sentence
+from flashcards.metrics import metrics
+
+
+class TestNormalizeSentence:
+    @pytest.mark.parametrize(
+        "sentence, expected",
+        [
+            ("A  **word**\n here. ", "A **word** here."),
+            ("Cafe\u0301 **noir**.", "Caf\u00e9 **noir**."),
+            ("A ** word ** here.", "A **word** here."),
+            ("A **wo****rd** here.", "A **word** here."),
+            ("**a** **b**", "**a** **b**"),
+        ],
+    )
+    def test_normalizes(self, sentence, expected):
+        assert normalize_sentence(sentence) == expected
+
+
+class TestDedupeSentences:
+    def test_keeps_first_occurrence_in_order(self):
+        sentences = ["A **b**.", "C **d**.", "A  **b**.", "A ** b**.", "C **d**."]
+        assert dedupe_sentences(sentences) == ["A **b**.", "C **d**."]
+
+    def test_counts_duplicates(self):
+        metrics.reset()
+        list(iter_unique_sentences(["**a**", "**a**", "**b**", "**a**"]))
+        assert metrics.snapshot()["counters"]["dedup.duplicate_sentences"] == 2
+
+    def test_iterator_is_lazy(self):
+        def sentences():
+            yield "**a**"
+            raise AssertionError("consumed too far")
+
+        assert next(iter_unique_sentences(sentences())) == "**a**"
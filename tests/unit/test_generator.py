@@ -1,6 +1,18 @@
+import json
+import zipfile
+
 import pytest
 
-from flashcards.generator import _convert_bold_text
+from flashcards.generator import _convert_bold_text, _note_guid, generate_cloze_deck
+from flashcards.translation import TranslationItem
+
+
+def _item(target: str, source: str = "A **word**.") -> TranslationItem:
+    return TranslationItem(
+        words_source="word, term",
+        sentence_source=source,
+        sentence_target=target,
+    )
 
 
 class TestConvertBoldText:
@@ -20,3 +32,113 @@ class TestConvertBoldText:
     def test_invalid_format(self):
         with pytest.raises(ValueError):
             _convert_bold_text("**Test** sentence.", "invalid_format")
+
+
+class TestNoteGuid:
+    def test_stable_for_same_sentence(self):
+        assert _note_guid(_item("Un **mot**.")) == _note_guid(_item("Un **mot**."))
+
+    def test_differs_for_other_sentence(self):
+        assert _note_guid(_item("Un **mot**.")) != _note_guid(_item("Deux **mots**."))
+
+
+class TestGenerateClozeDeck:
+    @pytest.fixture
+    def output(self, tmp_path):
+        return tmp_path / "deck.apkg"
+
+    @pytest.fixture
+    def manifest(self, tmp_path):
+        return tmp_path / "manifest.json"
+
+    def test_writes_all_notes(self, output):
+        items = [_item("**a**"), _item("**b**")]
+        assert generate_cloze_deck("Deck", items, output, None, None) == 2
+        assert zipfile.is_zipfile(output)
+
+    def test_incremental_exports_only_new_or_changed(self, output, manifest):
+        items = [_item("**a**"), _item("**b**")]
+        count = generate_cloze_deck("Deck", items, output, None, None, manifest_path=manifest)  # fmt: skip
+        assert count == 2
+
+        items = [_item("**a**", source="New **word**."), _item("**b**"), _item("**c**")]
+        count = generate_cloze_deck("Deck", items, output, None, None, manifest_path=manifest)  # fmt: skip
+        assert count == 2
+
+    def test_incremental_skips_write_without_changes(self, output, manifest):
+        items = [_item("**a**")]
+        generate_cloze_deck("Deck", items, output, None, None, manifest_path=manifest)
+        output.unlink()
+
+        count = generate_cloze_deck("Deck", items, output, None, None, manifest_path=manifest)  # fmt: skip
+
+        assert count == 0
+        assert not output.exists()
+
+    def test_incremental_exports_notes_that_gain_an_image(self, output, manifest):
+        items = [_item("**a**"), _item("**b**")]
+        generate_cloze_deck("Deck", items, output, None, None, manifest_path=manifest)
+        output.unlink()
+
+        count = generate_cloze_deck(
+            "Deck",
+            items,
+            output,
+            {"h.jpg": b"h"},
+            ["<img src='h.jpg'>", ""],
+            manifest_path=manifest,
+        )
+
+        assert count == 1
+        with zipfile.ZipFile(output) as apkg:
+            assert json.loads(apkg.read("media")) == {"0": "h.jpg"}
+
+    def test_manifest_is_per_deck(self, output, manifest):
+        items = [_item("**a**")]
+        generate_cloze_deck("Deck A", items, output, None, None, manifest_path=manifest)
+        count = generate_cloze_deck("Deck B", items, output, None, None, manifest_path=manifest)  # fmt: skip
+        assert count == 1
+
+    def test_duplicate_sentences_are_collapsed(self, output):
+        items = [_item("**a**"), _item("**a**")]
+        assert generate_cloze_deck("Deck", items, output, None, None) == 1
+
+    def test_media_written_into_package(self, output, tmp_path):
+        on_disk = tmp_path / "b.jpg"
+        on_disk.write_bytes(b"disk")
+        items = [_item("**a**"), _item("**b**")]
+        tags = ["<img src='a.jpg'>", "<img src='b.jpg'>"]
+
+        generate_cloze_deck(
+            "Deck", items, output, {"a.jpg": b"memory", "b.jpg": on_disk}, tags
+        )
+
+        with zipfile.ZipFile(output) as apkg:
+            assert json.loads(apkg.read("media")) == {"0": "a.jpg", "1": "b.jpg"}
+            assert apkg.read("0") == b"memory"
+            assert apkg.read("1") == b"disk"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["b.jpg", "deck.apkg"]
+
+    def test_incremental_packages_only_referenced_media(self, output, manifest):
+        generate_cloze_deck(
+            "Deck",
+            [_item("**a**")],
+            output,
+            {"a.jpg": b"a"},
+            ["<img src='a.jpg'>"],
+            manifest_path=manifest,
+        )
+        items = [_item("**a**"), _item("**b**")]
+        tags = ["<img src='a.jpg'>", "<img src='b.jpg'>"]
+
+        generate_cloze_deck(
+            "Deck",
+            items,
+            output,
+            {"a.jpg": b"a", "b.jpg": b"b"},
+            tags,
+            manifest_path=manifest,
+        )
+
+        with zipfile.ZipFile(output) as apkg:
+            assert json.loads(apkg.read("media")) == {"0": "b.jpg"}
@@ -1,16 +1,28 @@
+import os
+import threading
+import time
 from io import BytesIO
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 import requests
 from PIL import Image
 
 from flashcards.images import (
+    ImageCache,
+    ImageTooLargeError,
+    _download_image,
     _fetch_images,
+    _HostLimiter,
     _get_credentials,
-    _resize_image,
+    _process_image,
     _search_images,
+    get_multiple_image_sets,
+    get_process_pool,
+    media_filename,
+    shutdown_process_pool,
 )
+from flashcards.metrics import metrics
 
 
 @pytest.fixture
@@ -25,6 +37,21 @@ def img():
     return Image.new("RGB", (200, 100))
 
 
+def _image_response(data: bytes, headers: dict | None = None) -> MagicMock:
+    """Return a streamed requests response serving data in two chunks."""
+    resp = MagicMock()
+    resp.__enter__.return_value = resp
+    resp.headers = headers or {}
+    resp.iter_content.side_effect = lambda size: iter([data[:10], data[10:]])
+    return resp
+
+
+def _encode(img: Image.Image, format: str = "JPEG") -> bytes:
+    buf = BytesIO()
+    img.save(buf, format=format)
+    return buf.getvalue()
+
+
 class TestGetCredentials:
     def test_success(self, monkeypatch):
         monkeypatch.setenv("GOOGLE_API_KEY", "key")
@@ -58,7 +85,7 @@ class TestSearchImages:
             ]
         }
 
-        with patch("flashcards.images.requests.get", return_value=mock_resp):
+        with patch("requests.Session.get", return_value=mock_resp):
             links = _search_images("key", "cx", "q", num=3)
 
         assert links == ["http://a.com/1.jpg", "http://b.com/2.jpg"]
@@ -69,7 +96,7 @@ class TestSearchImages:
         mock_resp.json.return_value = {"error": {"message": "Quota exceeded"}}
         mock_resp.text = "Forbidden"
 
-        with patch("flashcards.images.requests.get", return_value=mock_resp):
+        with patch("requests.Session.get", return_value=mock_resp):
             with pytest.raises(RuntimeError) as exc:
                 _search_images("key", "cx", "q")
 
@@ -78,24 +105,59 @@ class TestSearchImages:
 
 class TestFetchImages:
     def test_returns_images_and_respects_n(self, jpeg_bytes):
-        resp = Mock()
-        resp.raise_for_status.return_value = None
-        resp.content = jpeg_bytes
-        with patch("flashcards.images.requests.Session.get", return_value=resp):
-            assert len(_fetch_images(["u1", "u2"], n=1)) == 1
+        resp = _image_response(jpeg_bytes)
+        with patch("requests.Session.get", return_value=resp):
+            assert len(_fetch_images(["u1", "u2"], n=1, box=(10, 10))) == 1
 
     def test_errors_are_skipped(self):
-        with patch("flashcards.images.requests.Session.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = requests.RequestException("fail")
-            images = _fetch_images(["u1"], n=1)
+            images = _fetch_images(["u1"], n=1, box=(10, 10))
         assert len(images) == 0
 
+    def test_undecodable_image_is_skipped(self, jpeg_bytes):
+        bad, good = _image_response(b"not an image"), _image_response(jpeg_bytes)
+        with patch("requests.Session.get", side_effect=[bad, good]):
+            images = _fetch_images(["u1", "u2"], n=1, box=(10, 10))
+        assert len(images) == 1
+
     def test_invalid_n_raises(self):
         with pytest.raises(ValueError):
-            _fetch_images(["u1"], n=0)
+            _fetch_images(["u1"], n=0, box=(10, 10))
+
+    def test_oversized_images_are_skipped(self, jpeg_bytes):
+        announced = _image_response(jpeg_bytes, {"Content-Length": "999999"})
+        unannounced = _image_response(jpeg_bytes * 10)
+        good = _image_response(jpeg_bytes)
+        with patch(
+            "requests.Session.get", side_effect=[announced, unannounced, good]
+        ):
+            images = _fetch_images(
+                ["u1", "u2", "u3"], n=1, box=(10, 10), max_bytes=len(jpeg_bytes)
+            )
+
+        assert len(images) == 1
+        announced.iter_content.assert_not_called()
+        assert unannounced.__exit__.called
+
 
+class TestDownloadImage:
+    def test_streams_body(self, jpeg_bytes):
+        session = Mock()
+        session.get.return_value = _image_response(jpeg_bytes)
 
-class TestResizeImage:
+        assert _download_image(session, "u1", max_bytes=len(jpeg_bytes)) == jpeg_bytes
+        assert session.get.call_args.kwargs["stream"] is True
+
+    def test_rejects_oversized_content_length(self):
+        session = Mock()
+        session.get.return_value = _image_response(b"x", {"Content-Length": "11"})
+
+        with pytest.raises(ImageTooLargeError):
+            _download_image(session, "u1", max_bytes=10)
+
+
+class TestProcessImage:
     @pytest.mark.parametrize(
         "box, expected",
         [
@@ -105,11 +167,251 @@ class TestResizeImage:
             ((200, 100), (200, 100)),
         ],
     )
-    def test_resize_image(self, img, box, expected):
-        resized = _resize_image(img, box)
-        assert resized.size == expected
-
-    def test_original_image_not_modified(self, img):
-        original_size = img.size
-        _resize_image(img, (100, 100))
-        assert img.size == original_size
+    def test_fits_within_box(self, img, box, expected):
+        jpeg = _process_image(_encode(img), box)
+        with Image.open(BytesIO(jpeg)) as result:
+            assert result.format == "JPEG"
+            assert result.size == expected
+
+    def test_large_jpeg_decoded_in_draft_mode(self):
+        data = _encode(Image.new("RGB", (1600, 800), (10, 20, 30)))
+        jpeg = _process_image(data, (100, 100))
+        with Image.open(BytesIO(jpeg)) as result:
+            assert result.size == (100, 50)
+            assert result.getpixel((50, 25)) == pytest.approx((10, 20, 30), abs=3)
+        assert len(jpeg) < len(data)
+
+    def test_transparent_png_converted_to_rgb(self):
+        img = Image.new("P", (20, 10))
+        img.info["transparency"] = 0
+        jpeg = _process_image(_encode(img, "PNG"), (10, 10))
+        with Image.open(BytesIO(jpeg)) as result:
+            assert result.mode == "RGB"
+            assert result.size == (10, 5)
+
+    def test_invalid_bytes_raise(self):
+        with pytest.raises(OSError):
+            _process_image(b"not an image", (10, 10))
+
+
+class TestHostLimiter:
+    def test_caps_concurrency_per_host(self):
+        limiter = _HostLimiter(max_per_host=1)
+        active = {"a.com": 0, "b.com": 0}
+        peak = {"a.com": 0, "b.com": 0}
+        lock = threading.Lock()
+
+        def download(url, host):
+            with limiter.limit(url):
+                with lock:
+                    active[host] += 1
+                    peak[host] = max(peak[host], active[host])
+                time.sleep(0.01)
+                with lock:
+                    active[host] -= 1
+
+        threads = [
+            threading.Thread(target=download, args=(f"http://{host}/{i}.jpg", host))
+            for host in active
+            for i in range(3)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert peak == {"a.com": 1, "b.com": 1}
+
+    def test_invalid_cap_raises(self):
+        with pytest.raises(ValueError):
+            _HostLimiter(0)
+
+
+class TestGetMultipleImageSets:
+    def test_preserves_query_order(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+
+        def search(api_key, cx, query):
+            # Finish later queries first to exercise reordering
+            time.sleep(0.02 if query == "first" else 0)
+            return [f"http://img.com/{query}.jpg"]
+
+        colors = {"first": "red", "second": "green", "third": "blue"}
+
+        def fetch(urls, n, box, host_limiter=None, processor=None, max_bytes=None):
+            query = urls[0].rsplit("/", 1)[1].removesuffix(".jpg")
+            return [_encode(Image.new("RGB", (10, 10), colors[query]))]
+
+        with (
+            patch("flashcards.images._search_images", side_effect=search),
+            patch("flashcards.images._fetch_images", side_effect=fetch),
+        ):
+            media, tags = get_multiple_image_sets(
+                ["first", "second", "third"], imgs_per_query=1
+            )
+
+        assert list(tmp_path.iterdir()) == []
+        assert len(media) == 3
+        for query, tag in zip(["first", "second", "third"], tags):
+            expected = _encode(Image.new("RGB", (10, 10), colors[query]))
+            assert tag == f"<img src='{media_filename(expected)}'>"
+
+    def test_identical_images_are_stored_once(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        jpeg = _encode(Image.new("RGB", (10, 10)))
+
+        with (
+            patch("flashcards.images._search_images", return_value=["u1", "u2"]),
+            patch("flashcards.images._fetch_images", return_value=[jpeg, jpeg]),
+        ):
+            media, tags = get_multiple_image_sets(["cat", "kitten"], imgs_per_query=2)
+
+        name = media_filename(jpeg)
+        assert media == {name: jpeg}
+        assert tags == [f"<img src='{name}'>"] * 2
+
+    def test_repeated_queries_are_searched_once(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        jpeg = _encode(Image.new("RGB", (10, 10)))
+
+        with (
+            patch("flashcards.images._search_images", return_value=["u1"]) as search,
+            patch("flashcards.images._fetch_images", return_value=[jpeg]),
+        ):
+            media, tags = get_multiple_image_sets(["cat", "dog", "cat"], imgs_per_query=1)  # fmt: skip
+
+        assert search.call_count == 2
+        assert len(tags) == 3
+        assert tags[0] == tags[2]
+
+    def test_failed_query_keeps_the_others(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        metrics.reset()
+        jpeg = _encode(Image.new("RGB", (10, 10)))
+
+        def search(api_key, cx, query):
+            if query == "dog":
+                raise RuntimeError("Google Custom Search failed (429): quota")
+            return ["u1"]
+
+        with (
+            patch("flashcards.images._search_images", side_effect=search),
+            patch("flashcards.images._fetch_images", return_value=[jpeg]),
+        ):
+            media, tags = get_multiple_image_sets(
+                ["cat", "dog", "bird"], imgs_per_query=1
+            )
+
+        name = media_filename(jpeg)
+        assert media == {name: jpeg}
+        assert tags == [f"<img src='{name}'>", "", f"<img src='{name}'>"]
+        assert metrics.snapshot()["counters"]["images.query_errors"] == 1
+
+    def test_concurrent_calls_share_host_limiter(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        limiters = []
+
+        def fetch(urls, n, box, host_limiter=None, processor=None, max_bytes=None):
+            limiters.append(host_limiter)
+            return []
+
+        with (
+            patch("flashcards.images._search_images", return_value=["u1"]),
+            patch("flashcards.images._fetch_images", side_effect=fetch),
+        ):
+            get_multiple_image_sets(["cat"], imgs_per_query=1, max_per_host=3)
+            get_multiple_image_sets(["dog"], imgs_per_query=1, max_per_host=3)
+
+        assert limiters[0] is limiters[1]
+
+
+class TestImageCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        with ImageCache(tmp_path / "images") as cache:
+            yield cache
+
+    def test_urls_roundtrip(self, cache):
+        assert cache.get_urls("cat") is None
+        cache.set_urls("cat", ["http://a.com/1.jpg"])
+        assert cache.get_urls("cat") == ["http://a.com/1.jpg"]
+
+    def test_image_keyed_by_content_and_box(self, cache):
+        path_a = cache.put_image("http://a.com/1.jpg", (100, 100), b"same")
+        path_b = cache.put_image("http://b.com/2.jpg", (100, 100), b"same")
+        path_c = cache.put_image("http://a.com/1.jpg", (50, 50), b"small")
+
+        assert path_a == path_b
+        assert path_a.name == media_filename(b"same")
+        assert path_a != path_c
+        assert cache.get_image("http://b.com/2.jpg", (100, 100)) == path_a
+        assert cache.get_image("http://b.com/2.jpg", (10, 10)) is None
+
+    def test_missing_file_is_a_miss(self, cache):
+        path = cache.put_image("http://a.com/1.jpg", (100, 100), b"jpeg")
+        path.unlink()
+        assert cache.get_image("http://a.com/1.jpg", (100, 100)) is None
+
+    def test_evicts_least_recently_used_files(self, tmp_path):
+        cache = ImageCache(tmp_path / "images", max_bytes=0)
+        old = cache.put_image("http://a.com/1.jpg", (100, 100), b"old")
+        new = cache.put_image("http://a.com/2.jpg", (100, 100), b"new")
+        os.utime(old, (0, 0))
+        cache.max_bytes = new.stat().st_size
+
+        cache.close()
+
+        assert not old.exists()
+        assert new.exists()
+
+
+class TestGetMultipleImageSetsCached:
+    def test_second_run_hits_cache(self, monkeypatch, tmp_path, jpeg_bytes):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        resp = _image_response(jpeg_bytes)
+
+        with ImageCache(tmp_path / "images") as cache:
+            with (
+                patch(
+                    "flashcards.images._search_images",
+                    return_value=["http://a.com/1.jpg"],
+                ) as mock_search,
+                patch(
+                    "requests.Session.get", return_value=resp
+                ) as mock_get,
+            ):
+                first = get_multiple_image_sets(["cat"], 1, cache=cache)
+                second = get_multiple_image_sets(["cat"], 1, cache=cache)
+
+        assert first == second
+        [path] = first[0].values()
+        assert path.parent == tmp_path / "images" / "files"
+        assert first[1] == [f"<img src='{path.name}'>"]
+        mock_search.assert_called_once()
+        mock_get.assert_called_once()
+
+    def test_processes_in_process_pool(self, monkeypatch):
+        monkeypatch.setenv("GOOGLE_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_ID", "cx")
+        resp = _image_response(_encode(Image.new("RGB", (800, 400))))
+
+        try:
+            with (
+                patch("flashcards.images._search_images", return_value=["u1"]),
+                patch("requests.Session.get", return_value=resp),
+            ):
+                media, tags = get_multiple_image_sets(
+                    ["cat"], 1, box=(100, 100), processor=get_process_pool(1)
+                )
+        finally:
+            shutdown_process_pool()
+
+        [jpeg] = media.values()
+        with Image.open(BytesIO(jpeg)) as result:
+            assert result.size == (100, 50)
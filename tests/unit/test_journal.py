@@ -0,0 +1,86 @@
+from flashcards.journal import RunJournal
+from flashcards.translation import TranslationItem
+
+PARAMS = {"source": "EN", "target": "FR", "count": 10, "api": "gemini", "model": None}
+
+
+def _item(word: str) -> TranslationItem:
+    return TranslationItem(
+        words_source=word,
+        sentence_source=f"A **{word}**.",
+        sentence_target=f"Un **{word}**.",
+    )
+
+
+class TestRunJournal:
+    def test_resume_restores_completed_units(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        image = tmp_path / "a.jpg"
+        image.write_bytes(b"jpg")
+
+        journal = RunJournal(path, PARAMS)
+        journal.record_sentences(["A **a**.", "A **b**."])
+        journal.record_translations(0, 2, [_item("a"), _item("b")])
+        journal.record_images(0, ["a", "b"], {"a.jpg": image}, ["<img src='a.jpg'>", ""])
+
+        resumed = RunJournal(path, PARAMS, resume=True)
+
+        assert resumed.sentences == ["A **a**.", "A **b**."]
+        assert resumed.get_translations(0, 2) == [_item("a"), _item("b")]
+        assert resumed.get_images(0, ["a", "b"]) == (
+            {"a.jpg": image},
+            ["<img src='a.jpg'>", ""],
+        )
+
+    def test_without_resume_starts_over(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        RunJournal(path, PARAMS).record_sentences(["A **a**."])
+
+        journal = RunJournal(path, PARAMS)
+
+        assert journal.sentences is None
+        assert RunJournal(path, PARAMS, resume=True).sentences is None
+
+    def test_ignores_journal_for_other_params(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        RunJournal(path, PARAMS).record_sentences(["A **a**."])
+
+        journal = RunJournal(path, {**PARAMS, "target": "DE"}, resume=True)
+
+        assert journal.sentences is None
+
+    def test_ignores_truncated_last_record(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = RunJournal(path, PARAMS)
+        journal.record_sentences(["A **a**."])
+        with path.open("a", encoding="utf-8") as f:
+            f.write('{"type": "translations", "start": 0')
+
+        resumed = RunJournal(path, PARAMS, resume=True)
+
+        assert resumed.sentences == ["A **a**."]
+        assert resumed.get_translations(0, 1) is None
+
+    def test_mismatched_batches_are_not_reused(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = RunJournal(path, PARAMS)
+        journal.record_translations(0, 2, [_item("a"), _item("b")])
+        journal.record_images(0, ["a"], {"m.jpg": tmp_path / "missing.jpg"}, ["x"])
+
+        assert journal.get_translations(0, 3) is None
+        assert journal.get_images(0, ["b"]) is None
+        assert journal.get_images(0, ["a"]) is None
+
+    def test_complete_removes_journal(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = RunJournal(path, PARAMS)
+
+        journal.complete()
+
+        assert not path.exists()
+
+    def test_in_memory_media_is_not_recorded(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        RunJournal(path, PARAMS).record_images(0, ["a"], {"a.jpg": b"jpg"}, ["x"])
+
+        assert RunJournal(path, PARAMS, resume=True).get_images(0, ["a"]) is None
@@ -0,0 +1,231 @@
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from flashcards.cli import build_argument_parser
+from flashcards.images import shutdown_process_pool
+from flashcards.journal import RunJournal
+from flashcards.main import (
+    _fetch_image_batches,
+    _generate_deck,
+    _generate_decks,
+    _translate_batches,
+)
+from flashcards.notion import AmbiguousTitleError
+from flashcards.translation import TranslationError, TranslationItem
+
+
+def _args(*argv):
+    return build_argument_parser().parse_args(["--no-cache", *argv])
+
+
+@pytest.fixture
+def decks(tmp_path):
+    generated = []
+
+    def generate(args, target_lang, output_path, journal_path, **stages):
+        generated.append(target_lang)
+        if target_lang == "DE":
+            raise RuntimeError("notion down")
+        return target_lang != "ES"
+
+    with (
+        patch("flashcards.main.ensure_output_dir"),
+        patch("flashcards.main.OUTPUT_PATH", tmp_path / "deck.apkg"),
+        patch("flashcards.main.JOURNAL_PATH", tmp_path / "journal.jsonl"),
+        patch("flashcards.main._generate_deck", side_effect=generate),
+    ):
+        yield generated
+    shutdown_process_pool()
+
+
+class TestGenerateDecks:
+    def test_failing_language_does_not_stop_the_others(self, decks):
+        with pytest.raises(SystemExit) as exc_info:
+            _generate_decks(_args("-t", "fr,de,es,it"))
+
+        assert exc_info.value.code == 1
+        assert sorted(decks) == ["DE", "ES", "FR", "IT"]
+
+    def test_all_languages_succeed(self, decks):
+        _generate_decks(_args("-t", "fr,it"))
+
+        assert sorted(decks) == ["FR", "IT"]
+
+    def test_single_language_failure_exits(self, decks):
+        with pytest.raises(SystemExit):
+            _generate_decks(_args("-t", "es"))
+
+
+class TestGenerateDeck:
+    def test_notion_error_returns_false(self, tmp_path):
+        notion_client = Mock()
+        with (
+            patch("flashcards.notion.get_notion_client", return_value=notion_client),
+            patch(
+                "flashcards.notion.get_page_content",
+                side_effect=AmbiguousTitleError("two pages"),
+            ),
+        ):
+            ok = _generate_deck(
+                _args("-t", "fr"),
+                "FR",
+                tmp_path / "deck.apkg",
+                tmp_path / "journal.jsonl",
+                translate=Mock(),
+                stream_translate=Mock(),
+                fetch_images=Mock(),
+            )
+
+        assert ok is False
+        notion_client.close.assert_called_once()
+
+
+def _item(sentence):
+    return TranslationItem(
+        words_source=sentence,
+        sentence_source=sentence,
+        sentence_target=sentence,
+    )
+
+
+class TestTranslateBatches:
+    def _journal(self, tmp_path, resume=False):
+        return RunJournal(tmp_path / "journal.jsonl", {"target": "FR"}, resume=resume)
+
+    def test_resumes_after_failure_partway(self, tmp_path):
+        sentences = [f"**{i}**" for i in range(5)]
+        calls = []
+        failing = {"**2**"}
+
+        def translate(batch):
+            calls.append(batch)
+            if failing & set(batch):
+                raise TranslationError("rate limited")
+            return [_item(sentence) for sentence in batch]
+
+        first = _translate_batches(self._journal(tmp_path), sentences, translate, 2, 3)
+        calls.clear()
+        failing.clear()
+        second = _translate_batches(
+            self._journal(tmp_path, resume=True), sentences, translate, 2, 3
+        )
+
+        assert [item.sentence_target for item in first] == ["**0**", "**1**", "**4**"]
+        assert calls == [["**2**", "**3**"]]
+        assert [item.sentence_target for item in second] == sentences
+
+    def test_slow_batch_does_not_delay_recording_the_others(self, tmp_path):
+        release = threading.Event()
+        journal = self._journal(tmp_path)
+
+        def translate(batch):
+            if batch == ["**0**"]:
+                release.wait(timeout=5)
+            return [_item(sentence) for sentence in batch]
+
+        original = journal.record_translations
+
+        def record(start, count, items):
+            original(start, count, items)
+            if start == 2:
+                release.set()
+
+        journal.record_translations = record
+        result = _translate_batches(
+            journal, ["**0**", "**1**", "**2**"], translate, 1, 3
+        )
+
+        assert [item.sentence_target for item in result] == ["**0**", "**1**", "**2**"]
+        assert sorted(journal.translations) == [0, 1, 2]
+
+    def test_incomplete_batch_is_not_recorded(self, tmp_path):
+        journal = self._journal(tmp_path)
+
+        result = _translate_batches(
+            journal, ["**a**", "**b**"], lambda batch: [_item(batch[0])], 2, 1
+        )
+
+        assert [item.sentence_target for item in result] == ["**a**"]
+        assert journal.translations == {}
+
+    def test_nothing_translated_raises(self, tmp_path):
+        def translate(batch):
+            raise TranslationError("down")
+
+        with pytest.raises(TranslationError, match="No sentences"):
+            _translate_batches(self._journal(tmp_path), ["**a**"], translate, 1, 1)
+
+
+def _image_fetcher(tmp_path, calls, failing=()):
+    def fetch_images(batch):
+        calls.append(batch)
+        if set(failing) & set(batch):
+            raise RuntimeError("quota exceeded")
+        media = {}
+        for query in batch:
+            path = tmp_path / f"{query}.jpg"
+            path.write_bytes(b"jpg")
+            media[path.name] = path
+        return media, [f'<img src="{query}.jpg">' for query in batch]
+
+    return fetch_images
+
+
+class TestFetchImageBatches:
+    def test_failed_batch_keeps_the_others(self, tmp_path):
+        journal = RunJournal(tmp_path / "journal.jsonl", {"target": "FR"})
+        fetch_images = _image_fetcher(tmp_path, [], failing=["b"])
+
+        media, tags, complete = _fetch_image_batches(
+            journal, ["a", "b", "c"], fetch_images, 1
+        )
+
+        assert complete is False
+        assert sorted(media) == ["a.jpg", "c.jpg"]
+        assert tags == ['<img src="a.jpg">', "", '<img src="c.jpg">']
+        assert sorted(journal.images) == [0, 2]
+
+    def test_resume_skips_recorded_batches(self, tmp_path):
+        calls = []
+        fetch_images = _image_fetcher(tmp_path, calls)
+
+        journal = RunJournal(tmp_path / "journal.jsonl", {"target": "FR"})
+        _fetch_image_batches(journal, ["a", "b", "c"], fetch_images, 2)
+        calls.clear()
+        (tmp_path / "c.jpg").unlink()
+        resumed = RunJournal(tmp_path / "journal.jsonl", {"target": "FR"}, resume=True)
+        media, tags, complete = _fetch_image_batches(
+            resumed, ["a", "b", "c"], fetch_images, 2
+        )
+
+        assert complete is True
+        assert calls == [["c"]]
+        assert sorted(media) == ["a.jpg", "b.jpg", "c.jpg"]
+        assert tags == ['<img src="a.jpg">', '<img src="b.jpg">', '<img src="c.jpg">']
+
+
+def test_journal_is_kept_when_an_image_batch_fails(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    calls = []
+    with (
+        patch("flashcards.notion.get_notion_client", return_value=Mock()),
+        patch("flashcards.notion.get_page_content", return_value=["**a**", "**b**", "**c**"]),  # fmt: skip
+    ):
+        ok = _generate_deck(
+            _args("-t", "fr", "--chunk-size", "1", "--workers", "1"),
+            "FR",
+            tmp_path / "deck.apkg",
+            journal_path,
+            translate=lambda batch: [_item(sentence) for sentence in batch],
+            stream_translate=Mock(),
+            fetch_images=_image_fetcher(tmp_path, calls, failing=["**b**"]),
+        )
+    records = [json.loads(line) for line in journal_path.read_text().splitlines()]
+
+    assert ok is True
+    assert (tmp_path / "deck.apkg").exists()
+    assert len(calls) == 3
+    assert [r["start"] for r in records if r["type"] == "images"] == [0, 2]
@@ -0,0 +1,61 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from flashcards.metrics import Metrics, metrics, timed
+
+
+@pytest.fixture
+def registry():
+    return Metrics()
+
+
+class TestMetrics:
+    def test_timer_records_calls(self, registry):
+        for _ in range(3):
+            with registry.timer("stage"):
+                pass
+
+        stats = registry.snapshot()["timers"]["stage"]
+        assert stats["count"] == 3
+        assert stats["max"] >= stats["mean"] >= 0
+
+    def test_timer_records_on_error(self, registry):
+        with pytest.raises(RuntimeError):
+            with registry.timer("stage"):
+                raise RuntimeError("boom")
+
+        assert registry.snapshot()["timers"]["stage"]["count"] == 1
+
+    def test_counters(self, registry):
+        registry.incr("hits")
+        registry.incr("hits", 2)
+        registry.incr("bytes", 0.5)
+
+        assert registry.snapshot()["counters"] == {"bytes": 0.5, "hits": 3}
+
+    def test_reports(self, registry):
+        with registry.timer("stage"):
+            pass
+        registry.incr("hits")
+
+        assert json.loads(registry.to_json())["counters"] == {"hits": 1}
+        table = registry.format_table()
+        assert "stage" in table
+        assert "hits" in table
+
+    def test_reset(self, registry):
+        registry.incr("hits")
+        registry.reset()
+        assert registry.snapshot() == {"timers": {}, "counters": {}}
+
+
+class TestTimed:
+    def test_wraps_calls(self):
+        metrics.reset()
+        func = Mock(return_value=42)
+
+        assert timed("wrapped", func)(1, key="value") == 42
+        func.assert_called_once_with(1, key="value")
+        assert metrics.snapshot()["timers"]["wrapped"]["count"] == 1
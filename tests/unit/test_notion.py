@@ -159,7 +159,33 @@ class TestGetPageID:
         mock_client.search.assert_called_once()
 
 
+    def test_follows_search_cursor(self):
+        def page(page_id, title):
+            return {
+                "id": page_id,
+                "properties": {
+                    "title": {"type": "title", "title": [{"plain_text": title}]}
+                },
+            }
+
+        mock_client = Mock()
+        mock_client.search.side_effect = [
+            {"results": [page("id-1", "Other")], "has_more": True, "next_cursor": "c1"},
+            {"results": [page("id-2", "Target")], "has_more": False},
+        ]
+
+        assert get_page_id(mock_client, "Target") == "id-2"
+        assert mock_client.search.call_count == 2
+
+
 class TestGetPageContent:
+    @pytest.mark.parametrize("count", [0, -1])
+    def test_non_positive_count_raises(self, count):
+        mock_client = Mock()
+        with pytest.raises(ValueError, match="count must be at least 1"):
+            get_page_content(mock_client, "Page", count=count)
+        mock_client.search.assert_not_called()
+
     def test_missing_page(self):
         mock_client = Mock()
         with patch("flashcards.notion.get_page_id", return_value=None):
@@ -271,3 +297,50 @@ class TestGetPageContent:
         with patch("flashcards.notion.get_page_id", return_value="dummy_id"):
             result = get_page_content(mock_client, "Short Page", count=3)
             assert result == ["**One**"]
+
+    def test_follows_cursor_across_pages(self):
+        def block(text):
+            return {
+                "type": "paragraph",
+                "paragraph": {
+                    "rich_text": [{"plain_text": text, "annotations": {"bold": True}}]
+                },
+            }
+
+        mock_client = Mock()
+        mock_client.blocks.children.list.side_effect = [
+            {"results": [block("First")], "has_more": True, "next_cursor": "c1"},
+            {"results": [block("Second")], "has_more": True, "next_cursor": "c2"},
+            {"results": [block("Third")], "has_more": False, "next_cursor": None},
+        ]
+        with patch("flashcards.notion.get_page_id", return_value="dummy_id"):
+            result = get_page_content(mock_client, "Long Page", count=3)
+
+        assert result == ["**First**", "**Second**", "**Third**"]
+        cursors = [
+            call.kwargs["start_cursor"]
+            for call in mock_client.blocks.children.list.call_args_list
+        ]
+        assert cursors == [None, "c1", "c2"]
+
+    def test_stops_requesting_once_count_reached(self):
+        mock_client = Mock()
+        mock_client.blocks.children.list.return_value = {
+            "results": [
+                {
+                    "type": "paragraph",
+                    "paragraph": {
+                        "rich_text": [
+                            {"plain_text": "One", "annotations": {"bold": True}}
+                        ]
+                    },
+                }
+            ],
+            "has_more": True,
+            "next_cursor": "next",
+        }
+        with patch("flashcards.notion.get_page_id", return_value="dummy_id"):
+            result = get_page_content(mock_client, "Endless Page", count=1)
+
+        assert result == ["**One**"]
+        mock_client.blocks.children.list.assert_called_once()
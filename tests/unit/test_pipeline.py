@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from flashcards.pipeline import run_streaming_pipeline
+from flashcards.translation import TranslationError, TranslationItem
+
+
+def _translate(chunk):
+    # Finish earlier chunks last to exercise reordering
+    time.sleep(0.01 * (3 - int(chunk[0][2:-2]) % 3))
+    return [
+        TranslationItem(words_source=s, sentence_source=s, sentence_target=s)
+        for s in chunk
+    ]
+
+
+def _fetch_images(queries):
+    return {f"{q}.jpg": q.encode() for q in queries}, [f"<img src='{q}.jpg'>" for q in queries]  # fmt: skip
+
+
+class TestRunStreamingPipeline:
+    def test_keeps_input_order(self):
+        sentences = [f"**{i}**" for i in range(10)]
+        translations, media, tags = run_streaming_pipeline(
+            sentences, _translate, _fetch_images, chunk_size=2
+        )
+
+        assert [t.sentence_target for t in translations] == sentences
+        assert list(media) == [f"{s}.jpg" for s in sentences]
+        assert tags == [f"<img src='{s}.jpg'>" for s in sentences]
+
+    def test_consumes_sentences_lazily(self):
+        consumed = []
+        translated = threading.Event()
+
+        def sentences():
+            for i in range(3):
+                if i > 0:
+                    # Later sentences are only read after the first chunk flowed through
+                    assert translated.wait(timeout=1)
+                consumed.append(i)
+                yield f"**{i}**"
+
+        def translate(chunk):
+            translated.set()
+            return _translate(chunk)
+
+        translations, _, _ = run_streaming_pipeline(
+            sentences(), translate, chunk_size=1
+        )
+
+        assert consumed == [0, 1, 2]
+        assert len(translations) == 3
+
+    def test_failed_translation_chunk_is_skipped(self):
+        def translate(chunk):
+            if chunk == ["**1**"]:
+                raise TranslationError("boom")
+            return _translate(chunk)
+
+        translations, _, tags = run_streaming_pipeline(
+            ["**0**", "**1**", "**2**"], translate, chunk_size=1
+        )
+
+        assert [t.sentence_target for t in translations] == ["**0**", "**2**"]
+        assert tags == ["", ""]
+
+    def test_streamed_items_reach_images_before_chunk_finishes(self):
+        fetched = threading.Event()
+
+        def translate(chunk):
+            for position, item in enumerate(_translate(chunk)):
+                yield position, item
+                # The first item's images are fetched while the chunk streams on
+                assert fetched.wait(timeout=1)
+
+        def fetch_images(queries):
+            fetched.set()
+            return _fetch_images(queries)
+
+        sentences = [f"**{i}**" for i in range(4)]
+        translations, media, tags = run_streaming_pipeline(
+            sentences, translate, fetch_images, chunk_size=2, stream_items=True
+        )
+
+        assert [t.sentence_target for t in translations] == sentences
+        assert tags == [f"<img src='{s}.jpg'>" for s in sentences]
+
+    def test_waiting_streamed_items_share_an_image_call(self):
+        calls = []
+        release = threading.Event()
+
+        def translate(chunk):
+            yield from enumerate(_translate(chunk))
+            release.set()
+
+        def fetch_images(queries):
+            # Items pile up while the first call is running
+            release.wait(timeout=1)
+            calls.append(queries)
+            return _fetch_images(queries)
+
+        sentences = [f"**{i}**" for i in range(6)]
+        translations, media, tags = run_streaming_pipeline(
+            sentences,
+            translate,
+            fetch_images,
+            chunk_size=4,
+            translation_workers=1,
+            image_workers=1,
+            stream_items=True,
+        )
+
+        assert [t.sentence_target for t in translations] == sentences
+        assert tags == [f"<img src='{s}.jpg'>" for s in sentences]
+        assert all(len(queries) <= 4 for queries in calls)
+        assert len(calls) < len(sentences)
+
+    def test_image_failure_leaves_empty_tags(self):
+        def fetch_images(queries):
+            raise RuntimeError("no images")
+
+        translations, media, tags = run_streaming_pipeline(
+            ["**0**", "**1**"], _translate, fetch_images, chunk_size=2
+        )
+
+        assert len(translations) == 2
+        assert media == {}
+        assert tags == ["", ""]
+
+    def test_producer_error_is_raised(self):
+        def sentences():
+            yield "**0**"
+            raise RuntimeError("notion down")
+
+        with pytest.raises(RuntimeError, match="notion down"):
+            run_streaming_pipeline(sentences(), _translate, chunk_size=1)
+
+    def test_invalid_settings_raise(self):
+        with pytest.raises(ValueError):
+            run_streaming_pipeline([], _translate, chunk_size=0)
@@ -0,0 +1,89 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from flashcards import ratelimit
+from flashcards.ratelimit import (
+    RateLimiter,
+    backoff_delay,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+
+class TestRateLimiter:
+    def test_unlimited_never_waits(self):
+        limiter = RateLimiter()
+        assert all(limiter.reserve(10_000) == 0 for _ in range(100))
+
+    def test_requests_per_minute_spreads_requests(self):
+        limiter = RateLimiter(requests_per_minute=60)
+        waits = [limiter.reserve() for _ in range(62)]
+
+        assert waits[:60] == [0] * 60
+        assert waits[60] == pytest.approx(1, abs=0.05)
+        assert waits[61] == pytest.approx(2, abs=0.05)
+
+    def test_tokens_per_minute(self):
+        limiter = RateLimiter(tokens_per_minute=600)
+        assert limiter.reserve(600) == 0
+        assert limiter.reserve(300) == pytest.approx(30, abs=0.1)
+
+    def test_oversized_request_is_capped_to_budget(self):
+        limiter = RateLimiter(tokens_per_minute=100)
+        assert limiter.reserve(10_000) == 0
+        assert limiter.reserve(100) == pytest.approx(60, abs=0.1)
+
+    def test_block_for(self):
+        limiter = RateLimiter(requests_per_minute=1000)
+        limiter.block_for(5)
+        assert limiter.reserve() == pytest.approx(5, abs=0.05)
+
+    def test_invalid_limits_raise(self):
+        with pytest.raises(ValueError):
+            RateLimiter(requests_per_minute=0)
+
+
+class TestGetRateLimiter:
+    def test_none_without_budget(self):
+        assert get_rate_limiter("gemini", "model") is None
+
+    def test_shared_per_model(self):
+        limiter = get_rate_limiter("gemini", "shared-model", 10)
+        assert get_rate_limiter("gemini", "shared-model", 10) is limiter
+        assert get_rate_limiter("openai", "shared-model", 10) is not limiter
+        assert get_rate_limiter("gemini", "shared-model", 20) is not limiter
+
+
+class TestParseRetryAfter:
+    @pytest.mark.parametrize(
+        "headers, expected",
+        [
+            (None, None),
+            ({}, None),
+            ({"retry-after": "12"}, 12),
+            ({"retry-after": "1.5"}, 1.5),
+            ({"retry-after-ms": "250", "retry-after": "10"}, 0.25),
+            ({"retry-after": "soon"}, None),
+        ],
+    )
+    def test_values(self, headers, expected):
+        assert parse_retry_after(headers) == expected
+
+    def test_http_date(self):
+        headers = {"retry-after": formatdate(time.time() + 30, usegmt=True)}
+        assert parse_retry_after(headers) == pytest.approx(30, abs=2)
+
+
+class TestBackoffDelay:
+    def test_prefers_retry_after(self):
+        assert backoff_delay(1, retry_after=4) == 4
+
+    def test_retry_after_is_capped(self):
+        assert backoff_delay(1, retry_after=3600) == ratelimit._RETRY_MAX_DELAY
+
+    def test_exponential_with_jitter(self):
+        for attempt in range(1, 6):
+            delay = backoff_delay(attempt)
+            assert 0 <= delay <= ratelimit._RETRY_BASE_DELAY * 2 ** (attempt - 1)
@@ -0,0 +1,74 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = (
+    "genanki",
+    "google.genai",
+    "httpx",
+    "notion_client",
+    "openai",
+    "PIL",
+    "requests",
+)
+IMPORT_BUDGET_SECONDS = 0.5
+
+
+def _import_times(code: str, cwd) -> dict[str, float]:
+    """Run code in a fresh interpreter and return cumulative import times in seconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def _heavy(times: dict[str, float]) -> list[str]:
+    return [
+        name
+        for name in times
+        if any(name == m or name.startswith(f"{m}.") for m in HEAVY_MODULES)
+    ]
+
+
+class TestStartup:
+    @pytest.mark.parametrize(
+        "module",
+        [
+            "flashcards.main",
+            "flashcards.generator",
+            "flashcards.images",
+            "flashcards.notion",
+            "flashcards.clients",
+        ],
+    )
+    def test_import_defers_heavy_modules(self, module, tmp_path):
+        times = _import_times(f"import {module}", tmp_path)
+
+        assert module in times
+        assert _heavy(times) == []
+
+    def test_main_import_within_budget(self, tmp_path):
+        times = _import_times("import flashcards.main", tmp_path)
+
+        assert times["flashcards.main"] < IMPORT_BUDGET_SECONDS
+
+    def test_help_has_no_side_effects(self, tmp_path):
+        code = (
+            "import sys; sys.argv = ['anki', '--help']\n"
+            "from flashcards.main import main\n"
+            "try:\n    main()\nexcept SystemExit:\n    pass"
+        )
+        times = _import_times(code, tmp_path)
+
+        assert _heavy(times) == []
+        assert not (tmp_path / "output").exists()
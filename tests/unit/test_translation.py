@@ -1,14 +1,30 @@
+import asyncio
+import time
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import pytest
 
+from flashcards.cache import SQLiteCache
+from flashcards.clients import close_clients
+from flashcards.metrics import metrics
 from flashcards.translation import (
+    IdentifiedTranslationItem,
+    RetryableTranslationError,
     TranslationError,
     TranslationItem,
     TranslationResponse,
+    _cache_key,
+    _chunk_sentences,
+    _FanOutAdapter,
     _GeminiAdapter,
+    _LLMAdapter,
     _get_adapter,
+    _get_fanout_adapter,
     _OpenAIAdapter,
+    _TranslationStreamParser,
+    atranslate_sentences,
+    stream_translations,
     translate_sentences,
 )
 
@@ -36,7 +52,8 @@ class TestGetAdapter:
 class TestTranslateSentences:
     def test_returns_translations(self):
         mock_sentences = ["This is a **test** sentence."]
-        mock_translation = TranslationItem(
+        mock_translation = IdentifiedTranslationItem(
+            id=1,
             words_source="test1, test2",
             sentence_source="Toto je **testovacia** veta.",
             sentence_target="This is a **test** sentence.",
@@ -61,3 +78,827 @@ class TestTranslateSentences:
     def test_raises_on_unsupported_api(self):
         with pytest.raises(TranslationError, match="Unsupported translation API"):
             translate_sentences(sentences=["Test"], api="unsupported")
+
+
+def _item(sentence: str, id_: int = 1) -> IdentifiedTranslationItem:
+    return IdentifiedTranslationItem(
+        id=id_,
+        words_source="word, term",
+        sentence_source=sentence,
+        sentence_target=sentence,
+    )
+
+
+def _echo_response(instructions: str, input_text: str) -> TranslationResponse:
+    lines = [line.split(": ", 1) for line in input_text.split("\n")]
+    return TranslationResponse(
+        translations=[_item(sentence, int(id_)) for id_, sentence in lines]
+    )
+
+
+class TestChunkSentences:
+    def test_splits_by_count(self):
+        chunks = _chunk_sentences(["a", "b", "c", "d", "e"], 2, 1000)
+        assert chunks == [["a", "b"], ["c", "d"], ["e"]]
+
+    def test_splits_by_estimated_tokens(self):
+        long_sentence = "x" * 400  # ~100 tokens
+        chunks = _chunk_sentences([long_sentence] * 3, 10, 150)
+        assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+
+    def test_oversized_sentence_gets_own_chunk(self):
+        chunks = _chunk_sentences(["x" * 4000, "y"], 10, 100)
+        assert chunks == [["x" * 4000], ["y"]]
+
+    def test_invalid_size_raises(self):
+        with pytest.raises(ValueError):
+            _chunk_sentences(["a"], 0, 100)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr("flashcards.translation.time.sleep", delays.append)
+    return delays
+
+
+class TestTranslateSentencesChunked:
+    def test_preserves_input_order(self):
+        sentences = [f"Sentence **{i}**." for i in range(7)]
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=_echo_response,
+        ) as mock_generate:
+            result = translate_sentences(sentences, chunk_size=2, max_workers=3)
+
+        assert [item.sentence_target for item in result] == sentences
+        assert mock_generate.call_count == 4
+
+    def test_retries_failed_chunk(self, no_backoff):
+        side_effect = [RetryableTranslationError("boom"), _echo_response("", "1: **a**")]
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=side_effect,
+        ):
+            result = translate_sentences(["**a**"], max_retries=1)
+
+        assert [item.sentence_target for item in result] == ["**a**"]
+
+    def test_failed_chunk_is_skipped(self):
+        def generate(instructions, input_text):
+            if "bad" in input_text:
+                raise TranslationError("boom")
+            return _echo_response(instructions, input_text)
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate", side_effect=generate
+        ):
+            result = translate_sentences(
+                ["**ok1**", "**bad**", "**ok2**"], chunk_size=1, max_retries=0
+            )
+
+        assert [item.sentence_target for item in result] == ["**ok1**", "**ok2**"]
+
+    def test_raises_when_all_chunks_fail(self):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=TranslationError("boom"),
+        ):
+            with pytest.raises(TranslationError, match="boom"):
+                translate_sentences(["**a**", "**b**"], chunk_size=1, max_retries=0)
+
+
+class TestResponseAlignment:
+    def test_reordered_items_are_aligned_by_id(self):
+        def generate(instructions, input_text):
+            return TranslationResponse(
+                translations=list(reversed(_echo_response("", input_text).translations))
+            )
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate", side_effect=generate
+        ):
+            result = translate_sentences(["**a**", "**b**", "**c**"])
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**", "**c**"]
+
+    def test_reworded_echo_keeps_original_sentence(self):
+        def generate(instructions, input_text):
+            response = _echo_response("", input_text)
+            for item in response.translations:
+                item.sentence_target = item.sentence_target.upper().rstrip(".")
+            return response
+
+        sentences = ["The **cat** sat.", "A **dog** ran."]
+        with (
+            patch(
+                "flashcards.translation._GeminiAdapter.generate", side_effect=generate
+            ),
+            patch(
+                "flashcards.translation._GeminiAdapter.stream",
+                side_effect=lambda instructions, input_text: iter(
+                    generate(instructions, input_text).translations
+                ),
+            ),
+        ):
+            result = translate_sentences(sentences)
+            streamed = list(stream_translations(sentences))
+
+        assert [item.sentence_target for item in result] == sentences
+        assert [item.sentence_target for _, item in streamed] == sentences
+
+    def test_only_missing_ids_are_re_requested(self):
+        def generate(instructions, input_text):
+            items = _echo_response("", input_text).translations
+            return TranslationResponse(translations=[i for i in items if i.id != 2] or items)  # fmt: skip
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate", side_effect=generate
+        ) as mock_generate:
+            result = translate_sentences(["**a**", "**b**", "**c**"])
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**", "**c**"]
+        assert mock_generate.call_count == 2
+        assert mock_generate.call_args.kwargs["input_text"] == "2: **b**"
+
+    def test_malformed_and_unknown_items_are_re_requested(self):
+        first = TranslationResponse(
+            translations=[_item("**a**", 1), _item("no bold word", 2), _item("**x**", 9)]
+        )
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=[first, _echo_response("", "2: **b**")],
+        ) as mock_generate:
+            result = translate_sentences(["**a**", "**b**"])
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**"]
+        assert mock_generate.call_args.kwargs["input_text"] == "2: **b**"
+
+    def test_still_missing_items_are_skipped_and_not_cached(self, tmp_path):
+        response = TranslationResponse(translations=[_item("**a**", 1)])
+        with (
+            SQLiteCache(tmp_path / "translations.sqlite3") as cache,
+            patch(
+                "flashcards.translation._GeminiAdapter.generate",
+                return_value=response,
+            ) as mock_generate,
+        ):
+            result = translate_sentences(["**a**", "**b**"], cache=cache)
+            translate_sentences(["**a**", "**b**"], cache=cache)
+
+        assert [item.sentence_target for item in result] == ["**a**"]
+        # Only the sentence that was never returned is sent again on the next run
+        assert mock_generate.call_args.kwargs["input_text"] == "1: **b**"
+
+    def test_async_re_requests_missing_ids(self):
+        inputs = []
+
+        async def agenerate(instructions, input_text):
+            inputs.append(input_text)
+            items = _echo_response("", input_text).translations
+            return TranslationResponse(translations=items[:1])
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.agenerate", side_effect=agenerate
+        ):
+            result = asyncio.run(atranslate_sentences(["**a**", "**b**"]))
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**"]
+        assert inputs == ["1: **a**\n2: **b**", "2: **b**"]
+
+
+class TestCacheKey:
+    def test_normalizes_whitespace(self):
+        assert _cache_key("A  **b**\n", "English", "gemini", "m") == _cache_key(
+            "A **b**", "English", "gemini", "m"
+        )
+
+    def test_normalizes_bold_markup(self):
+        assert _cache_key("A ** b** c", "English", "gemini", "m") == _cache_key(
+            "A **b** c", "English", "gemini", "m"
+        )
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ("A **c**", "English", "gemini", "m"),
+            ("A **b**", "Slovak", "gemini", "m"),
+            ("A **b**", "English", "openai", "m"),
+            ("A **b**", "English", "gemini", "other"),
+        ],
+    )
+    def test_differs_by_settings(self, args):
+        assert _cache_key(*args) != _cache_key("A **b**", "English", "gemini", "m")
+
+
+class TestTranslateSentencesCached:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        with SQLiteCache(tmp_path / "translations.sqlite3") as cache:
+            yield cache
+
+    def test_only_misses_are_sent(self, cache):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=_echo_response,
+        ) as mock_generate:
+            translate_sentences(["**a**"], cache=cache)
+            result = translate_sentences(["**b**", "**a**"], cache=cache)
+
+        assert [item.sentence_target for item in result] == ["**b**", "**a**"]
+        assert mock_generate.call_args.kwargs["input_text"] == "1: **b**"
+
+    def test_full_hit_skips_provider(self, cache):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=_echo_response,
+        ) as mock_generate:
+            translate_sentences(["**a**"], cache=cache)
+            translate_sentences(["**a**"], cache=cache)
+
+        assert mock_generate.call_count == 1
+
+    def test_duplicates_are_translated_once(self, cache):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=_echo_response,
+        ) as mock_generate:
+            result = translate_sentences(
+                ["**a**", "**b**", "**a**", " **a** "], cache=cache
+            )
+
+        assert [item.sentence_target for item in result] == ["**a**", "**b**", "**a**", "**a**"]  # fmt: skip
+        assert mock_generate.call_args.kwargs["input_text"] == "1: **a**\n2: **b**"
+
+    def test_refresh_bypasses_lookup(self, cache):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=_echo_response,
+        ) as mock_generate:
+            translate_sentences(["**a**"], cache=cache)
+            translate_sentences(["**a**"], cache=cache, refresh=True)
+
+        assert mock_generate.call_count == 2
+
+
+class _EchoAdapter(_LLMAdapter):
+    default_model = "echo"
+
+    def generate(self, instructions, input_text):
+        return _echo_response(instructions, input_text)
+
+
+class TestAsyncAdapter:
+    def test_default_agenerate_runs_generate(self):
+        response = asyncio.run(_EchoAdapter().agenerate("", "1: **a**\n2: **b**"))
+        assert [item.sentence_target for item in response.translations] == [
+            "**a**",
+            "**b**",
+        ]
+
+
+class TestATranslateSentences:
+    def test_preserves_input_order(self):
+        sentences = [f"Sentence **{i}**." for i in range(7)]
+
+        async def agenerate(instructions, input_text):
+            # Finish later chunks first to exercise reordering
+            await asyncio.sleep(0.01 if "**0**" in input_text else 0)
+            return _echo_response(instructions, input_text)
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.agenerate", side_effect=agenerate
+        ):
+            result = asyncio.run(atranslate_sentences(sentences, chunk_size=2))
+
+        assert [item.sentence_target for item in result] == sentences
+
+    def test_respects_concurrency_cap(self):
+        active = 0
+        peak = 0
+
+        async def agenerate(instructions, input_text):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return _echo_response(instructions, input_text)
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.agenerate", side_effect=agenerate
+        ):
+            result = asyncio.run(
+                atranslate_sentences(
+                    [f"**{i}**" for i in range(10)], chunk_size=1, max_concurrency=3
+                )
+            )
+
+        assert len(result) == 10
+        assert peak == 3
+
+    def test_failed_chunk_is_skipped(self):
+        async def agenerate(instructions, input_text):
+            if "bad" in input_text:
+                raise TranslationError("boom")
+            return _echo_response(instructions, input_text)
+
+        with patch(
+            "flashcards.translation._GeminiAdapter.agenerate", side_effect=agenerate
+        ):
+            result = asyncio.run(
+                atranslate_sentences(
+                    ["**ok**", "**bad**"], chunk_size=1, max_retries=0
+                )
+            )
+
+        assert [item.sentence_target for item in result] == ["**ok**"]
+
+    def test_raises_on_empty_input(self):
+        with pytest.raises(TranslationError, match="No sentences provided"):
+            asyncio.run(atranslate_sentences([]))
+
+
+class TestRetries:
+    def test_non_retryable_error_is_not_retried(self, no_backoff):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=TranslationError("bad request"),
+        ) as mock_generate:
+            with pytest.raises(TranslationError, match="bad request"):
+                translate_sentences(["**a**"], max_retries=3)
+
+        assert mock_generate.call_count == 1
+
+    def test_honors_retry_after(self, no_backoff):
+        side_effect = [
+            RetryableTranslationError("rate limited", retry_after=7),
+            _echo_response("", "1: **a**"),
+        ]
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate", side_effect=side_effect
+        ):
+            translate_sentences(["**a**"], max_retries=1)
+
+        assert no_backoff == [7]
+
+    def test_gives_up_after_max_retries(self, no_backoff):
+        with patch(
+            "flashcards.translation._GeminiAdapter.generate",
+            side_effect=RetryableTranslationError("unavailable"),
+        ) as mock_generate:
+            with pytest.raises(RetryableTranslationError):
+                translate_sentences(["**a**"], max_retries=2)
+
+        assert mock_generate.call_count == 3
+        assert len(no_backoff) == 2
+
+
+class TestAdapterErrors:
+    @pytest.mark.parametrize(
+        "status, retryable", [(429, True), (503, True), (400, False), (401, False)]
+    )
+    def test_gemini_classifies_status(self, status, retryable):
+        from google.genai.errors import APIError
+
+        error = APIError(status, {"error": {"message": "oops"}})
+        result = _GeminiAdapter._error(error)
+        assert isinstance(result, RetryableTranslationError) is retryable
+
+    @pytest.mark.parametrize("error_class", ["ConnectError", "ReadTimeout"])
+    def test_gemini_retries_network_errors(self, monkeypatch, no_backoff, error_class):
+        import httpx
+
+        monkeypatch.setenv("GEMINI_DEV_API_KEY", "key")
+        client = _FakeGenAIClient()
+        generate_content = client.models.generate_content
+
+        def fail_once(model, contents, config):
+            if not client.requests:
+                client.requests.append(config)
+                raise getattr(httpx, error_class)("connection refused")
+            return generate_content(model, contents, config)
+
+        client.models.generate_content = fail_once
+        with patch("flashcards.translation.get_genai_client", return_value=client):
+            result = translate_sentences(["**a**"])
+
+        assert [item.sentence_target for item in result] == ["**a**"]
+        assert len(client.requests) == 2
+        assert len(no_backoff) == 1
+
+    @pytest.mark.parametrize(
+        "status, retryable", [(429, True), (500, True), (404, False)]
+    )
+    def test_openai_classifies_status(self, status, retryable):
+        import httpx
+        from openai import APIStatusError
+
+        request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+        response = httpx.Response(
+            status, request=request, headers={"retry-after": "3"}
+        )
+        error = APIStatusError("oops", response=response, body={"message": "oops"})
+        result = _OpenAIAdapter._error(error)
+
+        assert isinstance(result, RetryableTranslationError) is retryable
+        if retryable:
+            assert result.retry_after == 3
+
+
+def _stream_chunks(text: str, size: int = 7) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestTranslationStreamParser:
+    def test_returns_items_as_they_complete(self):
+        text = _echo_response("", "1: **a**\n2: **b**").model_dump_json()
+        first_end = text.index("}") + 1
+        parser = _TranslationStreamParser()
+
+        assert parser.feed(text[: first_end - 1]) == []
+        assert [item["id"] for item in parser.feed(text[first_end - 1 : first_end])] == [1]  # fmt: skip
+        assert [item["id"] for item in parser.feed(text[first_end:])] == [2]
+
+    def test_ignores_braces_and_quotes_inside_strings(self):
+        item = _item('Say "}{" and ] **now**.')
+        text = TranslationResponse(translations=[item]).model_dump_json()
+        parser = _TranslationStreamParser()
+
+        items = [obj for chunk in _stream_chunks(text, 1) for obj in parser.feed(chunk)]
+
+        assert items == [item.model_dump()]
+
+
+class _StreamingAdapter(_LLMAdapter):
+    default_model = "streaming"
+
+    def __init__(self, model=None, fail_after=None, drop_ids=()):
+        super().__init__(model)
+        self.fail_after = fail_after
+        self.drop_ids = set(drop_ids)
+        self.inputs = []
+        self.yielded = 0
+
+    def generate(self, instructions, input_text):
+        raise AssertionError("stream expected")
+
+    def stream(self, instructions, input_text):
+        self.inputs.append(input_text)
+        for item in _echo_response("", input_text).translations:
+            if self.fail_after is not None and self.yielded == self.fail_after:
+                self.fail_after = None
+                raise RetryableTranslationError("connection reset")
+            if item.id not in self.drop_ids:
+                self.yielded += 1
+                yield item
+
+
+class TestStreamTranslations:
+    def test_yields_items_before_stream_ends(self):
+        adapter = _StreamingAdapter()
+        with patch("flashcards.translation._get_adapter", return_value=adapter):
+            stream = stream_translations(["**a**", "**b**", "**c**"])
+            first = next(stream)
+
+        assert first[0] == 0 and first[1].sentence_target == "**a**"
+        assert adapter.yielded == 1
+
+    def test_retries_only_pending_sentences(self, no_backoff):
+        adapter = _StreamingAdapter(fail_after=1)
+        with patch("flashcards.translation._get_adapter", return_value=adapter):
+            result = list(stream_translations(["**a**", "**b**", "**c**"]))
+
+        assert [(i, item.sentence_target) for i, item in result] == [
+            (0, "**a**"),
+            (1, "**b**"),
+            (2, "**c**"),
+        ]
+        assert adapter.inputs == ["1: **a**\n2: **b**\n3: **c**", "2: **b**\n3: **c**"]  # fmt: skip
+
+    def test_re_requests_missing_items(self):
+        adapter = _StreamingAdapter(drop_ids={1})
+        with patch("flashcards.translation._get_adapter", return_value=adapter):
+            result = list(stream_translations(["**a**", "**b**"]))
+
+        # The follow-up sends "**a**" with its original ID, which is dropped again
+        assert [i for i, _ in result] == [1]
+        assert adapter.inputs == ["1: **a**\n2: **b**", "1: **a**"]
+
+    def test_cached_and_duplicate_sentences(self, tmp_path):
+        adapter = _StreamingAdapter()
+        with (
+            SQLiteCache(tmp_path / "translations.sqlite3") as cache,
+            patch("flashcards.translation._get_adapter", return_value=adapter),
+        ):
+            list(stream_translations(["**b**"], cache=cache))
+            result = list(stream_translations(["**a**", "**b**", "**a**"], cache=cache))
+
+        assert sorted(i for i, _ in result) == [0, 1, 2]
+        assert result[0][0] == 1  # cached first
+        assert adapter.inputs[-1] == "1: **a**"
+
+    def test_raises_when_nothing_translated(self):
+        adapter = _StreamingAdapter(fail_after=0)
+        with patch("flashcards.translation._get_adapter", return_value=adapter):
+            with pytest.raises(TranslationError, match="connection reset"):
+                list(stream_translations(["**a**"], max_retries=0))
+
+
+class _FakeGenAIClient:
+    """Stand-in for the Gemini client that records the request configs."""
+
+    def __init__(self, cached_tokens=None):
+        self.cached_tokens = cached_tokens
+        self.requests = []
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+
+    def _generate_content(self, model, contents, config):
+        self.requests.append(config)
+        return SimpleNamespace(
+            parsed=_echo_response("", contents),
+            usage_metadata=SimpleNamespace(
+                cached_content_token_count=self.cached_tokens
+            ),
+        )
+
+
+class TestPromptCaching:
+    @pytest.fixture(autouse=True)
+    def api_keys(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_DEV_API_KEY", "key")
+        monkeypatch.setenv("OPENAI_API_KEY", "key")
+        metrics.reset()
+
+    def test_gemini_counts_cached_prompt_tokens(self):
+        client = _FakeGenAIClient(cached_tokens=100)
+        with patch("flashcards.translation.get_genai_client", return_value=client):
+            translate_sentences(["**a**", "**b**"], chunk_size=1)
+
+        assert all(config.system_instruction for config in client.requests)
+        counters = metrics.snapshot()["counters"]
+        assert counters["llm.prompt_cache_hits"] == 2
+        assert counters["llm.cached_prompt_tokens"] == 200
+
+    def test_openai_sends_stable_prompt_cache_key(self):
+        calls = []
+
+        def parse(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(
+                output_parsed=_echo_response("", kwargs["input"]),
+                usage=SimpleNamespace(
+                    input_tokens_details=SimpleNamespace(cached_tokens=64)
+                ),
+            )
+
+        client = SimpleNamespace(responses=SimpleNamespace(parse=parse))
+        with patch("flashcards.translation.get_openai_client", return_value=client):
+            translate_sentences(["**a**", "**b**"], api="openai", chunk_size=1)
+            translate_sentences(["**a**"], api="openai", source_lang="Slovak")
+
+        keys = [call["prompt_cache_key"] for call in calls]
+        assert keys[0] == keys[1] != keys[2]
+        assert metrics.snapshot()["counters"]["llm.prompt_cache_hits"] == 3
+
+
+class TestAdapterStreaming:
+    @pytest.fixture(autouse=True)
+    def api_keys(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_DEV_API_KEY", "key")
+        monkeypatch.setenv("OPENAI_API_KEY", "key")
+
+    def test_gemini_parses_streamed_chunks(self):
+        client = _FakeGenAIClient()
+        text = _echo_response("", "1: **a**\n2: **b**").model_dump_json()
+        client.models.generate_content_stream = lambda model, contents, config: (
+            SimpleNamespace(text=chunk, usage_metadata=None)
+            for chunk in _stream_chunks(text)
+        )
+        with patch("flashcards.translation.get_genai_client", return_value=client):
+            items = list(_GeminiAdapter().stream("instructions", "1: **a**\n2: **b**"))
+
+        assert [item.id for item in items] == [1, 2]
+
+    def test_openai_parses_text_deltas(self):
+        text = _echo_response("", "1: **a**").model_dump_json()
+        events = [SimpleNamespace(type="response.created")] + [
+            SimpleNamespace(type="response.output_text.delta", delta=chunk)
+            for chunk in _stream_chunks(text)
+        ]
+
+        class Stream:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def __iter__(self):
+                return iter(events)
+
+            def get_final_response(self):
+                return SimpleNamespace(usage=None)
+
+        client = SimpleNamespace(
+            responses=SimpleNamespace(stream=lambda **kwargs: Stream())
+        )
+        with patch("flashcards.translation.get_openai_client", return_value=client):
+            items = list(_OpenAIAdapter().stream("instructions", "1: **a**"))
+
+        assert [item.sentence_target for item in items] == ["**a**"]
+
+    def test_empty_stream_is_retryable(self):
+        client = SimpleNamespace(
+            models=SimpleNamespace(generate_content_stream=lambda **kwargs: iter(())),
+        )
+        with patch("flashcards.translation.get_genai_client", return_value=client):
+            with pytest.raises(RetryableTranslationError):
+                list(_GeminiAdapter().stream("instructions", "1: **a**"))
+
+
+class _NamedAdapter(_LLMAdapter):
+    default_model = "named"
+
+    def __init__(self, name, delay=0.0, error=None):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate(self, instructions, input_text):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return TranslationResponse(translations=[_item(self.name)])
+
+    async def agenerate(self, instructions, input_text):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return TranslationResponse(translations=[_item(self.name)])
+
+
+class TestFanOutAdapter:
+    @pytest.fixture(autouse=True)
+    def fresh_fanout(self):
+        close_clients()
+        yield
+        close_clients()
+
+    def test_distributes_by_weight(self):
+        adapters = {"a": _NamedAdapter("a"), "b": _NamedAdapter("b")}
+        fanout = _FanOutAdapter(adapters, {"a": 3, "b": 1})
+
+        served = [fanout.generate("", "x").translations[0].sentence_target for _ in range(8)]  # fmt: skip
+
+        assert served.count("a") == 6
+        assert served.count("b") == 2
+
+    def test_hedges_slow_provider(self):
+        adapters = {"slow": _NamedAdapter("slow", delay=0.5), "fast": _NamedAdapter("fast")}  # fmt: skip
+        fanout = _FanOutAdapter(
+            adapters, {"slow": 1, "fast": 0.001}, hedge_percentile=90, initial_hedge_delay=0.01  # fmt: skip
+        )
+
+        start = time.perf_counter()
+        response = fanout.generate("", "x")
+
+        assert response.translations[0].sentence_target == "fast"
+        assert time.perf_counter() - start < 0.4
+        assert adapters["fast"].calls == 1
+
+    def test_no_hedge_when_fast_enough(self):
+        adapters = {"a": _NamedAdapter("a"), "b": _NamedAdapter("b")}
+        fanout = _FanOutAdapter(
+            adapters, {"a": 1, "b": 0.001}, hedge_percentile=90, initial_hedge_delay=1
+        )
+
+        assert fanout.generate("", "x").translations[0].sentence_target == "a"
+        assert adapters["b"].calls == 0
+
+    def test_hedge_survives_primary_error(self):
+        adapters = {
+            "broken": _NamedAdapter("broken", delay=0.05, error=TranslationError("x")),
+            "ok": _NamedAdapter("ok", delay=0.1),
+        }
+        fanout = _FanOutAdapter(
+            adapters, {"broken": 1, "ok": 0.001}, hedge_percentile=50, initial_hedge_delay=0.01  # fmt: skip
+        )
+
+        assert fanout.generate("", "x").translations[0].sentence_target == "ok"
+
+    def test_async_hedges_slow_provider(self):
+        adapters = {"slow": _NamedAdapter("slow", delay=0.5), "fast": _NamedAdapter("fast")}  # fmt: skip
+        fanout = _FanOutAdapter(
+            adapters, {"slow": 1, "fast": 0.001}, hedge_percentile=90, initial_hedge_delay=0.01  # fmt: skip
+        )
+
+        response = asyncio.run(fanout.agenerate("", "x"))
+
+        assert response.translations[0].sentence_target == "fast"
+
+    @pytest.mark.parametrize(
+        "weights, percentile",
+        [({"a": 0, "b": 1}, None), ({"a": 1}, None), ({"a": 1, "b": 1}, 100)],
+    )
+    def test_invalid_configuration_raises(self, weights, percentile):
+        adapters = {"a": _NamedAdapter("a"), "b": _NamedAdapter("b")}
+        with pytest.raises(ValueError):
+            _FanOutAdapter(adapters, weights, hedge_percentile=percentile)
+
+    def test_translate_sentences_with_fanout(self):
+        with (
+            patch(
+                "flashcards.translation._GeminiAdapter.generate",
+                side_effect=_echo_response,
+            ) as gemini,
+            patch(
+                "flashcards.translation._OpenAIAdapter.generate",
+                side_effect=_echo_response,
+            ) as openai,
+        ):
+            result = translate_sentences(
+                [f"**{i}**" for i in range(4)],
+                chunk_size=1,
+                fanout={"gemini": 1, "openai": 1},
+            )
+
+        assert [item.sentence_target for item in result] == [f"**{i}**" for i in range(4)]  # fmt: skip
+        assert gemini.call_count == 2
+        assert openai.call_count == 2
+
+    def test_rate_limits_apply_per_provider(self, monkeypatch):
+        from flashcards import ratelimit
+
+        monkeypatch.setattr(ratelimit, "_RATE_LIMITERS", {})
+        acquired = []
+        monkeypatch.setattr(
+            ratelimit.RateLimiter, "acquire", lambda self, tokens: acquired.append(self)
+        )
+        with (
+            patch(
+                "flashcards.translation._GeminiAdapter.generate",
+                side_effect=_echo_response,
+            ),
+            patch(
+                "flashcards.translation._OpenAIAdapter.generate",
+                side_effect=_echo_response,
+            ),
+        ):
+            translate_sentences(
+                [f"**{i}**" for i in range(4)],
+                chunk_size=1,
+                fanout={"gemini": 1, "openai": 1},
+                requests_per_minute=60,
+            )
+
+        limiters = ratelimit._RATE_LIMITERS
+        assert sorted(api for api, _ in limiters) == ["gemini", "openai"]
+        assert all(limiter.requests_per_minute == 60 for limiter in limiters.values())
+        assert {id(limiter) for limiter in acquired} == {
+            id(limiter) for limiter in limiters.values()
+        }
+        assert len(acquired) == 4
+
+    def test_repeated_calls_share_round_robin_and_latencies(self):
+        with (
+            patch(
+                "flashcards.translation._GeminiAdapter.generate",
+                side_effect=_echo_response,
+            ) as gemini,
+            patch(
+                "flashcards.translation._OpenAIAdapter.generate",
+                side_effect=_echo_response,
+            ) as openai,
+        ):
+            for i in range(10):
+                translate_sentences(
+                    [f"**{i}**"],
+                    fanout={"gemini": 1, "openai": 1},
+                    hedge_percentile=90,
+                )
+
+        assert gemini.call_count == 5
+        assert openai.call_count == 5
+        fanout = _get_fanout_adapter({"gemini": 1, "openai": 1}, {"gemini": None}, 90)
+        assert sum(len(samples) for samples in fanout._latencies.values()) == 10
+        assert fanout._hedge_delay("gemini") < fanout.initial_hedge_delay
+
+    def test_close_clients_shuts_down_hedge_executor(self):
+        fanout = _get_fanout_adapter({"gemini": 1, "openai": 1}, hedge_percentile=90)
+        with patch.object(fanout, "_call", side_effect=lambda name, *args: _echo_response(*args)):  # fmt: skip
+            fanout.generate("", "1: **a**")
+        executor = fanout._executor
+
+        close_clients()
+
+        assert executor._shutdown
+        assert _get_fanout_adapter({"gemini": 1, "openai": 1}, hedge_percentile=90) is not fanout  # fmt: skip
+
+    def test_unknown_fanout_provider_raises(self):
+        with pytest.raises(TranslationError, match="Unsupported translation API"):
+            translate_sentences(["**a**"], fanout={"gemini": 1, "nope": 1})